@@ -0,0 +1,172 @@
+import copy
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+from PIL import Image
+
+from app.encoders import STUB_BACKEND
+from app.multimodal_db import SEARCH_MODES, MultimodalDatabase
+from app.scraper import Article
+
+
+def make_synthetic_corpus(directory: str, n_articles: int, images_per_article: int = 2, seed: int = 0) -> List[Article]:
+    """Generate articles with Zipf-distributed vocabulary and small PNG images"""
+    rng = np.random.default_rng(seed)
+    syllables = ['ka', 'lo', 'mi', 'ne', 'ru', 'so', 'ta', 'vi', 'ze', 'po', 'da', 'ghe']
+    vocabulary = sorted({
+        ''.join(rng.choice(syllables, size=rng.integers(2, 5)))
+        for _ in range(5000)
+    })
+    weights = 1.0 / np.arange(1, len(vocabulary) + 1)
+    weights /= weights.sum()
+
+    def words(count):
+        return ' '.join(rng.choice(vocabulary, size=count, p=weights))
+
+    image_dir = os.path.join(directory, 'images')
+    os.makedirs(image_dir, exist_ok=True)
+
+    articles = []
+    for k in range(n_articles):
+        images = []
+        for m in range(images_per_article):
+            path = os.path.join(image_dir, f"synthetic_{k}_{m}.png")
+            # Drawn even when the file exists, so the text doesn't depend on what is on disk
+            pixels = rng.integers(0, 256, size=(8, 8, 3), dtype=np.uint8)
+            if not os.path.exists(path):
+                Image.fromarray(pixels).resize((128, 128), Image.NEAREST).save(path)
+            images.append(path)
+
+        articles.append(Article(
+            title=words(6).title(),
+            content='\n\n'.join(words(int(rng.integers(40, 120))) for _ in range(int(rng.integers(3, 9)))),
+            url=f"https://example.com/the-batch/synthetic-{k}/",
+            images=images,
+            metadata={'synthetic': True}
+        ))
+    return articles
+
+
+def _synthetic_queries(articles: List[Article], n_queries: int, seed: int = 1) -> List[str]:
+    """Short phrases taken from random articles"""
+    rng = np.random.default_rng(seed)
+    queries = []
+    for _ in range(n_queries):
+        article_words = articles[int(rng.integers(len(articles)))].content.split()
+        start = int(rng.integers(max(len(article_words) - 5, 1)))
+        queries.append(' '.join(article_words[start:start + int(rng.integers(2, 6))]))
+    return queries
+
+
+def _percentiles(latencies_ms: List[float]) -> Dict:
+    values = np.array(latencies_ms)
+    return {
+        'mean_ms': float(values.mean()),
+        'p50_ms': float(np.percentile(values, 50)),
+        'p95_ms': float(np.percentile(values, 95)),
+        'p99_ms': float(np.percentile(values, 99))
+    }
+
+
+def _directory_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        # Not available on Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def run_benchmark(config, work_dir: str, n_articles: int = 500, images_per_article: int = 2,
+                  n_queries: int = 200, n_results: int = 5, stub_models: bool = True) -> Dict:
+    """Index a synthetic corpus into a scratch database and time ingest and search.
+
+    With stub_models the deterministic stub encoders replace the configured
+    models, so the run needs no network or model download.
+    """
+    config = copy.deepcopy(config)
+    persist_directory = os.path.join(work_dir, 'index')
+    shutil.rmtree(persist_directory, ignore_errors=True)
+    config['database']['persist_directory'] = persist_directory
+    # Measure uncached query latency
+    config.setdefault('query_cache', {})['enabled'] = False
+    if stub_models:
+        config['models']['text_backend'] = STUB_BACKEND
+        config['models']['image_backend'] = STUB_BACKEND
+
+    articles = make_synthetic_corpus(os.path.join(work_dir, 'corpus'), n_articles, images_per_article)
+    queries = _synthetic_queries(articles, n_queries)
+
+    db = MultimodalDatabase(config)
+    start = time.perf_counter()
+    ingest = db.add_articles(articles)
+    ingest_seconds = time.perf_counter() - start
+
+    search = {}
+    for mode in SEARCH_MODES:
+        # First query separately: it includes lazy model loading
+        start = time.perf_counter()
+        db.search(queries[0], n_results=n_results, mode=mode)
+        first_ms = (time.perf_counter() - start) * 1000
+
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            db.search(query, n_results=n_results, mode=mode)
+            latencies.append((time.perf_counter() - start) * 1000)
+        search[mode] = {'first_query_ms': first_ms, **_percentiles(latencies)}
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': _git_commit(),
+        'platform': platform.platform(),
+        'parameters': {
+            'articles': n_articles,
+            'images_per_article': images_per_article,
+            'queries': n_queries,
+            'n_results': n_results,
+            'vector_store': config['database'].get('vector_store', 'chroma'),
+            'text_backend': config['models'].get('text_backend', 'torch'),
+            'image_backend': config['models'].get('image_backend', 'torch')
+        },
+        'ingest': {
+            'seconds': ingest_seconds,
+            'articles_per_second': n_articles / ingest_seconds if ingest_seconds > 0 else 0.0,
+            'docs_per_second': ingest['docs_per_second'],
+            'images_per_second': ingest['images_per_second'],
+            'text_seconds': ingest['text_seconds'],
+            'image_seconds': ingest['image_seconds'],
+            'write_seconds': ingest['write_seconds']
+        },
+        'search': search,
+        'peak_rss_mb': _peak_rss_mb(),
+        'index_size_mb': _directory_size(persist_directory) / (1024 * 1024)
+    }
+    logging.info(f"Benchmark finished in {ingest_seconds:.1f}s ingest, index {report['index_size_mb']:.1f} MB")
+    return report
@@ -0,0 +1,109 @@
+import re
+from typing import Dict, List
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for English text (about 4 characters per token)"""
+    return len(text) // 4 + 1
+
+
+def _shingles(text: str, size: int):
+    words = re.findall(r'\w+', text.lower())
+    if len(words) <= size:
+        return {tuple(words)}
+    return {tuple(words[k:k + size]) for k in range(len(words) - size + 1)}
+
+
+def _jaccard(a, b) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class ContextPacker:
+    """Assembles LLM context from search results within a token budget.
+
+    Text hits below the cosine similarity threshold are dropped (except in
+    lexical mode, where similarity is a relative BM25 score). The remaining
+    hits are taken best-first: their matched passages when the passage
+    index is enabled, otherwise their leading paragraphs. Passages that
+    nearly duplicate one already packed are skipped, and packing stops
+    adding text once the budget is spent.
+    """
+
+    def __init__(self, config):
+        context_config = config.get('context', {})
+        self.max_tokens = context_config.get('max_tokens', 1500)
+        self.max_results = context_config.get('max_results', 3)
+        self.max_passages_per_result = context_config.get('max_passages_per_result', 3)
+        self.max_passage_tokens = context_config.get('max_passage_tokens', 300)
+        self.duplicate_threshold = context_config.get('duplicate_threshold', 0.8)
+        self.shingle_size = context_config.get('shingle_size', 5)
+        self.similarity_threshold = config.get('ui', {}).get('similarity_threshold', 0.0)
+
+    def _passages(self, result: Dict) -> List[str]:
+        """Candidate passages of a text hit, most relevant first"""
+        if result.get('passages'):
+            passages = result['passages']
+        else:
+            # Whole document: title line first, then paragraphs in order
+            paragraphs = [p.strip() for p in result['content'].split('\n\n') if p.strip()]
+            passages = paragraphs[1:] if paragraphs and paragraphs[0] == result['metadata'].get('title') else paragraphs
+
+        # Long passages are cut so one paragraph cannot take the whole budget
+        max_chars = self.max_passage_tokens * 4
+        return [p if len(p) <= max_chars else p[:max_chars].rsplit(' ', 1)[0] + ' ...' for p in passages]
+
+    def pack(self, results: List[Dict], mode: str = 'vector') -> Dict:
+        """Build the context string for a list of search results.
+
+        `mode` is the search mode that produced the results. Returns a dict
+        with the context text, its estimated token count, the URLs of the
+        articles used and counts of dropped hits and duplicate passages.
+        """
+        # Lexical similarity is BM25 relative to the best hit (always 1.0), not a cosine
+        threshold = self.similarity_threshold if mode != 'lexical' else float('-inf')
+        hits = sorted(
+            (r for r in results if r['type'] == 'text' and r['similarity'] >= threshold),
+            key=lambda r: r['similarity'],
+            reverse=True
+        )[:self.max_results]
+        dropped = sum(1 for r in results if r['type'] == 'text') - len(hits)
+
+        sections = []
+        packed_shingles = []
+        duplicates = 0
+        tokens = 0
+
+        for result in hits:
+            header = f"Title: {result['metadata'].get('title', '')}\nContent: "
+            header_tokens = estimate_tokens(header)
+            passages = []
+
+            for passage in self._passages(result):
+                if len(passages) == self.max_passages_per_result:
+                    break
+
+                shingles = _shingles(passage, self.shingle_size)
+                if any(_jaccard(shingles, other) >= self.duplicate_threshold for other in packed_shingles):
+                    duplicates += 1
+                    continue
+
+                cost = estimate_tokens(passage) + (0 if passages else header_tokens)
+                if tokens + cost > self.max_tokens:
+                    continue
+
+                passages.append(passage)
+                packed_shingles.append(shingles)
+                tokens += cost
+
+            if passages:
+                sections.append((result, header + "\n...\n".join(passages)))
+
+        return {
+            'text': "\n\n".join(section for _, section in sections),
+            'tokens': tokens,
+            'sources': [result['metadata'].get('url', '') for result, _ in sections],
+            'dropped_results': dropped,
+            'duplicate_passages': duplicates
+        }
@@ -0,0 +1,86 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+
+class DocumentStore:
+    """SQLite store of full article texts and image lists keyed by article ID.
+
+    The vector collections only keep embeddings and small metadata; search
+    results are hydrated from here for the hits that are displayed or
+    sent to the LLM.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # Shared across Streamlit's script threads, guarded by self._lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents (id TEXT PRIMARY KEY, body TEXT NOT NULL, images TEXT NOT NULL DEFAULT '[]')"
+        )
+        # Stores written before image lists moved here
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(documents)")}
+        if 'images' not in columns:
+            self._conn.execute("ALTER TABLE documents ADD COLUMN images TEXT NOT NULL DEFAULT '[]'")
+        self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def ids(self):
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT id FROM documents")}
+
+    def put(self, ids: List[str], documents: List[str], images: List[List[str]]):
+        """Store bodies and the image paths of each article"""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO documents (id, body, images) VALUES (?, ?, ?)",
+                zip(ids, documents, (json.dumps(paths) for paths in images))
+            )
+            self._conn.commit()
+
+    def _select(self, column: str, ids: List[str]) -> Dict[str, str]:
+        values = {}
+        with self._lock:
+            # Stay below SQLite's limit on query parameters
+            for start in range(0, len(ids), 500):
+                batch = ids[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT id, {column} FROM documents WHERE id IN ({','.join('?' * len(batch))})", batch
+                )
+                values.update(rows)
+        return values
+
+    def get(self, ids: List[str]) -> Dict[str, str]:
+        """Bodies of the given IDs; missing IDs are left out"""
+        return self._select('body', ids)
+
+    def get_images(self, ids: List[str]) -> Dict[str, List[str]]:
+        """Image paths of the given IDs; missing IDs are left out"""
+        return {doc_id: json.loads(images) for doc_id, images in self._select('images', ids).items()}
+
+    def items(self, batch_size: int = 1000) -> Iterator[Tuple[List[str], List[str]]]:
+        """Yield (ids, documents) batches of every stored document"""
+        last_id = ''
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT id, body FROM documents WHERE id > ? ORDER BY id LIMIT ?", (last_id, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            yield [row[0] for row in rows], [row[1] for row in rows]
+            last_id = rows[-1][0]
+
+    def delete(self, ids: Iterable[str]) -> int:
+        with self._lock:
+            cursor = self._conn.executemany("DELETE FROM documents WHERE id = ?", ((doc_id,) for doc_id in ids))
+            self._conn.commit()
+            return cursor.rowcount
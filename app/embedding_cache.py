@@ -0,0 +1,118 @@
+import logging
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """Bounded, thread-safe LRU cache of query embeddings.
+
+    Entries are keyed by model name (including the backend) and query text
+    with whitespace collapsed; case is kept, since not every encoder
+    backend lowercases its input. Entries expire after ttl_seconds and can
+    be persisted to disk so they survive restarts.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: Optional[float] = None,
+                 persist_path: Optional[str] = None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.persist_path = persist_path
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if persist_path:
+            self.load()
+
+    @staticmethod
+    def _key(model_name: str, text: str):
+        # Tokenizers split on whitespace, so runs of spaces don't change the embedding
+        return model_name, ' '.join(text.split())
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl_seconds is not None and time.time() - created_at > self.ttl_seconds
+
+    def get(self, model_name: str, text: str) -> Optional[np.ndarray]:
+        """Return the cached embedding or None"""
+        key = self._key(model_name, text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._expired(entry[1]):
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, model_name: str, text: str, embedding: np.ndarray):
+        """Store an embedding, evicting the least recently used entries"""
+        key = self._key(model_name, text)
+        with self._lock:
+            self._entries[key] = (np.asarray(embedding), time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def load(self):
+        """Load persisted entries, dropping expired ones"""
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+
+        try:
+            with open(self.persist_path, 'rb') as f:
+                entries = pickle.load(f)
+        except Exception as e:
+            logging.error(f"Error loading query embedding cache: {e}")
+            return
+
+        with self._lock:
+            for key, (embedding, created_at) in entries:
+                if not self._expired(created_at):
+                    self._entries[key] = (embedding, created_at)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+        logging.info(f"Loaded {len(self._entries)} cached query embeddings")
+
+    def save(self):
+        """Persist entries to disk"""
+        if not self.persist_path:
+            return
+
+        with self._lock:
+            entries = list(self._entries.items())
+
+        try:
+            os.makedirs(os.path.dirname(self.persist_path) or '.', exist_ok=True)
+            tmp_path = f"{self.persist_path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(entries, f)
+            os.replace(tmp_path, self.persist_path)
+        except Exception as e:
+            logging.error(f"Error saving query embedding cache: {e}")
+
+    def stats(self):
+        """Hit/miss counters"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0
+            }
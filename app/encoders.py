@@ -0,0 +1,409 @@
+import logging
+import os
+import re
+import time
+import zlib
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# sentence-transformers names for CLIP mapped to their Hugging Face checkpoints
+CLIP_ALIASES = {
+    'clip-ViT-B-32': 'openai/clip-vit-base-patch32',
+    'clip-ViT-B-16': 'openai/clip-vit-base-patch16',
+    'clip-ViT-L-14': 'openai/clip-vit-large-patch14',
+}
+
+BACKENDS = ('torch', 'int8', 'onnx', 'onnx-int8')
+
+# Deterministic, model-free embedder for offline benchmarks; not a real encoder
+STUB_BACKEND = 'stub'
+
+
+def resolve_clip_name(name: str) -> str:
+    return CLIP_ALIASES.get(name, name)
+
+
+def _export_dir(config, model_name: str, backend: str) -> str:
+    base = config['models'].get('onnx_dir', './data/onnx')
+    return os.path.join(base, re.sub(r'[^A-Za-z0-9._-]+', '_', model_name), backend)
+
+
+def _quantize_torch(model):
+    """Dynamic int8 quantization of Linear layers (CPU only)"""
+    import torch
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _export_onnx(module, args, path: str, input_names: List[str], output_names: List[str],
+                 dynamic_axes: Dict, quantize: bool) -> str:
+    """Export a torch module to ONNX once, optionally with int8 weights, and return the file to load"""
+    import torch
+
+    quantized_path = path.replace('.onnx', '.int8.onnx')
+    target = quantized_path if quantize else path
+    if os.path.exists(target):
+        return target
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if not os.path.exists(path):
+        logging.info(f"Exporting ONNX graph to {path}")
+        with torch.no_grad():
+            torch.onnx.export(
+                module, args, path,
+                input_names=input_names,
+                output_names=output_names,
+                dynamic_axes=dynamic_axes,
+                opset_version=17,
+                dynamo=False
+            )
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(path, quantized_path, weight_type=QuantType.QInt8)
+
+    return target
+
+
+def _onnx_session(path: str):
+    import onnxruntime
+    return onnxruntime.InferenceSession(path, providers=['CPUExecutionProvider'])
+
+
+def _normalize(embeddings: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(embeddings, axis=-1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+
+class OnnxTextEncoder:
+    """Sentence embedding model running on onnxruntime.
+
+    Mirrors the parts of the SentenceTransformer API the database uses:
+    encode() and get_sentence_embedding_dimension().
+    """
+
+    def __init__(self, session, tokenizer, max_seq_length: int, dimension: int, normalize: bool):
+        self.session = session
+        self.tokenizer = tokenizer
+        self.max_seq_length = max_seq_length
+        self.dimension = dimension
+        self.normalize = normalize
+        self._input_names = {i.name for i in session.get_inputs()}
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def encode(self, sentences, batch_size: int = 32, show_progress_bar: bool = False, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+
+        batches = []
+        for start in range(0, len(sentences), batch_size):
+            tokens = self.tokenizer(
+                sentences[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors='np'
+            )
+            inputs = {name: tokens[name].astype(np.int64) for name in self._input_names}
+            hidden = self.session.run(None, inputs)[0]
+
+            # Mean pooling over non-padding tokens
+            mask = tokens['attention_mask'][..., None].astype(np.float32)
+            embeddings = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+            batches.append(_normalize(embeddings) if self.normalize else embeddings)
+
+        embeddings = np.concatenate(batches).astype(np.float32) if batches else np.zeros((0, self.dimension), np.float32)
+        return embeddings[0] if single else embeddings
+
+
+class TorchClipEncoder:
+    """CLIP image and text towers on PyTorch; embeddings are L2-normalized"""
+
+    def __init__(self, model, processor, device: str):
+        self.model = model
+        self.processor = processor
+        self.device = device
+        self.dimension = model.config.projection_dim
+
+    def encode_images(self, images) -> np.ndarray:
+        import torch
+
+        inputs = self.processor(images=images, return_tensors="pt").to(self.device)
+        with torch.no_grad():
+            image_features = self.model.get_image_features(**inputs)
+            image_features = image_features / image_features.norm(dim=-1, keepdim=True)
+        return image_features.cpu().numpy()
+
+    def encode_texts(self, texts: List[str]) -> np.ndarray:
+        import torch
+
+        inputs = self.processor(text=texts, return_tensors="pt", padding=True).to(self.device)
+        with torch.no_grad():
+            text_features = self.model.get_text_features(**inputs)
+            text_features = text_features / text_features.norm(dim=-1, keepdim=True)
+        return text_features.cpu().numpy()
+
+
+class OnnxClipEncoder:
+    """CLIP image and text towers exported to ONNX; embeddings are L2-normalized"""
+
+    def __init__(self, vision_session, text_session, processor, dimension: int):
+        self.vision_session = vision_session
+        self.text_session = text_session
+        self.processor = processor
+        self.dimension = dimension
+
+    def encode_images(self, images) -> np.ndarray:
+        inputs = self.processor(images=images, return_tensors="np")
+        features = self.vision_session.run(None, {'pixel_values': inputs['pixel_values'].astype(np.float32)})[0]
+        return _normalize(features).astype(np.float32)
+
+    def encode_texts(self, texts: List[str]) -> np.ndarray:
+        inputs = self.processor(text=texts, return_tensors="np", padding=True)
+        features = self.text_session.run(None, {
+            'input_ids': inputs['input_ids'].astype(np.int64),
+            'attention_mask': inputs['attention_mask'].astype(np.int64)
+        })[0]
+        return _normalize(features).astype(np.float32)
+
+
+def _hash_embed(texts: List[str], dimension: int) -> np.ndarray:
+    """Feature-hashed bag of words, L2-normalized"""
+    embeddings = np.zeros((len(texts), dimension), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for token in re.findall(r'\w+', text.lower()):
+            digest = zlib.crc32(token.encode('utf-8'))
+            embeddings[row, digest % dimension] += 1.0 if digest & 0x80000000 else -1.0
+    return _normalize(embeddings)
+
+
+class StubTextEncoder:
+    """Deterministic hashing text embedder with the SentenceTransformer API the database uses.
+
+    Needs no model download or torch, so benchmarks run offline; texts
+    sharing words get similar embeddings.
+    """
+
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def encode(self, sentences, batch_size: int = 32, show_progress_bar: bool = False, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        embeddings = _hash_embed([sentences] if single else list(sentences), self.dimension)
+        return embeddings[0] if single else embeddings
+
+
+class StubClipEncoder:
+    """Deterministic CLIP stand-in: a fixed random projection of a downscaled
+    image and hashed text features, both L2-normalized."""
+
+    def __init__(self, dimension: int = 512, seed: int = 0):
+        self.dimension = dimension
+        self._projection = np.random.default_rng(seed).standard_normal((16 * 16 * 3, dimension)).astype(np.float32)
+
+    def encode_images(self, images) -> np.ndarray:
+        pixels = np.stack([
+            np.asarray(image.convert('RGB').resize((16, 16)), dtype=np.float32).reshape(-1) / 255.0 - 0.5
+            for image in images
+        ])
+        return _normalize(pixels @ self._projection)
+
+    def encode_texts(self, texts: List[str]) -> np.ndarray:
+        return _hash_embed(texts, self.dimension)
+
+
+def load_text_encoder(config, backend: Optional[str] = None):
+    """Load the sentence embedding model for the configured backend"""
+    backend = backend or config['models'].get('text_backend', 'torch')
+    if backend == STUB_BACKEND:
+        return StubTextEncoder(config['models'].get('stub_text_dimension', 384))
+
+    from sentence_transformers import SentenceTransformer
+
+    model_name = config['models']['text_embedding']
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown text embedding backend: {backend}")
+
+    if backend in ('int8', 'onnx', 'onnx-int8'):
+        model = SentenceTransformer(model_name, device='cpu')
+    else:
+        model = SentenceTransformer(model_name)
+
+    if backend == 'torch':
+        return model
+    if backend == 'int8':
+        return _quantize_torch(model)
+
+    import torch
+
+    transformer = model[0].auto_model
+    pooling = model[1]
+    if pooling.get_pooling_mode_str() != 'mean':
+        raise ValueError(f"ONNX backend supports mean pooling only, {model_name} uses {pooling.get_pooling_mode_str()}")
+    normalize = any(type(module).__name__ == 'Normalize' for module in model)
+
+    class _Transformer(torch.nn.Module):
+        def __init__(self, auto_model):
+            super().__init__()
+            self.auto_model = auto_model
+
+        def forward(self, input_ids, attention_mask):
+            return self.auto_model(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+
+    sample = model.tokenizer(["export sample"], return_tensors='pt')
+    path = _export_onnx(
+        _Transformer(transformer).eval(),
+        (sample['input_ids'], sample['attention_mask']),
+        os.path.join(_export_dir(config, model_name, 'onnx'), 'text.onnx'),
+        input_names=['input_ids', 'attention_mask'],
+        output_names=['last_hidden_state'],
+        dynamic_axes={
+            'input_ids': {0: 'batch', 1: 'sequence'},
+            'attention_mask': {0: 'batch', 1: 'sequence'},
+            'last_hidden_state': {0: 'batch', 1: 'sequence'}
+        },
+        quantize=backend == 'onnx-int8'
+    )
+    return OnnxTextEncoder(
+        _onnx_session(path),
+        model.tokenizer,
+        max_seq_length=model.max_seq_length,
+        dimension=model.get_sentence_embedding_dimension(),
+        normalize=normalize
+    )
+
+
+def load_clip_encoder(config, device: str, backend: Optional[str] = None):
+    """Load the CLIP image/text encoder for the configured backend"""
+    backend = backend or config['models'].get('image_backend', 'torch')
+    if backend == STUB_BACKEND:
+        return StubClipEncoder(config['models'].get('stub_image_dimension', 512))
+
+    from transformers import CLIPModel, CLIPProcessor
+
+    model_name = resolve_clip_name(config['models'].get('image_embedding', 'openai/clip-vit-base-patch32'))
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown image embedding backend: {backend}")
+
+    model = CLIPModel.from_pretrained(model_name).eval()
+    processor = CLIPProcessor.from_pretrained(model_name)
+
+    if backend == 'torch':
+        return TorchClipEncoder(model.to(device), processor, device)
+    if backend == 'int8':
+        return TorchClipEncoder(_quantize_torch(model), processor, 'cpu')
+
+    import torch
+
+    class _Vision(torch.nn.Module):
+        def __init__(self, clip):
+            super().__init__()
+            self.clip = clip
+
+        def forward(self, pixel_values):
+            return self.clip.get_image_features(pixel_values=pixel_values)
+
+    class _Text(torch.nn.Module):
+        def __init__(self, clip):
+            super().__init__()
+            self.clip = clip
+
+        def forward(self, input_ids, attention_mask):
+            return self.clip.get_text_features(input_ids=input_ids, attention_mask=attention_mask)
+
+    export_dir = _export_dir(config, model_name, 'onnx')
+    size = model.config.vision_config.image_size
+    quantize = backend == 'onnx-int8'
+
+    vision_path = _export_onnx(
+        _Vision(model).eval(),
+        (torch.zeros(1, 3, size, size),),
+        os.path.join(export_dir, 'vision.onnx'),
+        input_names=['pixel_values'],
+        output_names=['image_embeds'],
+        dynamic_axes={'pixel_values': {0: 'batch'}, 'image_embeds': {0: 'batch'}},
+        quantize=quantize
+    )
+    sample = processor(text=["export sample"], return_tensors='pt', padding=True)
+    text_path = _export_onnx(
+        _Text(model).eval(),
+        (sample['input_ids'], sample['attention_mask']),
+        os.path.join(export_dir, 'text.onnx'),
+        input_names=['input_ids', 'attention_mask'],
+        output_names=['text_embeds'],
+        dynamic_axes={
+            'input_ids': {0: 'batch', 1: 'sequence'},
+            'attention_mask': {0: 'batch', 1: 'sequence'},
+            'text_embeds': {0: 'batch'}
+        },
+        quantize=quantize
+    )
+    return OnnxClipEncoder(
+        _onnx_session(vision_path),
+        _onnx_session(text_path),
+        processor,
+        dimension=model.config.projection_dim
+    )
+
+
+def _time_call(func, repeats: int):
+    """Median wall time of func() in seconds, after one warm-up call"""
+    func()
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return float(np.median(durations))
+
+
+def _parity(reference: np.ndarray, candidate: np.ndarray):
+    reference = _normalize(reference)
+    candidate = _normalize(candidate)
+    cosines = (reference * candidate).sum(axis=-1)
+    return {'mean_cosine': float(cosines.mean()), 'min_cosine': float(cosines.min())}
+
+
+def compare_backends(config, texts: List[str], images: List, backends: List[str], repeats: int = 5):
+    """Compare embedding backends against the PyTorch reference.
+
+    For each backend reports cosine parity with the torch embeddings,
+    single-query latency and batch throughput for the text model, the CLIP
+    text tower and (when images are given) the CLIP image tower.
+    """
+    report = {}
+    reference_text = load_text_encoder(config, backend='torch')
+    reference_clip = load_clip_encoder(config, device='cpu', backend='torch')
+    reference = {
+        'text': reference_text.encode(texts, show_progress_bar=False),
+        'clip_text': reference_clip.encode_texts(texts),
+        'clip_image': reference_clip.encode_images(images) if images else None
+    }
+
+    for backend in backends:
+        text_encoder = reference_text if backend == 'torch' else load_text_encoder(config, backend=backend)
+        clip_encoder = reference_clip if backend == 'torch' else load_clip_encoder(config, device='cpu', backend=backend)
+
+        results = {
+            'text': _parity(reference['text'], text_encoder.encode(texts, show_progress_bar=False)),
+            'clip_text': _parity(reference['clip_text'], clip_encoder.encode_texts(texts))
+        }
+        results['text']['query_ms'] = _time_call(lambda: text_encoder.encode([texts[0]], show_progress_bar=False), repeats) * 1000
+        batch_seconds = _time_call(lambda: text_encoder.encode(texts, show_progress_bar=False), repeats)
+        results['text']['items_per_second'] = len(texts) / batch_seconds
+        results['clip_text']['query_ms'] = _time_call(lambda: clip_encoder.encode_texts([texts[0]]), repeats) * 1000
+
+        if images:
+            results['clip_image'] = _parity(reference['clip_image'], clip_encoder.encode_images(images))
+            batch_seconds = _time_call(lambda: clip_encoder.encode_images(images), repeats)
+            results['clip_image']['items_per_second'] = len(images) / batch_seconds
+
+        report[backend] = results
+
+    return report
@@ -0,0 +1,113 @@
+import itertools
+import json
+import logging
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+def load_eval_set(path: str) -> List[Dict]:
+    """Read a JSONL file of {"query": ..., "expected_urls": [...]} records"""
+    queries = []
+    with open(path, 'r') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            expected = record.get('expected_urls') or [record['expected_url']]
+            if not record.get('query') or not expected:
+                raise ValueError(f"{path}:{line_number}: need 'query' and 'expected_urls'")
+            queries.append({'query': record['query'], 'expected_urls': expected})
+    return queries
+
+
+def _url_ids(db, url: str) -> set:
+    """Article IDs a URL may be indexed under, with or without a trailing slash"""
+    url = url.strip().rstrip('/')
+    return {db.article_id(url), db.article_id(url + '/')}
+
+
+def _result_articles(results: List[Dict]) -> List[str]:
+    """Article IDs of the results in rank order; image hits count as their article"""
+    article_ids = []
+    for result in results:
+        article_id = result['metadata']['parent_article'] if result['type'] == 'image' else result['id']
+        if article_id not in article_ids:
+            article_ids.append(article_id)
+    return article_ids
+
+
+def evaluate_configuration(db, eval_set: List[Dict], n_results: int, include_images: bool,
+                           mode: str = 'vector') -> Dict:
+    """Run every query once and return recall@n_results, MRR and latency percentiles"""
+    # Warm-up so lazy model loading is not counted
+    db.search(eval_set[0]['query'], n_results=n_results, include_images=include_images, mode=mode)
+
+    latencies = []
+    recalls = []
+    reciprocal_ranks = []
+    for item in eval_set:
+        start = time.perf_counter()
+        results = db.search(item['query'], n_results=n_results, include_images=include_images, mode=mode)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        expected = [_url_ids(db, url) for url in item['expected_urls']]
+        article_ids = _result_articles(results)
+        recalls.append(sum(1 for ids in expected if ids.intersection(article_ids)) / len(expected))
+        expected_ids = set().union(*expected)
+        rank = next((k for k, article_id in enumerate(article_ids, 1) if article_id in expected_ids), None)
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+
+    latencies = np.array(latencies)
+    return {
+        'recall': float(np.mean(recalls)),
+        'mrr': float(np.mean(reciprocal_ranks)),
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'p99_ms': float(np.percentile(latencies, 99))
+    }
+
+
+def sweep(db, eval_set: List[Dict], n_results_values: List[int], include_images_values: List[bool],
+          ef_search_values: List[Optional[int]], modes: List[str]) -> List[Dict]:
+    """Evaluate every combination of the given search settings.
+
+    ef_search is restored to its original value afterwards; it does not
+    apply to lexical search, which is evaluated once per n_results and
+    include_images. Without HNSW (the numpy store) ef_search is not swept.
+    """
+    original_ef = db.hnsw_ef_search()
+    if original_ef is None:
+        ef_search_values = [None]
+    rows = []
+    try:
+        for ef_search in ef_search_values:
+            if ef_search is not None:
+                db.set_hnsw_ef_search(ef_search)
+            for mode, n_results, include_images in itertools.product(modes, n_results_values, include_images_values):
+                if mode == 'lexical' and ef_search != ef_search_values[0]:
+                    continue
+                metrics = evaluate_configuration(db, eval_set, n_results, include_images, mode=mode)
+                row = {
+                    'mode': mode,
+                    'n_results': n_results,
+                    'include_images': include_images,
+                    'ef_search': None if mode == 'lexical' else (ef_search or original_ef),
+                    **metrics
+                }
+                rows.append(row)
+                logging.info(
+                    f"Evaluated {mode} n_results={n_results} include_images={include_images} "
+                    f"ef_search={row['ef_search']}: recall {row['recall']:.3f}, p95 {row['p95_ms']:.1f} ms"
+                )
+    finally:
+        if original_ef is not None:
+            db.set_hnsw_ef_search(original_ef)
+    return rows
+
+
+def cheapest_configuration(rows: List[Dict], min_recall: float) -> Optional[Dict]:
+    """Lowest p95 latency configuration whose recall meets min_recall"""
+    passing = [row for row in rows if row['recall'] >= min_recall]
+    return min(passing, key=lambda row: row['p95_ms']) if passing else None
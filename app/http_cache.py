@@ -0,0 +1,179 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from app.rate_limit import ThrottledAdapter
+
+
+class ResponseCache:
+    """On-disk store of GET responses with per-URL freshness policies.
+
+    Policies, chosen by the first rule whose regex matches the URL:
+      - trust: serve a cached copy without contacting the server
+      - revalidate: send an ETag/Last-Modified conditional request
+      - ttl: trust for ttl_seconds, then revalidate
+      - bypass: never cache
+    In offline mode cached copies are always served and misses fail.
+    """
+
+    POLICIES = ('trust', 'revalidate', 'ttl', 'bypass')
+
+    def __init__(self, directory: str, rules: Optional[List[Dict]] = None,
+                 default_policy: str = 'revalidate', offline: bool = False):
+        self.directory = directory
+        self.offline = offline
+        self.default_policy = default_policy
+        self.rules = []
+        for rule in rules or []:
+            if rule['policy'] not in self.POLICIES:
+                raise ValueError(f"Unknown HTTP cache policy: {rule['policy']}")
+            self.rules.append((re.compile(rule['pattern']), rule['policy'], rule.get('ttl_seconds', 0)))
+
+        self._lock = threading.Lock()
+        self.counts = {'hits': 0, 'revalidated': 0, 'misses': 0, 'stored': 0}
+
+        os.makedirs(directory, exist_ok=True)
+
+    def policy_for(self, url: str):
+        """Return (policy, ttl_seconds) for a URL"""
+        for pattern, policy, ttl_seconds in self.rules:
+            if pattern.search(url):
+                return policy, ttl_seconds
+        return self.default_policy, 0
+
+    def _paths(self, url: str):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.directory, key[:2], key)
+        return f"{base}.json", f"{base}.body"
+
+    def load(self, url: str):
+        """Return (entry, body) for a cached URL, or (None, None)"""
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, 'r') as f:
+                entry = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = f.read()
+            return entry, body
+        except (OSError, ValueError):
+            return None, None
+
+    def store(self, url: str, response: requests.Response):
+        """Persist a successful response"""
+        meta_path, body_path = self._paths(url)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+
+        entry = {
+            'url': url,
+            'status_code': response.status_code,
+            'headers': dict(response.headers),
+            'stored_at': time.time()
+        }
+        # Write the body first so a metadata file always has a complete body
+        for path, data, mode in ((body_path, response.content, 'wb'), (meta_path, json.dumps(entry), 'w')):
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, mode) as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        self.count('stored')
+
+    def touch(self, url: str, entry: Dict, headers):
+        """Mark a cached entry as revalidated, merging refreshed validators"""
+        for header in ('ETag', 'Last-Modified', 'Cache-Control', 'Expires'):
+            if header in headers:
+                entry['headers'][header] = headers[header]
+        entry['stored_at'] = time.time()
+
+        meta_path, _ = self._paths(url)
+        tmp_path = f"{meta_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, meta_path)
+
+    def count(self, name: str):
+        with self._lock:
+            self.counts[name] += 1
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self.counts)
+        total = counts['hits'] + counts['revalidated'] + counts['misses']
+        counts['hit_rate'] = (counts['hits'] + counts['revalidated']) / total if total else 0.0
+        return counts
+
+
+def _build_response(request, entry: Dict, body: bytes) -> requests.Response:
+    """Recreate a requests.Response from a cache entry"""
+    response = requests.Response()
+    response.status_code = entry['status_code']
+    response.headers = CaseInsensitiveDict(entry['headers'])
+    response._content = body
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.url = request.url
+    response.request = request
+    response.reason = 'OK'
+    response.from_cache = True
+    return response
+
+
+class CachingAdapter(ThrottledAdapter):
+    """Throttled transport adapter that serves GET requests from a ResponseCache.
+
+    Only requests that actually reach the network consume rate-limit tokens.
+    """
+
+    def __init__(self, cache: ResponseCache, **kwargs):
+        self.cache = cache
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        url = request.url
+        policy, ttl_seconds = self.cache.policy_for(url)
+        if request.method != 'GET' or policy == 'bypass':
+            if self.cache.offline:
+                raise requests.ConnectionError(f"Offline mode: {url} is not served from the HTTP cache", request=request)
+            return super().send(request, **kwargs)
+
+        entry, body = self.cache.load(url)
+
+        if entry is not None:
+            age = time.time() - entry['stored_at']
+            if self.cache.offline or policy == 'trust' or (policy == 'ttl' and age < ttl_seconds):
+                self.cache.count('hits')
+                return _build_response(request, entry, body)
+
+            # Ask the server whether our copy is still current
+            headers = CaseInsensitiveDict(entry['headers'])
+            if 'ETag' in headers:
+                request.headers['If-None-Match'] = headers['ETag']
+            if 'Last-Modified' in headers:
+                request.headers['If-Modified-Since'] = headers['Last-Modified']
+
+        elif self.cache.offline:
+            self.cache.count('misses')
+            raise requests.ConnectionError(f"Offline mode: {url} is not in the HTTP cache", request=request)
+
+        response = super().send(request, **kwargs)
+
+        if entry is not None and response.status_code == 304:
+            self.cache.touch(url, entry, response.headers)
+            self.cache.count('revalidated')
+            response.close()
+            return _build_response(request, entry, body)
+
+        self.cache.count('misses')
+        if response.status_code == 200:
+            try:
+                self.cache.store(url, response)
+            except OSError as e:
+                logging.error(f"Error caching response for {url}: {e}")
+        return response
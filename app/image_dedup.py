@@ -0,0 +1,243 @@
+import json
+import logging
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+
+def dhash(image_path: str) -> Optional[int]:
+    """64-bit difference hash of an image, or None if it can't be decoded.
+
+    The image is reduced to 9x8 grayscale and each bit records whether a
+    pixel is brighter than its left neighbour, so resized, recompressed or
+    slightly retouched copies hash to the same or nearby values.
+    """
+    try:
+        with Image.open(image_path) as image:
+            # Let the JPEG decoder downscale while decoding
+            image.draft('L', (64, 64))
+            pixels = np.asarray(image.convert('L').resize((9, 8), Image.LANCZOS), dtype=np.int16)
+    except Exception as e:
+        logging.error(f"Error hashing image {image_path}: {e}")
+        return None
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hamming_distances(value: int, hashes: np.ndarray) -> np.ndarray:
+    """Number of differing bits between value and each of hashes (uint64)"""
+    diff = np.bitwise_xor(hashes, np.uint64(value))
+    return np.unpackbits(diff.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+class ImageDedupIndex:
+    """Perceptual-hash index of the image collection.
+
+    Every image record stands for a cluster of image files whose dHashes
+    are within hamming_threshold bits of the record's hash; it is encoded
+    once and lists all articles that use any of its files. Files are
+    recognized by content hash, so known files are not decoded again.
+    With enabled=False only byte-identical files share a record.
+
+    Clusters suppressed as boilerplate have no record in the collection;
+    they are kept in a JSON file at suppressed_path so later processes
+    don't encode them again.
+    """
+
+    def __init__(self, config, suppressed_path: Optional[str] = None):
+        dedup_config = config.get('embedding', {}).get('image_dedup', {})
+        self.enabled = dedup_config.get('enabled', True)
+        self.hamming_threshold = dedup_config.get('hamming_threshold', 6)
+        # Images used by at least this many articles are dropped as boilerplate (0 disables)
+        self.boilerplate_min_articles = dedup_config.get('boilerplate_min_articles', 0)
+
+        self.clusters = {}   # record ID -> cluster
+        self._by_file = {}   # file content hash -> record ID
+        self._by_parent = {}  # article ID -> record IDs of the images it uses
+        self._cluster_ids = []
+        self._phashes = []
+        self._hashes = None  # uint64 array of _phashes, rebuilt after additions
+        self.suppressed_path = suppressed_path
+        self.suppressed_dirty = False
+
+    def __len__(self):
+        return len(self.clusters)
+
+    def load(self, records: Iterable[Tuple[str, Dict]]):
+        """Add stored image records, given as (id, metadata) pairs.
+
+        Records written before deduplication have no member hashes and
+        are left out; they are replaced on the next full build.
+        """
+        for record_id, metadata in records:
+            if 'member_hashes' not in metadata:
+                continue
+            self._add(record_id, {
+                'phash': int(metadata['phash'], 16) if metadata.get('phash') else None,
+                'image_path': metadata['image_path'],
+                'image_hash': metadata['image_hash'],
+                'members': set(json.loads(metadata['member_hashes'])),
+                'parents': json.loads(metadata['parent_articles']),
+                'stored': True,
+                'encoded': False,
+                'suppressed': False,
+                'dirty': False
+            })
+
+    def load_suppressed(self):
+        """Add the suppressed clusters saved by save_suppressed()"""
+        if not self.suppressed_path or not os.path.exists(self.suppressed_path):
+            return
+        try:
+            with open(self.suppressed_path, 'r') as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.error(f"Error loading suppressed images: {e}")
+            return
+        for record_id, entry in entries.items():
+            if record_id in self.clusters:
+                continue
+            self._add(record_id, {
+                'phash': int(entry['phash'], 16) if entry['phash'] else None,
+                'image_path': entry['image_path'],
+                'image_hash': entry['image_hash'],
+                'members': set(entry['member_hashes']),
+                'parents': entry['parent_articles'],
+                'stored': False,
+                'encoded': False,
+                'suppressed': True,
+                'dirty': False
+            })
+
+    def save_suppressed(self):
+        """Write the suppressed clusters to suppressed_path if they changed"""
+        if not self.suppressed_path or not self.suppressed_dirty:
+            return
+        entries = {
+            record_id: {
+                'phash': f"{cluster['phash']:016x}" if cluster['phash'] is not None else '',
+                'image_path': cluster['image_path'],
+                'image_hash': cluster['image_hash'],
+                'member_hashes': sorted(cluster['members']),
+                'parent_articles': cluster['parents']
+            }
+            for record_id, cluster in self.clusters.items() if cluster['suppressed']
+        }
+        try:
+            os.makedirs(os.path.dirname(self.suppressed_path) or '.', exist_ok=True)
+            tmp_path = f"{self.suppressed_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.suppressed_path)
+            self.suppressed_dirty = False
+        except OSError as e:
+            logging.error(f"Error saving suppressed images: {e}")
+
+    def _add(self, record_id: str, cluster: Dict):
+        self.clusters[record_id] = cluster
+        for file_hash in cluster['members']:
+            self._by_file[file_hash] = record_id
+        for parent_id in cluster['parents']:
+            self._by_parent.setdefault(parent_id, set()).add(record_id)
+        if cluster['phash'] is not None:
+            self._cluster_ids.append(record_id)
+            self._phashes.append(cluster['phash'])
+            self._hashes = None
+
+    def _nearest(self, phash: int) -> Optional[str]:
+        """Record ID of the closest cluster within hamming_threshold bits"""
+        if not self._phashes:
+            return None
+        if self._hashes is None:
+            self._hashes = np.array(self._phashes, dtype=np.uint64)
+        distances = hamming_distances(phash, self._hashes)
+        best = int(np.argmin(distances))
+        return self._cluster_ids[best] if distances[best] <= self.hamming_threshold else None
+
+    def assign(self, image_path: str, file_hash: str) -> Optional[Tuple[str, bool]]:
+        """Cluster of an image file; returns (record ID, whether it joined as a near-duplicate).
+
+        Unknown files start a new cluster unless a perceptually similar one
+        exists. Returns None if the image can't be decoded.
+        """
+        if file_hash in self._by_file:
+            return self._by_file[file_hash], False
+
+        if not self.enabled:
+            self._add(f"image_{file_hash[:16]}", self._new_cluster(image_path, file_hash, None))
+            return f"image_{file_hash[:16]}", False
+
+        phash = dhash(image_path)
+        if phash is None:
+            return None
+        record_id = self._nearest(phash)
+        if record_id is not None:
+            cluster = self.clusters[record_id]
+            cluster['members'].add(file_hash)
+            cluster['dirty'] = True
+            self._by_file[file_hash] = record_id
+            return record_id, True
+
+        record_id = f"image_{phash:016x}"
+        self._add(record_id, self._new_cluster(image_path, file_hash, phash))
+        return record_id, False
+
+    @staticmethod
+    def _new_cluster(image_path: str, file_hash: str, phash: Optional[int]) -> Dict:
+        return {
+            'phash': phash,
+            'image_path': image_path,
+            'image_hash': file_hash,
+            'members': {file_hash},
+            'parents': [],
+            'stored': False,
+            'encoded': False,
+            'suppressed': False,
+            'dirty': True
+        }
+
+    def link(self, record_id: str, parent_ids: List[str]):
+        """Record articles that use an image"""
+        cluster = self.clusters[record_id]
+        for parent_id in parent_ids:
+            if parent_id not in cluster['parents']:
+                cluster['parents'].append(parent_id)
+                cluster['dirty'] = True
+            self._by_parent.setdefault(parent_id, set()).add(record_id)
+
+    def unlink_stale(self, parent_id: str, record_ids: Iterable[str]) -> List[str]:
+        """Remove an article from the images it no longer uses.
+
+        record_ids are the images of the article's current version; returns
+        the records the article was removed from.
+        """
+        current = set(record_ids)
+        stale = sorted(self._by_parent.get(parent_id, set()) - current)
+        for record_id in stale:
+            cluster = self.clusters[record_id]
+            cluster['parents'].remove(parent_id)
+            cluster['dirty'] = True
+        if current:
+            self._by_parent[parent_id] = current
+        else:
+            self._by_parent.pop(parent_id, None)
+        return stale
+
+    def is_boilerplate(self, record_id: str) -> bool:
+        return 0 < self.boilerplate_min_articles <= len(self.clusters[record_id]['parents'])
+
+    def metadata(self, record_id: str) -> Dict:
+        """Collection metadata of an image record"""
+        cluster = self.clusters[record_id]
+        return {
+            'type': 'image',
+            'image_path': cluster['image_path'],
+            # First article for single-parent lookups, the full list in parent_articles
+            'parent_article': cluster['parents'][0],
+            'parent_articles': json.dumps(cluster['parents']),
+            'image_hash': cluster['image_hash'],
+            'phash': f"{cluster['phash']:016x}" if cluster['phash'] is not None else '',
+            'member_hashes': json.dumps(sorted(cluster['members']))
+        }
@@ -0,0 +1,139 @@
+import heapq
+import logging
+import math
+import os
+import pickle
+import re
+import threading
+from collections import Counter
+from typing import Iterable, List, Optional, Tuple
+
+_TOKEN_PATTERN = re.compile(r'\w+')
+
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have how in is it its of on or that the this "
+    "to was were what when where which who why will with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens without stopwords"""
+    return [token for token in _TOKEN_PATTERN.findall(text.lower()) if token not in _STOPWORDS]
+
+
+class LexicalIndex:
+    """In-memory BM25 inverted index over article documents, persisted with pickle.
+
+    Queries are scored without any model, so lexical search works before
+    (or without) loading the embedding encoders.
+    """
+
+    def __init__(self, persist_path: Optional[str] = None, k1: float = 1.5, b: float = 0.75):
+        self.persist_path = persist_path
+        self.k1 = k1
+        self.b = b
+
+        self._postings = {}    # term -> {doc_id: term frequency}
+        self._doc_terms = {}   # doc_id -> (document length, unique terms)
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+        if persist_path:
+            self.load()
+
+    def __len__(self):
+        return len(self._doc_terms)
+
+    def ids(self):
+        with self._lock:
+            return set(self._doc_terms)
+
+    def _remove(self, doc_id: str):
+        length, terms = self._doc_terms.pop(doc_id)
+        self._total_length -= length
+        for term in terms:
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+
+    def upsert(self, ids: List[str], documents: List[str]):
+        """Index documents, replacing earlier versions with the same IDs"""
+        with self._lock:
+            for doc_id, document in zip(ids, documents):
+                if doc_id in self._doc_terms:
+                    self._remove(doc_id)
+                counts = Counter(tokenize(document))
+                length = sum(counts.values())
+                for term, count in counts.items():
+                    self._postings.setdefault(term, {})[doc_id] = count
+                self._doc_terms[doc_id] = (length, tuple(counts))
+                self._total_length += length
+
+    def delete(self, ids: Iterable[str]) -> int:
+        with self._lock:
+            removed = 0
+            for doc_id in ids:
+                if doc_id in self._doc_terms:
+                    self._remove(doc_id)
+                    removed += 1
+            return removed
+
+    def clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._doc_terms.clear()
+            self._total_length = 0
+
+    def search(self, query: str, n_results: int = 5) -> List[Tuple[str, float]]:
+        """Return up to n_results (doc_id, BM25 score) pairs, best first"""
+        with self._lock:
+            doc_count = len(self._doc_terms)
+            if not doc_count:
+                return []
+            avg_length = self._total_length / doc_count
+
+            scores = {}
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    length = self._doc_terms[doc_id][0]
+                    norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return heapq.nlargest(n_results, scores.items(), key=lambda item: item[1])
+
+    def load(self):
+        """Load the persisted index"""
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+
+        try:
+            with open(self.persist_path, 'rb') as f:
+                postings, doc_terms = pickle.load(f)
+        except Exception as e:
+            logging.error(f"Error loading lexical index: {e}")
+            return
+
+        with self._lock:
+            self._postings = postings
+            self._doc_terms = doc_terms
+            self._total_length = sum(length for length, _ in doc_terms.values())
+
+    def save(self):
+        """Persist the index to disk"""
+        if not self.persist_path:
+            return
+
+        try:
+            os.makedirs(os.path.dirname(self.persist_path) or '.', exist_ok=True)
+            tmp_path = f"{self.persist_path}.{threading.get_ident()}.tmp"
+            with self._lock:
+                with open(tmp_path, 'wb') as f:
+                    pickle.dump((self._postings, self._doc_terms), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.persist_path)
+        except Exception as e:
+            logging.error(f"Error saving lexical index: {e}")
@@ -1,61 +1,212 @@
 import openai
 import logging
 import os
+import time
+from typing import Dict, Iterator, Optional
 from dotenv import load_dotenv
 
+from app.answer_cache import AnswerCache
+from app.metrics import metrics
+
 load_dotenv()
 
+# Bump when a prompt template changes so cached completions are not reused
+ANSWER_PROMPT_VERSION = 1
+SUMMARY_PROMPT_VERSION = 1
+
 class LLMInterface:
     def __init__(self, config):
         self.config = config
         self.model = config['models']['llm_model']
+        metrics.configure(config.get('metrics'))
         
         os.environ['OPENAI_API_KEY'] = os.getenv("API_KEY")
         openai.api_key = os.getenv("API_KEY")
-        self.client = openai.OpenAI()
+        # Optional OpenAI-compatible endpoint, e.g. a local server
+        self.client = openai.OpenAI(base_url=config['models'].get('llm_base_url'))
+        # Used for batch summarization, which handles retries itself
+        self.async_client = openai.AsyncOpenAI(base_url=config['models'].get('llm_base_url'), max_retries=0)
+        
+        cache_config = config.get('llm_cache', {})
+        self.cache = None
+        if cache_config.get('enabled', False):
+            self.cache = AnswerCache(
+                cache_config.get('path', './data/llm_cache.sqlite'),
+                ttl_seconds=cache_config.get('ttl_seconds'),
+                max_entries=cache_config.get('max_entries', 10000)
+            )
         
     
-    def generate_answer(self, query: str, context: str) -> str:
-        """Generate an answer based on query and context"""
-        try:
-            prompt = f"""Based on the following context from The Batch articles, please answer the user's question.
+    def _answer_messages(self, query: str, context: str):
+        """Chat messages asking the model to answer a query from retrieved context"""
+        prompt = f"""Based on the following context from The Batch articles, please answer the user's question.
             Context:
             {context}
             Question: {query}
             Please provide a comprehensive answer based on the information in the context. If the context doesn't contain enough information to fully answer the question, please indicate that and provide what information is available."""
 
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant that answers questions based on provided context from The Batch newsletter articles."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=500,
-                temperature=0.7
-            )
-            return response.choices[0].message.content
+        return [
+            {"role": "system", "content": "You are a helpful assistant that answers questions based on provided context from The Batch newsletter articles."},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def _cache_key(self, kind: str, query: str, context: str, use_cache: bool):
+        """Cache key for a completion, or None when the cache is disabled or bypassed"""
+        if self.cache is None or not use_cache:
+            return None
+        version = ANSWER_PROMPT_VERSION if kind == 'answer' else SUMMARY_PROMPT_VERSION
+        return AnswerCache.make_key(kind, self.model, version, query, context)
+    
+    def generate_answer(self, query: str, context: str, use_cache: bool = True) -> str:
+        """Generate an answer based on query and context"""
+        key = self._cache_key('answer', query, context, use_cache)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        
+        try:
+            with metrics.span('llm.answer'):
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=self._answer_messages(query, context),
+                    max_tokens=500,
+                    temperature=0.7
+                )
+            answer = response.choices[0].message.content
+            if key is not None and answer:
+                self.cache.put(key, answer)
+            return answer
                 
         except Exception as e:
             logging.error(f"Error generating LLM response: {e}")
             return f"Error generating response: {str(e)}"
     
-    def summarize_article(self, content: str) -> str:
-        """Generate a summary of an article"""
+    def generate_answer_stream(self, query: str, context: str, use_cache: bool = True,
+                               timings: Optional[Dict] = None) -> Iterator[str]:
+        """Generate an answer, yielding text as tokens arrive.
+        
+        Time to first token, total generation time and whether the stream
+        completed are filled into the caller's `timings` dict; the interface
+        is shared between sessions, so it keeps no per-call state. A cached
+        answer is yielded in one piece.
+        """
+        start = time.perf_counter()
+        if timings is None:
+            timings = {}
+        timings.update({'time_to_first_token': None, 'total_time': None, 'cached': False, 'completed': False})
+        
+        key = self._cache_key('answer', query, context, use_cache)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                timings.update({
+                    'time_to_first_token': time.perf_counter() - start,
+                    'total_time': time.perf_counter() - start,
+                    'cached': True,
+                    'completed': True
+                })
+                yield cached
+                return
+        
+        parts = []
+        completed = False
         try:
-            prompt = f"Please provide a concise summary of the following article:\n\n{content[:2000]}"
-            
-            response = self.client.chat.completions.create(
+            stream = self.client.chat.completions.create(
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant that creates concise summaries."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=200,
-                temperature=0.5
+                messages=self._answer_messages(query, context),
+                max_tokens=500,
+                temperature=0.7,
+                stream=True
+            )
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    if timings['time_to_first_token'] is None:
+                        timings['time_to_first_token'] = time.perf_counter() - start
+                        metrics.observe('llm.first_token', timings['time_to_first_token'])
+                    parts.append(delta)
+                    yield delta
+            completed = True
+                    
+        except Exception as e:
+            logging.error(f"Error generating LLM response: {e}")
+            yield f"Error generating response: {str(e)}"
+        
+        finally:
+            timings['total_time'] = time.perf_counter() - start
+            timings['completed'] = completed
+            metrics.observe('llm.answer_stream', timings['total_time'])
+            # Only complete answers are cached, not errors or abandoned streams
+            if key is not None and completed and parts:
+                self.cache.put(key, ''.join(parts))
+            logging.info(
+                f"LLM answer streamed: first token after "
+                f"{timings['time_to_first_token'] or 0:.2f}s, "
+                f"total {timings['total_time']:.2f}s"
             )
-            return response.choices[0].message.content
+    
+    def _summary_messages(self, content: str):
+        """Chat messages asking the model to summarize an article"""
+        prompt = f"Please provide a concise summary of the following article:\n\n{content[:2000]}"
+        
+        return [
+            {"role": "system", "content": "You are a helpful assistant that creates concise summaries."},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def summarize_article(self, content: str, use_cache: bool = True) -> str:
+        """Generate a summary of an article"""
+        key = self._cache_key('summary', '', content[:2000], use_cache)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        
+        try:
+            with metrics.span('llm.summary'):
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=self._summary_messages(content),
+                    max_tokens=200,
+                    temperature=0.5
+                )
+            summary = response.choices[0].message.content
+            if key is not None and summary:
+                self.cache.put(key, summary)
+            return summary
                 
                 
         except Exception as e:
             logging.error(f"Error generating summary: {e}")
-            return "Error generating summary"
\ No newline at end of file
+            return "Error generating summary"
+    
+    async def summarize_article_async(self, content: str, use_cache: bool = True) -> str:
+        """Generate a summary of an article with the async client.
+        
+        Unlike summarize_article, API errors are raised so callers can retry.
+        """
+        key = self._cache_key('summary', '', content[:2000], use_cache)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        
+        start = time.perf_counter()
+        response = await self.async_client.chat.completions.create(
+            model=self.model,
+            messages=self._summary_messages(content),
+            max_tokens=200,
+            temperature=0.5
+        )
+        metrics.observe('llm.summary', time.perf_counter() - start)
+        summary = response.choices[0].message.content
+        if key is not None and summary:
+            self.cache.put(key, summary)
+        return summary
+    
+    def cache_stats(self):
+        """Hit-rate statistics of the answer cache, or None when it is disabled"""
+        return self.cache.stats() if self.cache is not None else None
\ No newline at end of file
@@ -0,0 +1,243 @@
+import atexit
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('registry', 'name', 'start')
+
+    def __init__(self, registry, name: str):
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _Trace:
+    """Spans recorded while handling one request"""
+
+    def __init__(self, registry, name: str):
+        self.registry = registry
+        self.name = name
+        self.spans = []
+        self._lock = threading.Lock()
+        self._previous = None
+
+    def add(self, name: str, seconds: float):
+        with self._lock:
+            self.spans.append((name, seconds))
+
+    def __enter__(self):
+        self._previous = getattr(self.registry._local, 'trace', None)
+        self.registry._local.trace = self
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        total = time.perf_counter() - self.start
+        self.registry._local.trace = self._previous
+        self.registry.observe(self.name, total, record_in_trace=False)
+        self.registry._finish_trace(self, total)
+        return False
+
+
+class MetricsRegistry:
+    """Stage timing spans aggregated into latency histograms.
+
+    Instrumented code wraps each stage in `metrics.span(name)`. Spans are
+    recorded into per-stage histograms (exported in the Prometheus text
+    format) and into the current trace, e.g. one search or one LLM call,
+    which is kept for display and optionally appended to a JSON-lines log.
+    When metrics are disabled span() returns a shared no-op context manager.
+
+    Finished traces are buffered; a background thread appends them to the
+    log and rewrites the Prometheus dump every flush_interval seconds, and
+    once more at exit, so requests never wait on metrics file I/O.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.buckets = DEFAULT_BUCKETS
+        self.log_path = None
+        self.prometheus_path = None
+        self.flush_interval = 10.0
+        self._histograms = {}
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._local = threading.local()
+        self._flusher = None
+
+    def configure(self, config: Optional[Dict]):
+        """Apply the `metrics` config section"""
+        config = config or {}
+        self.enabled = config.get('enabled', False)
+        self.buckets = tuple(config.get('buckets', DEFAULT_BUCKETS))
+        self.log_path = config.get('log_path')
+        self.prometheus_path = config.get('prometheus_path')
+        self.flush_interval = config.get('flush_interval', 10.0)
+        if self.enabled and (self.log_path or self.prometheus_path) and self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_periodically, name='metrics-flush', daemon=True)
+            self._flusher.start()
+            atexit.register(self.flush)
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def span(self, name: str):
+        """Context manager timing one stage"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def trace(self, name: str):
+        """Context manager grouping the spans of one request; also timed as a stage"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Trace(self, name)
+
+    def bind(self, func):
+        """Wrap func so spans it records on another thread join the caller's trace"""
+        trace = getattr(self._local, 'trace', None)
+        if not self.enabled or trace is None:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            self._local.trace = trace
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._local.trace = None
+        return wrapper
+
+    def observe(self, name: str, seconds: float, record_in_trace: bool = True):
+        """Record a duration for a stage"""
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = {'counts': [0] * len(self.buckets), 'count': 0, 'sum': 0.0}
+            for k, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram['counts'][k] += 1
+            histogram['count'] += 1
+            histogram['sum'] += seconds
+
+        trace = getattr(self._local, 'trace', None)
+        if record_in_trace and trace is not None:
+            trace.add(name, seconds)
+
+    def _finish_trace(self, trace: _Trace, total: float):
+        record = {
+            'trace': trace.name,
+            'timestamp': time.time(),
+            'total_seconds': total,
+            'spans': [{'name': name, 'seconds': seconds} for name, seconds in trace.spans]
+        }
+        # Per thread, so concurrent requests (e.g. UI sessions) each see their own
+        if not hasattr(self._local, 'last_traces'):
+            self._local.last_traces = {}
+        self._local.last_traces[trace.name] = record
+
+        if self.log_path:
+            with self._lock:
+                self._pending.append(record)
+
+    def flush(self):
+        """Append buffered traces to the log and rewrite the Prometheus dump"""
+        with self._flush_lock:
+            with self._lock:
+                records, self._pending = self._pending, []
+            if records and self.log_path:
+                try:
+                    os.makedirs(os.path.dirname(self.log_path) or '.', exist_ok=True)
+                    with open(self.log_path, 'a') as f:
+                        f.writelines(json.dumps(record) + '\n' for record in records)
+                except OSError as e:
+                    logging.error(f"Error writing metrics log: {e}")
+            # Keeps the dump current for long-running processes such as the UI
+            self.write_prometheus()
+
+    def last_trace(self, name: str) -> Optional[Dict]:
+        """Spans of the most recent trace with this name finished on the calling thread"""
+        return getattr(self._local, 'last_traces', {}).get(name)
+
+    def snapshot(self) -> Dict:
+        """Count, total and mean seconds per stage"""
+        with self._lock:
+            return {
+                name: {
+                    'count': histogram['count'],
+                    'sum_seconds': histogram['sum'],
+                    'mean_seconds': histogram['sum'] / histogram['count'] if histogram['count'] else 0.0
+                }
+                for name, histogram in sorted(self._histograms.items())
+            }
+
+    def prometheus_text(self) -> str:
+        """Histograms in the Prometheus text exposition format"""
+        lines = [
+            '# HELP batchrag_stage_seconds Time spent per pipeline stage.',
+            '# TYPE batchrag_stage_seconds histogram'
+        ]
+        with self._lock:
+            for name, histogram in sorted(self._histograms.items()):
+                for bound, count in zip(self.buckets, histogram['counts']):
+                    lines.append(f'batchrag_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {count}')
+                lines.append(f'batchrag_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {histogram["count"]}')
+                lines.append(f'batchrag_stage_seconds_sum{{stage="{name}"}} {histogram["sum"]:.6f}')
+                lines.append(f'batchrag_stage_seconds_count{{stage="{name}"}} {histogram["count"]}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path: Optional[str] = None):
+        """Write the Prometheus dump, e.g. for the node_exporter textfile collector"""
+        path = path or self.prometheus_path
+        if not path:
+            return
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w') as f:
+                f.write(self.prometheus_text())
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.error(f"Error writing Prometheus metrics: {e}")
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._pending.clear()
+        self._local.last_traces = {}
+
+
+# Process-wide registry shared by all instrumented modules
+metrics = MetricsRegistry()
+
@@ -1,39 +1,104 @@
-import chromadb
+import atexit
+import hashlib
 import json
-from typing import List
-from sentence_transformers import SentenceTransformer
-import torch
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+import threading
+import numpy as np
 from PIL import Image
-from transformers import CLIPProcessor, CLIPModel
 import logging
 
+from app.document_store import DocumentStore
+from app.embedding_cache import EmbeddingCache
+from app.image_dedup import ImageDedupIndex
+from app.lexical_index import LexicalIndex
+from app.metrics import metrics
+from app.numpy_store import NumpyClient
+from app.encoders import STUB_BACKEND, load_clip_encoder, load_text_encoder, resolve_clip_name
+
+
+def _hash_text(text: str) -> str:
+    """SHA-1 hex digest of a string"""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def _hash_file(path: str) -> Optional[str]:
+    """SHA-1 hex digest of a file's content, or None if it can't be read"""
+    try:
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 16), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    except OSError:
+        return None
+
+
+SEARCH_MODES = ('vector', 'lexical', 'hybrid')
+
+# Text metadata keys of earlier versions, moved to the document store or dropped
+_LEGACY_TEXT_KEYS = ('images', 'metadata')
+
+
+def _cosine_similarities(query_embedding, embeddings) -> np.ndarray:
+    """Cosine similarity of a query embedding to each row of embeddings"""
+    query_embedding = np.asarray(query_embedding, dtype=np.float32)
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1) * np.linalg.norm(query_embedding)
+    return embeddings @ query_embedding / np.where(norms == 0, 1.0, norms)
+
+
+def _split_passages(text: str, chunk_size: int, chunk_overlap: int) -> List[str]:
+    """Split text into overlapping passages of roughly chunk_size words"""
+    words = text.split()
+    if not words:
+        return []
+    
+    step = max(chunk_size - chunk_overlap, 1)
+    passages = []
+    for start in range(0, len(words), step):
+        passages.append(' '.join(words[start:start + chunk_size]))
+        if start + chunk_size >= len(words):
+            break
+    return passages
+
+
 class MultimodalDatabase:
     def __init__(self, config):
         self.config = config
+        metrics.configure(config.get('metrics'))
         
-        # Initialize ChromaDB
-        self.client = chromadb.PersistentClient(
-            path=config['database']['persist_directory']
-        )
+        # Vector store: ChromaDB (HNSW) or exact search over memory-mapped NumPy matrices
+        self.vector_store = config['database'].get('vector_store', 'chroma')
+        if self.vector_store == 'numpy':
+            self.client = NumpyClient(config['database']['persist_directory'])
+        elif self.vector_store == 'chroma':
+            import chromadb
+            self.client = chromadb.PersistentClient(
+                path=config['database']['persist_directory']
+            )
+        else:
+            raise ValueError(f"Unknown vector store: {self.vector_store}")
         
-        # Initialize embedding models
-        self.text_model = SentenceTransformer(config['models']['text_embedding'])
+        # Embedding models are loaded on first use (see text_model / clip_encoder)
+        models_config = config['models']
+        self.text_backend = models_config.get('text_backend', 'torch')
+        self.image_backend = models_config.get('image_backend', 'torch')
+        # Cache keys include the backend, its embeddings differ slightly from torch
+        self._text_cache_key = f"{models_config['text_embedding']}:{self.text_backend}"
+        self._clip_cache_key = f"{resolve_clip_name(models_config.get('image_embedding', 'openai/clip-vit-base-patch32'))}:{self.image_backend}"
+        self._text_model = None
+        self._clip_encoder = None
+        self._clip_load_failed = False
+        self._device = None
+        self._model_lock = threading.Lock()
         
-        # Initialize CLIP for image embeddings using Hugging Face
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        
-        try:
-            self.clip_model = CLIPModel.from_pretrained("openai/clip-vit-base-patch32")
-            self.clip_processor = CLIPProcessor.from_pretrained("openai/clip-vit-base-patch32")
-            self.clip_model.to(self.device)
-        except Exception as e:
-            logging.error(f"Failed to load CLIP model: {e}")
-            self.clip_model = None
-            self.clip_processor = None
-        
-        # Get embedding dimensions
-        self.text_dim = self.text_model.get_sentence_embedding_dimension()
-        self.image_dim = self.clip_model.config.projection_dim if self.clip_model else 512
+        if not config['models'].get('lazy_loading', True):
+            # Load both models up front instead of on the first request
+            _ = self.text_model
+            _ = self.clip_encoder
         
         # Create separate collections for text and images
         self.text_collection = self.client.get_or_create_collection(
@@ -46,175 +111,1194 @@ class MultimodalDatabase:
             metadata={"hnsw:space": "cosine"}
         )
         
-    def add_articles(self, articles: List):
-        """Add articles to the database"""
+        # Runs the image branch of a search alongside the text branch
+        self._executor = ThreadPoolExecutor(max_workers=4)
+        
+        # Cache of query embeddings for both encoders
+        cache_config = config.get('query_cache', {})
+        self.query_cache = None
+        if cache_config.get('enabled', True):
+            self.query_cache = EmbeddingCache(
+                max_size=cache_config.get('max_size', 1024),
+                ttl_seconds=cache_config.get('ttl_seconds'),
+                persist_path=cache_config.get('persist_path')
+            )
+            if self.query_cache.persist_path:
+                atexit.register(self.query_cache.save)
+        
+        # Optional passage-level index, each chunk pointing to its parent article
+        self.chunking = config['database'].get('chunking', {})
+        self.chunk_collection = None
+        if self.chunking.get('enabled', False):
+            self.chunk_collection = self.client.get_or_create_collection(
+                name=f"{config['database']['collection_name']}_chunks",
+                metadata={"hnsw:space": "cosine"}
+            )
+        
+        # Full article texts, kept out of the collections and fetched by ID
+        self.documents = DocumentStore(os.path.join(config['database']['persist_directory'], 'documents.sqlite'))
+        if self._needs_migration():
+            self._migrate_documents()
+        
+        # Set by defer_writes(): vector store files and the lexical index are saved by flush()
+        self._deferred_writes = False
+        
+        # Perceptual-hash index of the image records, loaded on first ingest
+        self._image_index = None
+        self._image_index_lock = threading.Lock()
+        
+        # BM25 index over articles for model-free lexical and hybrid search
+        lexical_config = config['database'].get('lexical', {})
+        self.rrf_k = lexical_config.get('rrf_k', 60)
+        self.lexical_index = None
+        if lexical_config.get('enabled', True):
+            self.lexical_index = LexicalIndex(
+                os.path.join(config['database']['persist_directory'], 'lexical_index.pkl'),
+                k1=lexical_config.get('k1', 1.5),
+                b=lexical_config.get('b', 0.75)
+            )
+            if len(self.lexical_index) != self.text_collection.count():
+                self.rebuild_lexical_index()
+        
+    @property
+    def device(self):
+        """Torch device for the embedding models"""
+        if self._device is None:
+            import torch
+            self._device = "cuda" if torch.cuda.is_available() else "cpu"
+        return self._device
+    
+    @property
+    def text_model(self):
+        """Text encoder (SentenceTransformer API), loaded on first access"""
+        if self._text_model is None:
+            with self._model_lock:
+                if self._text_model is None:
+                    start = time.perf_counter()
+                    self._text_model = load_text_encoder(self.config)
+                    logging.info(
+                        f"Loaded text model ({self.text_backend} backend) "
+                        f"in {time.perf_counter() - start:.1f}s"
+                    )
+        return self._text_model
+    
+    @property
+    def clip_encoder(self):
+        """CLIP image/text encoder, loaded on first access; None if unavailable"""
+        if self._clip_encoder is None and not self._clip_load_failed:
+            with self._model_lock:
+                if self._clip_encoder is None and not self._clip_load_failed:
+                    try:
+                        start = time.perf_counter()
+                        device = 'cpu' if self.image_backend == STUB_BACKEND else self.device
+                        self._clip_encoder = load_clip_encoder(self.config, device)
+                        logging.info(
+                            f"Loaded CLIP model ({self.image_backend} backend) "
+                            f"in {time.perf_counter() - start:.1f}s"
+                        )
+                    except Exception as e:
+                        logging.error(f"Failed to load CLIP model: {e}")
+                        self._clip_load_failed = True
+        return self._clip_encoder
+    
+    @property
+    def image_index(self):
+        """ImageDedupIndex over the image collection, loaded on first access"""
+        if self._image_index is None:
+            with self._image_index_lock:
+                if self._image_index is None:
+                    image_index = ImageDedupIndex(
+                        self.config,
+                        suppressed_path=os.path.join(self.config['database']['persist_directory'], 'suppressed_images.json')
+                    )
+                    image_index.load(self.iter_metadatas(self.image_collection))
+                    image_index.load_suppressed()
+                    self._image_index = image_index
+        return self._image_index
+    
+    @property
+    def text_dim(self):
+        return self.text_model.get_sentence_embedding_dimension()
+    
+    @property
+    def image_dim(self):
+        return self.clip_encoder.dimension if self.clip_encoder else 512
+    
+    def add_articles(self, articles: List, incremental: bool = False, prune: bool = False):
+        """Add articles to the database.
+        
+        Records are keyed by stable IDs derived from the article URL and
+        upserted, so re-adding an article replaces its previous version.
+        With incremental=True, articles and images whose content hash is
+        unchanged are not re-embedded. With prune=True, records that are not
+        part of `articles` are deleted.
+        """
+        with metrics.trace('ingest'):
+            if incremental:
+                with metrics.span('ingest.load_hashes'):
+                    existing = self.load_existing_hashes()
+            else:
+                existing = None
+            batch = self.embed_articles(articles, existing=existing)
+            stats = self.write_batch(batch)
+            
+            if prune:
+                with metrics.span('ingest.prune'):
+                    stats['deleted'] += self.prune(batch['seen_text_ids'], batch['seen_image_ids'])
+        
+        if incremental:
+            logging.info(
+                f"Incremental update: {stats['text_skipped']} articles and "
+                f"{stats['image_skipped']} images unchanged, {stats['deleted']} records deleted"
+            )
+        if stats['image_references']:
+            logging.info(
+                f"Image deduplication: {stats['image_references']} image references, "
+                f"{stats['image_encodes_avoided']} encodes avoided, "
+                f"{stats['image_near_duplicates']} near-duplicates, "
+                f"{stats['boilerplate_suppressed']} boilerplate image references suppressed"
+            )
+        
+        return stats
+    
+    def load_existing_hashes(self):
+        """Content hashes of stored records, used to skip unchanged articles.
+        
+        Stored images are known to the image index (see image_index).
+        """
+        existing = {'text': {}, 'chunk_parents': set()}
+        for record_id, metadata in self.iter_metadatas(self.text_collection):
+            existing['text'][record_id] = metadata.get('content_hash')
+        if self.chunk_collection is not None:
+            for _, metadata in self.iter_metadatas(self.chunk_collection):
+                existing['chunk_parents'].add(metadata.get('parent_article'))
+        return existing
+    
+    def embed_articles(self, articles: List, existing=None):
+        """Build records for articles and their images and compute their embeddings.
+        
+        Nothing is written; pass the returned batch to write_batch. When
+        `existing` (from load_existing_hashes) is given, unchanged articles
+        and images are skipped.
+        
+        Images are deduplicated by perceptual hash: each distinct image is
+        encoded once and stored as one record linking all its articles.
+        """
+        embedding_config = self.config.get('embedding', {})
+        text_batch_size = embedding_config.get('text_batch_size', 32)
+        image_batch_size = embedding_config.get('image_batch_size', 16)
+        
+        existing_text = existing['text'] if existing else {}
+        existing_chunk_parents = existing['chunk_parents'] if existing else set()
+
         text_documents = []
         text_metadatas = []
         text_ids = []
-        text_embeddings = []
+        text_images = []
         
-        image_documents = []
-        image_metadatas = []
-        image_ids = []
-        image_embeddings = []
+        # image path -> articles that use it
+        image_refs = {}
         
-        for i, article in enumerate(articles):
+        # Articles whose passages need to be (re)chunked and embedded
+        chunk_articles = []
+        
+        seen_text_ids = set()
+        seen_image_ids = set()
+        
+        stats = {
+            'text_documents': 0,
+            'image_documents': 0,
+            'text_skipped': 0,
+            'image_skipped': 0,
+            'image_references': 0,
+            'image_near_duplicates': 0,
+            'image_encodes_avoided': 0,
+            'boilerplate_suppressed': 0,
+            'chunks': 0,
+            'deleted': 0,
+            'text_seconds': 0.0,
+            'image_seconds': 0.0,
+            'write_seconds': 0.0,
+            'docs_per_second': 0.0,
+            'images_per_second': 0.0
+        }
+        
+        for article in articles:
             # Skip articles without title or content
             if not hasattr(article, 'title') or not hasattr(article, 'content'):
                 continue
+            
+            url = getattr(article, 'url', '')
+            article_id = self.article_id(url or article.title)
+            if article_id in seen_text_ids:
+                logging.warning(f"Skipping duplicate article {url}")
+                continue
+            seen_text_ids.add(article_id)
                 
             # Create document text
             doc_text = f"{article.title}\n\n{article.content}"
+            images = getattr(article, 'images', [])
+            article_metadata = getattr(article, 'metadata', {})
+            content_hash = _hash_text(json.dumps([doc_text, images, article_metadata], sort_keys=True))
             
-            # Create metadata
+            # Create metadata; the image list is kept in the document store
             metadata = {
                 'title': article.title,
-                'url': getattr(article, 'url', ''),
-                'images': json.dumps(getattr(article, 'images', [])),
-                'metadata': json.dumps(getattr(article, 'metadata', {})),
-                'type': 'text'
+                'url': url,
+                'type': 'text',
+                'content_hash': content_hash,
+                # Metadata merges on update, so a summary of earlier content is cleared
+                # explicitly; current summaries are attached again by set_summaries
+                'summary': ''
             }
             
-            # Generate text embedding
-            text_embedding = self.text_model.encode(doc_text)
+            if existing_text.get(article_id) == content_hash:
+                stats['text_skipped'] += 1
+                if self.chunk_collection is not None and article_id not in existing_chunk_parents:
+                    chunk_articles.append((article_id, article, metadata))
+            else:
+                text_documents.append(doc_text)
+                text_metadatas.append(metadata)
+                text_ids.append(article_id)
+                text_images.append(images)
+                if self.chunk_collection is not None:
+                    chunk_articles.append((article_id, article, metadata))
             
-            text_documents.append(doc_text)
-            text_metadatas.append(metadata)
-            text_ids.append(f"article_{i}")
-            text_embeddings.append(text_embedding.tolist())
-            
-            # Add image embeddings if images exist
-            images = getattr(article, 'images', [])
-            for j, image_path in enumerate(images):
-                try:
-                    image_embedding = self._encode_image(image_path)
-                    if image_embedding is not None:
-                        image_metadata = metadata.copy()
-                        image_metadata.update({
-                            'type': 'image',
-                            'image_path': image_path,
-                            'parent_article': f"article_{i}"
-                        })
-                        
-                        image_documents.append(f"Image from: {article.title}")
-                        image_metadatas.append(image_metadata)
-                        image_ids.append(f"image_{i}_{j}")
-                        image_embeddings.append(image_embedding.tolist())
-                        
-                except Exception as e:
-                    logging.error(f"Error processing image {image_path}: {e}")
+            for image_path in images:
+                parent_ids = image_refs.setdefault(image_path, [])
+                if article_id not in parent_ids:
+                    parent_ids.append(article_id)
         
-        # Add to separate collections
+        # Resolve images to deduplicated records, queueing the ones to encode
+        with metrics.span('ingest.image_dedup'):
+            image_plan = self._plan_images(image_refs, existing is not None, stats, relinked=text_ids)
+        seen_image_ids.update(image_plan['seen'])
+        
+        batch = {
+            'stats': stats,
+            'seen_text_ids': seen_text_ids,
+            'seen_image_ids': seen_image_ids,
+            'text': None,
+            'chunks': None,
+            'images': None,
+            'image_updates': None,
+            'image_deletes': image_plan['delete']
+        }
+        
+        # Encode text documents in batches
         if text_documents:
-            self.text_collection.add(
-                documents=text_documents,
-                metadatas=text_metadatas,
-                ids=text_ids,
-                embeddings=text_embeddings
+            start = time.perf_counter()
+            with metrics.span('ingest.text_encode'):
+                text_embeddings = self.text_model.encode(
+                    text_documents,
+                    batch_size=text_batch_size,
+                    show_progress_bar=False
+                )
+            elapsed = time.perf_counter() - start
+            
+            batch['text'] = {
+                'documents': text_documents,
+                'metadatas': text_metadatas,
+                'ids': text_ids,
+                'embeddings': text_embeddings,
+                'images': text_images
+            }
+            stats['text_documents'] = len(text_documents)
+            stats['text_seconds'] = elapsed
+            stats['docs_per_second'] = len(text_documents) / elapsed if elapsed > 0 else 0.0
+        
+        if chunk_articles:
+            with metrics.span('ingest.chunk_encode'):
+                batch['chunks'] = self._embed_chunks(chunk_articles, text_batch_size)
+            stats['chunks'] = len(batch['chunks']['ids'])
+        
+        # Encode images in batches, one representative file per record
+        image_index = self.image_index
+        if image_plan['encode']:
+            image_ids = image_plan['encode']
+            start = time.perf_counter()
+            with metrics.span('ingest.image_encode'):
+                image_embeddings, encoded = self._encode_images(
+                    [image_index.clusters[image_id]['image_path'] for image_id in image_ids],
+                    batch_size=image_batch_size
+                )
+            elapsed = time.perf_counter() - start
+            
+            if encoded:
+                batch['images'] = {
+                    'metadatas': [image_index.metadata(image_ids[k]) for k in encoded],
+                    'ids': [image_ids[k] for k in encoded],
+                    'embeddings': image_embeddings
+                }
+                for k in encoded:
+                    image_index.clusters[image_ids[k]].update(stored=True, encoded=True, dirty=False)
+            stats['image_documents'] = len(encoded)
+            stats['image_seconds'] = elapsed
+            stats['images_per_second'] = len(encoded) / elapsed if elapsed > 0 else 0.0
+        
+        # Stored records that gained articles or member files
+        if image_plan['update']:
+            batch['image_updates'] = {
+                'ids': image_plan['update'],
+                'metadatas': [image_index.metadata(image_id) for image_id in image_plan['update']]
+            }
+            for image_id in image_plan['update']:
+                image_index.clusters[image_id]['dirty'] = False
+        
+        return batch
+    
+    def _plan_images(self, image_refs, incremental: bool, stats, relinked=()):
+        """Assign images to perceptual-hash records and decide what to encode, update or delete.
+        
+        A record is encoded when it is new, or on a full (non-incremental)
+        build unless it was already encoded by this process; otherwise its
+        stored embedding is reused. Records used by at least
+        boilerplate_min_articles articles are suppressed.
+        
+        The articles in `relinked` (those being rewritten) are removed from
+        records they no longer use; records left without articles are deleted.
+        """
+        image_index = self.image_index
+        plan = {'encode': [], 'update': [], 'delete': [], 'seen': set()}
+        
+        touched = []
+        # article ID -> records of its current images
+        article_images = {}
+        # record ID -> references to it in this batch
+        references = {}
+        for image_path, parent_ids in image_refs.items():
+            file_hash = _hash_file(image_path)
+            assigned = image_index.assign(image_path, file_hash) if file_hash else None
+            if assigned is None:
+                logging.warning(f"Skipping unreadable image {image_path}")
+                continue
+            image_id, near_duplicate = assigned
+            image_index.link(image_id, parent_ids)
+            for parent_id in parent_ids:
+                article_images.setdefault(parent_id, set()).add(image_id)
+            stats['image_references'] += len(parent_ids)
+            references[image_id] = references.get(image_id, 0) + len(parent_ids)
+            stats['image_near_duplicates'] += int(near_duplicate)
+            if image_id not in touched:
+                touched.append(image_id)
+        
+        for parent_id in relinked:
+            for image_id in image_index.unlink_stale(parent_id, article_images.get(parent_id, ())):
+                if image_id not in touched:
+                    touched.append(image_id)
+        
+        for image_id in touched:
+            cluster = image_index.clusters[image_id]
+            if not cluster['parents']:
+                # No article uses it any more
+                if cluster['stored']:
+                    plan['delete'].append(image_id)
+                    cluster['stored'] = False
+                if cluster['suppressed']:
+                    cluster['suppressed'] = False
+                    image_index.suppressed_dirty = True
+                continue
+            if image_index.is_boilerplate(image_id):
+                stats['boilerplate_suppressed'] += references.get(image_id, 0)
+                if not cluster['suppressed'] or cluster['dirty']:
+                    # Remembered with its files and articles by save_suppressed()
+                    cluster['suppressed'] = True
+                    cluster['dirty'] = False
+                    image_index.suppressed_dirty = True
+                    if cluster['stored']:
+                        plan['delete'].append(image_id)
+                        cluster['stored'] = False
+                continue
+            if cluster['suppressed']:
+                # Fell below the boilerplate threshold, it is encoded again
+                cluster['suppressed'] = False
+                image_index.suppressed_dirty = True
+            
+            plan['seen'].add(image_id)
+            if not cluster['stored'] or not (incremental or cluster['encoded']):
+                plan['encode'].append(image_id)
+            else:
+                if not cluster['encoded']:
+                    stats['image_skipped'] += 1
+                if cluster['dirty']:
+                    plan['update'].append(image_id)
+        
+        # Without deduplication every reference would be encoded; references to
+        # boilerplate are counted in boilerplate_suppressed instead
+        stats['image_encodes_avoided'] = (
+            stats['image_references'] - stats['boilerplate_suppressed'] - len(plan['encode']) - stats['image_skipped']
+        )
+        return plan
+    
+    def write_batch(self, batch):
+        """Write a batch produced by embed_articles to the collections"""
+        stats = batch['stats']
+        start = time.perf_counter()
+        
+        if batch['text']:
+            with metrics.span('ingest.write_text'):
+                # Bodies and image lists go to the document store, the collection keeps embeddings and metadata
+                self.documents.put(batch['text']['ids'], batch['text']['documents'], batch['text']['images'])
+                self._upsert(
+                    self.text_collection,
+                    ids=batch['text']['ids'],
+                    embeddings=batch['text']['embeddings'],
+                    metadatas=batch['text']['metadatas']
+                )
+            if self.lexical_index is not None:
+                with metrics.span('ingest.lexical_index'):
+                    self.lexical_index.upsert(batch['text']['ids'], batch['text']['documents'])
+                    if not self._deferred_writes:
+                        self.lexical_index.save()
+            logging.info(
+                f"Added {stats['text_documents']} text documents "
+                f"({stats['docs_per_second']:.1f} docs/sec)"
             )
-            logging.info(f"Added {len(text_documents)} text documents")
         
-        if image_documents:
-            self.image_collection.add(
-                documents=image_documents,
-                metadatas=image_metadatas,
-                ids=image_ids,
-                embeddings=image_embeddings
+        if batch['chunks']:
+            with metrics.span('ingest.write_chunks'):
+                # Drop previous passages first, an edited article may have fewer of them
+                self.chunk_collection.delete(where={'parent_article': {'$in': batch['chunks']['parent_ids']}})
+                chunks = {key: values for key, values in batch['chunks'].items() if key != 'parent_ids'}
+                if chunks['ids']:
+                    self._upsert(self.chunk_collection, **chunks)
+            logging.info(f"Added {stats['chunks']} passages")
+        
+        if batch['images']:
+            with metrics.span('ingest.write_images'):
+                self._upsert(self.image_collection, **batch['images'])
+            logging.info(
+                f"Added {stats['image_documents']} image documents "
+                f"({stats['images_per_second']:.1f} images/sec)"
             )
-            logging.info(f"Added {len(image_documents)} image documents")
+        
+        if batch['image_updates']:
+            with metrics.span('ingest.write_images'):
+                self._update(self.image_collection, **batch['image_updates'])
+        
+        if batch['image_deletes']:
+            self.image_collection.delete(ids=batch['image_deletes'])
+            logging.info(f"Deleted {len(batch['image_deletes'])} boilerplate or no longer used images")
+        
+        if self._image_index is not None and not self._deferred_writes:
+            self._image_index.save_suppressed()
+        
+        if batch['text'] or batch['chunks'] or batch['images'] or batch['image_updates'] or batch['image_deletes']:
+            self.bump_corpus_version()
+        
+        stats['write_seconds'] = time.perf_counter() - start
+        return stats
     
-    def _encode_image(self, image_path: str):
-        """Encode image using CLIP"""
-        if self.clip_model is None or self.clip_processor is None:
-            logging.warning("CLIP model not available, skipping image encoding")
+    def defer_writes(self, deferred: bool = True):
+        """Buffer index files in memory across write_batch calls until flush().
+        
+        Without it every batch rewrites the lexical index and, with the
+        numpy store, the embedding matrices, which makes a long streaming
+        ingest quadratic in I/O. Turning deferral off flushes.
+        """
+        self._deferred_writes = deferred
+        if self.vector_store == 'numpy':
+            self.client.defer_writes(deferred)
+        if not deferred:
+            self.flush()
+    
+    def flush(self):
+        """Persist writes buffered by defer_writes()"""
+        if self.vector_store == 'numpy':
+            self.client.flush()
+        if self.lexical_index is not None:
+            self.lexical_index.save()
+        if self._image_index is not None:
+            self._image_index.save_suppressed()
+    
+    def prune(self, keep_text_ids, keep_image_ids) -> int:
+        """Delete articles, images and passages that are not in the given ID sets"""
+        if self.lexical_index is not None:
+            if self.lexical_index.delete(self.lexical_index.ids() - set(keep_text_ids)):
+                self.lexical_index.save()
+        self.documents.delete(self.documents.ids() - set(keep_text_ids))
+        deleted = self._delete_missing(self.text_collection, keep_text_ids)
+        deleted += self._delete_missing(self.image_collection, keep_image_ids)
+        self._prune_image_parents(keep_text_ids)
+        if self.chunk_collection is not None:
+            deleted += self._delete_chunks(
+                [record_id for record_id, metadata in self.iter_metadatas(self.chunk_collection)
+                 if metadata.get('parent_article') not in keep_text_ids]
+            )
+        if deleted:
+            self.bump_corpus_version()
+        return deleted
+    
+    def _prune_image_parents(self, keep_text_ids):
+        """Drop deleted articles from the parent lists of shared image records"""
+        updates = {}
+        for record_id, metadata in self.iter_metadatas(self.image_collection):
+            if 'parent_articles' not in metadata:
+                continue
+            parent_ids = json.loads(metadata['parent_articles'])
+            kept = [parent_id for parent_id in parent_ids if parent_id in keep_text_ids]
+            if kept and kept != parent_ids:
+                updates[record_id] = {'parent_article': kept[0], 'parent_articles': json.dumps(kept)}
+        if updates:
+            self._update(self.image_collection, ids=list(updates), metadatas=list(updates.values()))
+        
+        # Suppressed boilerplate has no record, its articles are kept in the index's file
+        image_index = self.image_index
+        for record_id, cluster in list(image_index.clusters.items()):
+            if not cluster['suppressed']:
+                continue
+            kept = [parent_id for parent_id in cluster['parents'] if parent_id in keep_text_ids]
+            if kept != cluster['parents']:
+                if kept:
+                    cluster['parents'] = kept
+                else:
+                    del image_index.clusters[record_id]
+                image_index.suppressed_dirty = True
+        image_index.save_suppressed()
+        # Reloaded from the collection on the next ingest
+        self._image_index = None
+    
+    def set_summaries(self, summaries) -> int:
+        """Store precomputed summaries ({article_id: summary}) as article metadata"""
+        batch_size = self.client.get_max_batch_size()
+        article_ids = list(summaries)
+        updated = 0
+        for start in range(0, len(article_ids), batch_size):
+            # Only update articles that are in the index
+            ids = self.text_collection.get(ids=article_ids[start:start + batch_size], include=[])['ids']
+            if ids:
+                self.text_collection.update(ids=ids, metadatas=[{'summary': summaries[record_id]} for record_id in ids])
+                updated += len(ids)
+        if updated:
+            self.bump_corpus_version()
+        return updated
+    
+    def rebuild_lexical_index(self):
+        """Rebuild the BM25 index from the document store"""
+        self.lexical_index.clear()
+        for ids, documents in self.documents.items():
+            self.lexical_index.upsert(ids, documents)
+        self.lexical_index.save()
+        logging.info(f"Rebuilt lexical index over {len(self.lexical_index)} articles")
+    
+    def _needs_migration(self) -> bool:
+        """Whether the text collection still holds bodies or the image and article metadata JSON"""
+        if self.text_collection.count() == 0:
+            return False
+        if len(self.documents) == 0:
+            return True
+        records = self.text_collection.get(include=['documents', 'metadatas'], limit=1)
+        return bool(records['documents'][0]) or any(key in records['metadatas'][0] for key in _LEGACY_TEXT_KEYS)
+    
+    def _migrate_documents(self):
+        """Move article bodies and image lists stored in the text collection by earlier versions to the document store.
+        
+        The records are then rewritten without a document and without the
+        'images' and nested 'metadata' JSON, which nothing reads any more.
+        """
+        batch_size = self.client.get_max_batch_size()
+        ids = [record_id for record_id, _ in self.iter_metadatas(self.text_collection)]
+        moved = 0
+        for start in range(0, len(ids), batch_size):
+            records = self.text_collection.get(
+                ids=ids[start:start + batch_size], include=['documents', 'metadatas', 'embeddings']
+            )
+            bodies = self.documents.get(records['ids'])
+            self.documents.put(
+                records['ids'],
+                [document or bodies.get(record_id, '') for record_id, document in zip(records['ids'], records['documents'])],
+                [json.loads(metadata.get('images', '[]')) for metadata in records['metadatas']]
+            )
+            # None removes a metadata key on update, in Chroma and the numpy store alike
+            self.text_collection.update(
+                ids=records['ids'],
+                embeddings=records['embeddings'],
+                documents=[''] * len(records['ids']),
+                metadatas=[{key: None for key in _LEGACY_TEXT_KEYS} for _ in records['ids']]
+            )
+            moved += len(records['ids'])
+        if moved:
+            logging.info(f"Moved {moved} article texts and image lists to the document store")
+    
+    def hnsw_ef_search(self) -> Optional[int]:
+        """Current HNSW ef_search of the article collection, None for the exact numpy store"""
+        if self.vector_store != 'chroma':
             return None
-            
+        return self.text_collection.configuration_json.get('hnsw', {}).get('ef_search')
+    
+    def set_hnsw_ef_search(self, ef_search: int):
+        """Set the HNSW ef_search (query-time candidate list size) of every collection.
+        
+        Larger values trade query latency for recall. The setting is persisted.
+        The numpy store searches exhaustively and ignores it.
+        """
+        if self.vector_store != 'chroma':
+            return
+        for collection in (self.text_collection, self.image_collection, self.chunk_collection):
+            if collection is not None:
+                collection.modify(configuration={'hnsw': {'ef_search': ef_search}})
+    
+    def _corpus_version_path(self) -> str:
+        return os.path.join(self.config['database']['persist_directory'], 'corpus_version')
+    
+    def corpus_version(self) -> str:
+        """Identifier that changes whenever indexed content is written or deleted"""
         try:
-            image = Image.open(image_path).convert('RGB')
-            inputs = self.clip_processor(images=image, return_tensors="pt").to(self.device)
-            
-            with torch.no_grad():
-                image_features = self.clip_model.get_image_features(**inputs)
-                image_features = image_features / image_features.norm(dim=-1, keepdim=True)
-                
-            return image_features.cpu().numpy()[0]
-            
+            with open(self._corpus_version_path(), 'r') as f:
+                return f.read().strip()
+        except OSError:
+            return '0'
+    
+    def bump_corpus_version(self):
+        """Mark the corpus as changed, invalidating results cached against it"""
+        path = self._corpus_version_path()
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(str(time.time_ns()))
+        os.replace(tmp_path, path)
+    
+    def _embed_chunks(self, chunk_articles, batch_size: int):
+        """Split articles into overlapping passages and embed them for the chunk index"""
+        chunk_size = self.chunking.get('chunk_size', 200)
+        chunk_overlap = self.chunking.get('chunk_overlap', 50)
+        
+        chunk_documents = []
+        chunk_texts = []
+        chunk_metadatas = []
+        chunk_ids = []
+        
+        for article_id, article, metadata in chunk_articles:
+            passages = _split_passages(article.content, chunk_size, chunk_overlap)
+            for k, passage in enumerate(passages):
+                chunk_documents.append(passage)
+                # Prefix the title so each passage keeps the article's context
+                chunk_texts.append(f"{article.title}\n\n{passage}")
+                chunk_metadatas.append({
+                    'type': 'chunk',
+                    'parent_article': article_id,
+                    'chunk_index': k,
+                    'content_hash': metadata['content_hash']
+                })
+                chunk_ids.append(f"chunk_{article_id[len('article_'):]}_{k}")
+        
+        chunk_embeddings = []
+        if chunk_documents:
+            chunk_embeddings = self.text_model.encode(
+                chunk_texts,
+                batch_size=batch_size,
+                show_progress_bar=False
+            )
+        
+        return {
+            'parent_ids': [article_id for article_id, _, _ in chunk_articles],
+            'documents': chunk_documents,
+            'metadatas': chunk_metadatas,
+            'ids': chunk_ids,
+            'embeddings': chunk_embeddings
+        }
+    
+    def _delete_chunks(self, chunk_ids: List[str]) -> int:
+        """Delete passages from the chunk index"""
+        batch_size = self.client.get_max_batch_size()
+        for start in range(0, len(chunk_ids), batch_size):
+            self.chunk_collection.delete(ids=chunk_ids[start:start + batch_size])
+        return len(chunk_ids)
+    
+    @staticmethod
+    def article_id(url: str) -> str:
+        """Stable record ID for an article URL"""
+        return f"article_{_hash_text(url)[:16]}"
+    
+    def iter_metadatas(self, collection):
+        """Yield (id, metadata) for every record in a collection"""
+        batch_size = self.client.get_max_batch_size()
+        offset = 0
+        while True:
+            records = collection.get(include=['metadatas'], limit=batch_size, offset=offset)
+            if not records['ids']:
+                break
+            yield from zip(records['ids'], records['metadatas'])
+            offset += len(records['ids'])
+    
+    def model_keys(self) -> Dict[str, str]:
+        """Keys ('name:backend') of the text and image models; embeddings under different keys don't mix"""
+        return {'text': self._text_cache_key, 'image': self._clip_cache_key}
+    
+    @property
+    def text_model_loaded(self) -> bool:
+        """Whether the text model has been loaded (it is loaded on first use)"""
+        return self._text_model is not None
+    
+    def replace_collection(self, collection, ids: List[str], embeddings, metadatas: List[Dict], documents=None):
+        """Make a collection hold exactly the given records, deleting all others"""
+        records = {'ids': ids, 'embeddings': embeddings, 'metadatas': metadatas}
+        if documents is not None:
+            records['documents'] = documents
+        if ids:
+            self._upsert(collection, **records)
+        self._delete_missing(collection, set(ids))
+    
+    def _upsert(self, collection, **records):
+        """Upsert records in chunks that fit Chroma's maximum batch size"""
+        batch_size = self.client.get_max_batch_size()
+        total = len(records['ids'])
+        for start in range(0, total, batch_size):
+            collection.upsert(**{key: values[start:start + batch_size] for key, values in records.items()})
+    
+    def _update(self, collection, **records):
+        """Update records in chunks that fit Chroma's maximum batch size"""
+        batch_size = self.client.get_max_batch_size()
+        for start in range(0, len(records['ids']), batch_size):
+            collection.update(**{key: values[start:start + batch_size] for key, values in records.items()})
+    
+    def _delete_missing(self, collection, keep_ids) -> int:
+        """Delete records whose ID is not in keep_ids"""
+        stale_ids = [
+            record_id for record_id, _ in self.iter_metadatas(collection)
+            if record_id not in keep_ids
+        ]
+        batch_size = self.client.get_max_batch_size()
+        for start in range(0, len(stale_ids), batch_size):
+            collection.delete(ids=stale_ids[start:start + batch_size])
+        if stale_ids:
+            logging.info(f"Deleted {len(stale_ids)} stale records from {collection.name}")
+        return len(stale_ids)
+    
+    def _load_image(self, image_path: str):
+        """Decode an image from disk"""
+        try:
+            return Image.open(image_path).convert('RGB')
         except Exception as e:
-            logging.error(f"Error encoding image {image_path}: {e}")
+            logging.error(f"Error processing image {image_path}: {e}")
             return None
+    
+    def _encode_images(self, image_paths: List[str], batch_size: int = 16):
+        """Encode images using CLIP in batches.
+        
+        Returns the normalized embeddings and the indices of image_paths
+        that were encoded successfully.
+        """
+        if self.clip_encoder is None:
+            logging.warning("CLIP model not available, skipping image encoding")
+            return np.zeros((0, self.image_dim), dtype=np.float32), []
+        
+        all_features = []
+        encoded = []
+        
+        with ThreadPoolExecutor(max_workers=min(batch_size, 8)) as pool:
+            for start in range(0, len(image_paths), batch_size):
+                batch_paths = image_paths[start:start + batch_size]
+                
+                # Decode the batch in parallel, dropping unreadable images
+                batch_images = []
+                batch_indices = []
+                for k, image in enumerate(pool.map(self._load_image, batch_paths)):
+                    if image is not None:
+                        batch_images.append(image)
+                        batch_indices.append(start + k)
+                
+                if not batch_images:
+                    continue
+                
+                try:
+                    all_features.append(self.clip_encoder.encode_images(batch_images))
+                    encoded.extend(batch_indices)
+                    
+                except Exception as e:
+                    logging.error(f"Error encoding image batch starting at {batch_paths[0]}: {e}")
+        
+        if not all_features:
+            return np.zeros((0, self.image_dim), dtype=np.float32), []
+        
+        return np.concatenate(all_features), encoded
+    
+    def _encode_image(self, image_path: str):
+        """Encode a single image using CLIP"""
+        embeddings, encoded = self._encode_images([image_path], batch_size=1)
+        return embeddings[0] if encoded else None
      
-    def search(self, query: str, n_results: int = 5, include_images: bool = True):
+    def search(self, query: str, n_results: int = 5, include_images: bool = True, mode: str = 'vector'):
         """Search for relevant content"""
-        # Generate query embedding for text search
-        query_embedding = self.text_model.encode(query)
-        
-        # Search in text collection
-        text_results = self.text_collection.query(
-            query_embeddings=[query_embedding.tolist()],
-            n_results=n_results,
-            include=['documents', 'metadatas', 'distances']
-        )
+        return self.search_many([query], n_results=n_results, include_images=include_images, mode=mode)[0]
+    
+    def search_many(self, queries: List[str], n_results: int = 5, include_images: bool = True,
+                    mode: str = 'vector'):
+        """Search for several queries at once.
         
-        processed_results = []
+        All queries are embedded in one batch per encoder and sent to each
+        collection as a single multi-embedding query. The text and image
+        branches run concurrently. Returns one result list per query.
         
-        # Process text results
-        for doc, metadata, distance in zip(
-            text_results['documents'][0],
-            text_results['metadatas'][0], 
-            text_results['distances'][0]
-        ):
-            processed_results.append({
-                'type': 'text',
-                'content': doc,
-                'metadata': metadata,
-                'similarity': 1 - distance,
-                'images': json.loads(metadata['images']) if include_images else []
+        mode selects 'vector' (embedding) search, 'lexical' BM25 search over
+        articles, which loads no model and returns no image hits, or
+        'hybrid', which fuses both rankings and the image ranking with
+        reciprocal rank fusion.
+        
+        Hits carry metadata but not the article text; pass the ones that
+        are displayed or used as LLM context to hydrate().
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode: {mode}")
+        if not queries:
+            return []
+        
+        with metrics.trace('search'):
+            return self._search_many(queries, n_results, include_images, mode)
+    
+    def _search_many(self, queries: List[str], n_results: int, include_images: bool, mode: str):
+        if mode == 'lexical':
+            return self._search_lexical(queries, n_results, include_images)
+        
+        # The image branch (CLIP encode + image query) overlaps with the text branch
+        image_future = None
+        if include_images and n_results // 2 > 0:
+            image_future = self._executor.submit(metrics.bind(self._search_images), queries, n_results // 2)
+        
+        # Generate query embeddings for text search
+        query_embeddings = self.embed_queries(queries)
+        
+        if self.chunk_collection is not None:
+            all_results = self._search_chunks(query_embeddings, n_results, include_images)
+        else:
+            all_results = self._search_text(query_embeddings, n_results, include_images)
+        
+        if mode == 'hybrid':
+            with metrics.span('search.fuse'):
+                all_results = self._fuse_lexical(queries, query_embeddings, all_results, n_results, include_images)
+        
+        if image_future is not None:
+            with metrics.span('search.wait_images'):
+                image_results_per_query = image_future.result()
+            for processed_results, image_results in zip(all_results, image_results_per_query):
+                if mode == 'hybrid':
+                    for rank, result in enumerate(image_results):
+                        result['score'] = 1 / (self.rrf_k + rank + 1)
+                processed_results.extend(image_results)
+        
+        # Sort by similarity (fused score in hybrid mode) and return top results
+        sort_key = 'score' if mode == 'hybrid' else 'similarity'
+        for processed_results in all_results:
+            processed_results.sort(key=lambda x: x[sort_key], reverse=True)
+        return [processed_results[:n_results] for processed_results in all_results]
+    
+    def _fetch_articles(self, article_ids: List[str], include_embeddings: bool = False):
+        """Metadata (and optionally embeddings) of articles by ID"""
+        include = ['metadatas'] + (['embeddings'] if include_embeddings else [])
+        records = self.text_collection.get(ids=article_ids, include=include)
+        embeddings = records['embeddings'] if include_embeddings else [None] * len(records['ids'])
+        return {
+            record_id: (metadata, embedding)
+            for record_id, metadata, embedding in zip(records['ids'], records['metadatas'], embeddings)
+        }
+    
+    def hydrate(self, results: List[dict]) -> List[dict]:
+        """Fill in the article text of search results, in place.
+        
+        Search returns hits without article bodies; call this for the
+        results that are displayed or packed into the LLM context. Text
+        hits get 'content' and, when the search included images, their
+        'images'; image hits get their parent article's title and URL in
+        'metadata' and a 'content' caption.
+        """
+        with metrics.span('search.hydrate'):
+            text_ids = [r['id'] for r in results if r['type'] == 'text' and 'content' not in r]
+            documents = self.documents.get(text_ids) if text_ids else {}
+            image_ids = [r['id'] for r in results if r['type'] == 'text' and r.get('images') is None]
+            images = self.documents.get_images(image_ids) if image_ids else {}
+            
+            parent_ids = list({
+                r['metadata']['parent_article'] for r in results
+                if r['type'] == 'image' and 'content' not in r and 'title' not in r['metadata']
             })
+            parents = self._fetch_articles(parent_ids) if parent_ids else {}
+            
+            for result in results:
+                if result['type'] == 'text' and result.get('images') is None:
+                    result['images'] = images.get(result['id'], [])
+                if 'content' in result:
+                    continue
+                if result['type'] == 'text':
+                    result['content'] = documents.get(result['id'], '')
+                elif result['type'] == 'image':
+                    if result['metadata']['parent_article'] in parents:
+                        parent, _ = parents[result['metadata']['parent_article']]
+                        result['metadata'] = {**result['metadata'], 'title': parent['title'], 'url': parent['url']}
+                    result['content'] = f"Image from: {result['metadata'].get('title', '')}"
+        return results
+    
+    def _search_lexical(self, queries: List[str], n_results: int, include_images: bool):
+        """BM25 search over articles; similarity is the score relative to the best hit"""
+        if self.lexical_index is None:
+            raise ValueError("Lexical search needs database.lexical.enabled")
         
-        # Search in image collection if requested and CLIP is available
-        if include_images and self.clip_model is not None:
-            try:
-                # Generate image query embedding using CLIP text encoder
-                text_inputs = self.clip_processor(text=[query], return_tensors="pt", padding=True).to(self.device)
-                with torch.no_grad():
-                    text_features = self.clip_model.get_text_features(**text_inputs)
-                    text_features = text_features / text_features.norm(dim=-1, keepdim=True)
-                
-                image_query_embedding = text_features.cpu().numpy()[0]
-                
+        with metrics.span('search.bm25'):
+            all_hits = [self.lexical_index.search(query, n_results) for query in queries]
+        article_ids = list({article_id for hits in all_hits for article_id, _ in hits})
+        with metrics.span('search.fetch_articles'):
+            articles = self._fetch_articles(article_ids) if article_ids else {}
+        
+        all_results = []
+        for hits in all_hits:
+            processed_results = []
+            for article_id, score in hits:
+                if article_id not in articles:
+                    continue
+                metadata, _ = articles[article_id]
+                processed_results.append({
+                    'type': 'text',
+                    'id': article_id,
+                    'metadata': metadata,
+                    'similarity': score / hits[0][1],
+                    'score': score,
+                    'images': None if include_images else []
+                })
+            all_results.append(processed_results)
+        
+        return all_results
+    
+    def _fuse_lexical(self, queries: List[str], query_embeddings, all_results, n_results: int, include_images: bool):
+        """Merge BM25 hits into vector text results with reciprocal rank fusion.
+        
+        Every result gets a fused 'score'; articles found only lexically
+        get their cosine similarity from the stored embedding, or from
+        their best passages when the passage index is enabled, so they are
+        scored like the vector hits they are ranked against.
+        """
+        all_hits = [
+            self.lexical_index.search(query, n_results) if self.lexical_index is not None else []
+            for query in queries
+        ]
+        
+        missing = list({
+            article_id
+            for hits, results in zip(all_hits, all_results)
+            for article_id, _ in hits
+            if article_id not in {result['id'] for result in results}
+        })
+        articles = self._fetch_articles(missing, include_embeddings=True) if missing else {}
+        passages = self._fetch_passages(missing) if missing and self.chunk_collection is not None else {}
+        max_passages = self.chunking.get('max_passages_per_result', 3)
+        
+        fused_results = []
+        for query_embedding, hits, results in zip(query_embeddings, all_hits, all_results):
+            by_id = {}
+            for rank, result in enumerate(results):
+                result['score'] = 1 / (self.rrf_k + rank + 1)
+                by_id[result['id']] = result
+            
+            for rank, (article_id, _) in enumerate(hits):
+                if article_id not in by_id:
+                    if article_id not in articles:
+                        continue
+                    metadata, embedding = articles[article_id]
+                    by_id[article_id] = {
+                        'type': 'text',
+                        'id': article_id,
+                        'metadata': metadata,
+                        'score': 0.0,
+                        'images': None if include_images else []
+                    }
+                    if article_id in passages:
+                        # Best passages first, as in _search_chunks
+                        texts, embeddings = passages[article_id]
+                        similarities = _cosine_similarities(query_embedding, embeddings)
+                        order = np.argsort(-similarities)[:max_passages]
+                        by_id[article_id]['similarity'] = float(similarities[order[0]])
+                        by_id[article_id]['passages'] = [texts[k] for k in order]
+                    else:
+                        by_id[article_id]['similarity'] = float(
+                            _cosine_similarities(query_embedding, [embedding])[0]
+                        )
+                by_id[article_id]['score'] += 1 / (self.rrf_k + rank + 1)
+            
+            fused_results.append(list(by_id.values()))
+        
+        return fused_results
+    
+    def _fetch_passages(self, article_ids: List[str]):
+        """Passages of articles from the chunk index: {article_id: (texts, embeddings)}"""
+        with metrics.span('search.fetch_passages'):
+            records = self.chunk_collection.get(
+                where={'parent_article': {'$in': article_ids}},
+                include=['documents', 'metadatas', 'embeddings']
+            )
+        passages = {}
+        for passage, metadata, embedding in zip(records['documents'], records['metadatas'], records['embeddings']):
+            texts, embeddings = passages.setdefault(metadata['parent_article'], ([], []))
+            texts.append(passage)
+            embeddings.append(embedding)
+        return passages
+    
+    def _search_text(self, query_embeddings, n_results: int, include_images: bool):
+        """Query the article collection, one result list per query embedding"""
+        with metrics.span('search.text_query'):
+            text_results = self.text_collection.query(
+                query_embeddings=query_embeddings,
+                n_results=n_results,
+                include=['metadatas', 'distances']
+            )
+        
+        with metrics.span('search.decode'):
+            return self._text_results(text_results, include_images)
+    
+    def _text_results(self, text_results, include_images: bool):
+        """Result dicts from a text collection query"""
+        all_results = []
+        for ids, metadatas, distances in zip(
+            text_results['ids'],
+            text_results['metadatas'],
+            text_results['distances']
+        ):
+            processed_results = []
+            for article_id, metadata, distance in zip(ids, metadatas, distances):
+                processed_results.append({
+                    'type': 'text',
+                    'id': article_id,
+                    'metadata': metadata,
+                    'similarity': 1 - distance,
+                    'images': None if include_images else []
+                })
+            all_results.append(processed_results)
+        
+        return all_results
+    
+    def _search_images(self, queries: List[str], n_results: int):
+        """Query the image collection with CLIP text embeddings, one result list per query"""
+        # Checking clip_encoder here keeps a first-time CLIP load off the text branch
+        with metrics.span('search.clip_load'):
+            clip_encoder = self.clip_encoder
+        if clip_encoder is None:
+            return [[] for _ in queries]
+        
+        try:
+            # Generate image query embeddings using CLIP text encoder
+            image_query_embeddings = self.embed_clip_queries(queries)
+            
+            with metrics.span('search.image_query'):
                 image_results = self.image_collection.query(
-                    query_embeddings=[image_query_embedding.tolist()],
-                    n_results=n_results // 2,  # Limit image results
-                    include=['documents', 'metadatas', 'distances']
+                    query_embeddings=image_query_embeddings,
+                    n_results=n_results,
+                    include=['metadatas', 'distances']
                 )
-                
-                # Process image results
-                for doc, metadata, distance in zip(
-                    image_results['documents'][0],
-                    image_results['metadatas'][0],
-                    image_results['distances'][0]
-                ):
-                    processed_results.append({
-                        'type': 'image',
-                        'content': doc,
-                        'metadata': metadata,
-                        'similarity': 1 - distance,
-                        'image_path': metadata['image_path']
-                    })
-                    
-            except Exception as e:
-                logging.error(f"Error searching images: {e}")
+        except Exception as e:
+            logging.error(f"Error searching images: {e}")
+            return [[] for _ in queries]
+        
+        all_results = []
+        for ids, metadatas, distances in zip(
+            image_results['ids'],
+            image_results['metadatas'],
+            image_results['distances']
+        ):
+            processed_results = []
+            for image_id, metadata, distance in zip(ids, metadatas, distances):
+                processed_results.append({
+                    'type': 'image',
+                    'id': image_id,
+                    'metadata': metadata,
+                    'similarity': 1 - distance,
+                    'image_path': metadata['image_path']
+                })
+            all_results.append(processed_results)
+        
+        return all_results
+    
+    def _embed_cached(self, model_name: str, queries: List[str], encode):
+        """Embed queries, encoding only cache misses and in a single batch"""
+        if self.query_cache is None:
+            return encode(queries)
+        
+        embeddings = [self.query_cache.get(model_name, query) for query in queries]
+        missing = [k for k, embedding in enumerate(embeddings) if embedding is None]
+        
+        if missing:
+            encoded = encode([queries[k] for k in missing])
+            for k, embedding in zip(missing, encoded):
+                self.query_cache.put(model_name, queries[k], embedding)
+                embeddings[k] = embedding
         
-        # Sort by similarity and return top results
-        processed_results.sort(key=lambda x: x['similarity'], reverse=True)
-        return processed_results[:n_results]
+        return np.stack(embeddings)
+    
+    def embed_queries(self, queries: List[str]):
+        """Text-model query embeddings, served from the query cache when possible"""
+        with metrics.span('search.text_encode'):
+            return self._embed_cached(
+                self._text_cache_key,
+                queries,
+                lambda texts: self.text_model.encode(texts, show_progress_bar=False)
+            )
+    
+    def embed_clip_queries(self, queries: List[str]):
+        """CLIP text-tower query embeddings, served from the query cache when possible"""
+        with metrics.span('search.clip_text_encode'):
+            return self._embed_cached(self._clip_cache_key, queries, self._encode_clip_texts)
+    
+    def _encode_clip_texts(self, queries: List[str]):
+        """Encode queries with the CLIP text encoder"""
+        return self.clip_encoder.encode_texts(queries)
+    
+    def _search_chunks(self, query_embeddings, n_results: int, include_images: bool):
+        """Search the passage index and group matching passages by parent article"""
+        candidates = n_results * self.chunking.get('candidates_per_result', 4)
+        max_passages = self.chunking.get('max_passages_per_result', 3)
+        with metrics.span('search.chunk_query'):
+            chunk_results = self.chunk_collection.query(
+                query_embeddings=query_embeddings,
+                n_results=candidates,
+                include=['documents', 'metadatas', 'distances']
+            )
+        
+        # Hits come back best-first, so the first passage seen sets the article score
+        all_grouped = []
+        for documents, metadatas, distances in zip(
+            chunk_results['documents'],
+            chunk_results['metadatas'],
+            chunk_results['distances']
+        ):
+            grouped = {}
+            for passage, metadata, distance in zip(documents, metadatas, distances):
+                parent_id = metadata['parent_article']
+                if parent_id not in grouped:
+                    if len(grouped) == n_results:
+                        continue
+                    grouped[parent_id] = {'similarity': 1 - distance, 'passages': []}
+                if len(grouped[parent_id]['passages']) < max_passages:
+                    grouped[parent_id]['passages'].append(passage)
+            all_grouped.append(grouped)
+        
+        # Fetch every parent article once, across all queries
+        parent_ids = list({parent_id for grouped in all_grouped for parent_id in grouped})
+        parents = {}
+        if parent_ids:
+            with metrics.span('search.fetch_articles'):
+                records = self.text_collection.get(ids=parent_ids, include=['metadatas'])
+            parents = dict(zip(records['ids'], records['metadatas']))
+        
+        all_results = []
+        for grouped in all_grouped:
+            processed_results = []
+            for parent_id, group in grouped.items():
+                if parent_id not in parents:
+                    continue
+                metadata = parents[parent_id]
+                processed_results.append({
+                    'type': 'text',
+                    'id': parent_id,
+                    'metadata': metadata,
+                    'similarity': group['similarity'],
+                    'passages': group['passages'],
+                    'images': None if include_images else []
+                })
+            all_results.append(processed_results)
+        
+        return all_results
     
     def get_stats(self):
         """Get database statistics"""
         text_count = self.text_collection.count()
         image_count = self.image_collection.count()
         
-        return {
+        stats = {
             'total_documents': text_count + image_count,
             'text_documents': text_count,
             'image_documents': image_count,
@@ -222,4 +1306,10 @@ class MultimodalDatabase:
                 'text': text_count,
                 'image': image_count
             }
-        }
\ No newline at end of file
+        }
+        if self.chunk_collection is not None:
+            stats['passages'] = self.chunk_collection.count()
+        if self.query_cache is not None:
+            stats['query_cache'] = self.query_cache.stats()
+        
+        return stats
\ No newline at end of file
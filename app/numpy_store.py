@@ -0,0 +1,401 @@
+import logging
+import os
+import pickle
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Upper bound on records per call; there is no backend limit, but callers page by it
+MAX_BATCH_SIZE = 100000
+
+_OPERATORS = {
+    '$eq': lambda value, target: value == target,
+    '$ne': lambda value, target: value != target,
+    '$gt': lambda value, target: value is not None and value > target,
+    '$gte': lambda value, target: value is not None and value >= target,
+    '$lt': lambda value, target: value is not None and value < target,
+    '$lte': lambda value, target: value is not None and value <= target,
+    '$in': lambda value, target: value in target,
+    '$nin': lambda value, target: value not in target
+}
+
+
+def _matches(metadata: Dict, where: Dict) -> bool:
+    """Evaluate a Chroma-style metadata filter"""
+    for key, condition in where.items():
+        if key == '$and':
+            if not all(_matches(metadata, clause) for clause in condition):
+                return False
+        elif key == '$or':
+            if not any(_matches(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for operator, target in condition.items():
+                if operator not in _OPERATORS:
+                    raise ValueError(f"Unsupported filter operator: {operator}")
+                if not _OPERATORS[operator](value, target):
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+def _normalize(embeddings) -> np.ndarray:
+    """float32 rows scaled to unit length, so a dot product is the cosine similarity"""
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class NumpyCollection:
+    """Collection with exact cosine search over a memory-mapped embedding matrix.
+
+    Implements the part of the Chroma collection API the database uses.
+    Normalized embeddings live in one contiguous float32 .npy file that is
+    memory-mapped on load; IDs, documents and metadata are kept in a pickled
+    side table. A query is a single matrix product plus top-k selection.
+    Writes build new arrays and replace both files, so searches running
+    concurrently keep using the previous snapshot. With deferred writes
+    (see NumpyClient.defer_writes) changes stay in memory until flush().
+    """
+
+    def __init__(self, directory: str, name: str):
+        self.name = name
+        self.directory = directory
+        self._lock = threading.Lock()
+
+        self._ids = []
+        self._documents = []
+        self._metadatas = []
+        self._index = {}
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._vectors_file = None
+        self.deferred = False
+        self._unsaved = False
+
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    @property
+    def _records_path(self) -> str:
+        return os.path.join(self.directory, 'records.pkl')
+
+    def _load(self):
+        if not os.path.exists(self._records_path):
+            return
+
+        with open(self._records_path, 'rb') as f:
+            records = pickle.load(f)
+
+        vectors = np.zeros((0, 0), dtype=np.float32)
+        if records['vectors_file']:
+            vectors = np.load(os.path.join(self.directory, records['vectors_file']), mmap_mode='r')
+        if vectors.shape[0] != len(records['ids']):
+            raise ValueError(f"Collection {self.name}: {len(records['ids'])} records but {vectors.shape[0]} vectors")
+
+        self._ids = records['ids']
+        self._documents = records['documents']
+        self._metadatas = records['metadatas']
+        self._index = {record_id: row for row, record_id in enumerate(self._ids)}
+        self._vectors = vectors
+        self._vectors_file = records['vectors_file']
+
+    def _save(self, ids, documents, metadatas, vectors):
+        """Make a new state current and persist it, unless writes are deferred"""
+        if self.deferred:
+            self._ids = ids
+            self._documents = documents
+            self._metadatas = metadatas
+            self._index = {record_id: row for row, record_id in enumerate(ids)}
+            self._vectors = vectors
+            self._unsaved = True
+            return
+        self._persist(ids, documents, metadatas, vectors)
+
+    def flush(self):
+        """Persist changes held in memory by deferred writes"""
+        with self._lock:
+            if self._unsaved:
+                self._persist(self._ids, self._documents, self._metadatas, self._vectors)
+
+    def _persist(self, ids, documents, metadatas, vectors):
+        """Write a state to disk and make it current.
+
+        The vectors go to a new file first; replacing the side table, which
+        names that file, commits the write.
+        """
+        vectors_file = None
+        if len(ids):
+            vectors_file = f"embeddings-{time.time_ns()}.npy"
+            np.save(os.path.join(self.directory, vectors_file), vectors)
+
+        tmp_path = f"{self._records_path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({
+                'ids': ids,
+                'documents': documents,
+                'metadatas': metadatas,
+                'vectors_file': vectors_file
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self._records_path)
+
+        previous_file = self._vectors_file
+        self._ids = ids
+        self._documents = documents
+        self._metadatas = metadatas
+        self._index = {record_id: row for row, record_id in enumerate(ids)}
+        self._vectors = np.load(os.path.join(self.directory, vectors_file), mmap_mode='r') if vectors_file else vectors
+        self._vectors_file = vectors_file
+        self._unsaved = False
+
+        if previous_file:
+            try:
+                os.remove(os.path.join(self.directory, previous_file))
+            except OSError:
+                # Still mapped by a reader on platforms that don't allow removing it
+                logging.warning(f"Could not remove old embeddings file {previous_file}")
+
+    def _snapshot(self):
+        with self._lock:
+            return self._ids, self._documents, self._metadatas, self._index, self._vectors
+
+    def count(self) -> int:
+        return len(self._ids)
+
+    def _write(self, ids: List[str], embeddings=None, documents=None, metadatas=None,
+               insert: bool = True, overwrite: bool = True, merge_metadata: bool = False):
+        with self._lock:
+            all_ids = list(self._ids)
+            all_documents = list(self._documents)
+            all_metadatas = list(self._metadatas)
+            index = dict(self._index)
+            vectors = np.array(self._vectors, dtype=np.float32)
+
+            new_vectors = _normalize(embeddings) if embeddings is not None and len(embeddings) else None
+            if new_vectors is not None and len(all_ids) and new_vectors.shape[1] != vectors.shape[1]:
+                raise ValueError(
+                    f"Collection {self.name}: embedding dimension {new_vectors.shape[1]}, expected {vectors.shape[1]}"
+                )
+
+            appended = []
+            for k, record_id in enumerate(ids):
+                document = documents[k] if documents is not None else None
+                metadata = metadatas[k] if metadatas is not None else None
+                row = index.get(record_id)
+
+                if row is None:
+                    if not insert:
+                        continue
+                    if new_vectors is None:
+                        raise ValueError(f"Collection {self.name}: new record {record_id} needs an embedding")
+                    index[record_id] = len(all_ids)
+                    all_ids.append(record_id)
+                    all_documents.append(document)
+                    all_metadatas.append(dict(metadata or {}))
+                    appended.append(k)
+                    continue
+
+                if not overwrite:
+                    continue
+                if new_vectors is not None:
+                    vectors[row] = new_vectors[k]
+                if documents is not None:
+                    all_documents[row] = document
+                if metadatas is not None:
+                    if merge_metadata:
+                        merged = {**all_metadatas[row], **metadata}
+                        all_metadatas[row] = {key: value for key, value in merged.items() if value is not None}
+                    else:
+                        all_metadatas[row] = dict(metadata or {})
+
+            if appended:
+                rows = new_vectors[appended]
+                vectors = rows if vectors.shape[0] == 0 else np.concatenate([vectors, rows])
+
+            self._save(all_ids, all_documents, all_metadatas, vectors)
+
+    def add(self, ids: List[str], embeddings=None, documents=None, metadatas=None):
+        """Insert records; existing IDs are left unchanged"""
+        self._write(ids, embeddings, documents, metadatas, overwrite=False)
+
+    def upsert(self, ids: List[str], embeddings=None, documents=None, metadatas=None):
+        """Insert records or replace the existing ones"""
+        self._write(ids, embeddings, documents, metadatas)
+
+    def update(self, ids: List[str], embeddings=None, documents=None, metadatas=None):
+        """Change existing records; metadata keys are merged and None values removed"""
+        self._write(ids, embeddings, documents, metadatas, insert=False, merge_metadata=True)
+
+    def _rows(self, ids, where, metadatas, index) -> List[int]:
+        if ids is not None:
+            rows = [index[record_id] for record_id in ids if record_id in index]
+        else:
+            rows = range(len(metadatas))
+        if where:
+            rows = [row for row in rows if _matches(metadatas[row], where)]
+        return list(rows)
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict] = None):
+        with self._lock:
+            rows = self._rows(ids, where, self._metadatas, self._index)
+            if not rows:
+                return
+            keep = np.ones(len(self._ids), dtype=bool)
+            keep[rows] = False
+            kept_rows = np.flatnonzero(keep)
+            self._save(
+                [self._ids[row] for row in kept_rows],
+                [self._documents[row] for row in kept_rows],
+                [self._metadatas[row] for row in kept_rows],
+                np.array(self._vectors[kept_rows], dtype=np.float32)
+            )
+
+    def _fields(self, rows, include, documents, metadatas, vectors) -> Dict:
+        fields = {}
+        if 'documents' in include:
+            fields['documents'] = [documents[row] for row in rows]
+        if 'metadatas' in include:
+            fields['metadatas'] = [dict(metadatas[row]) for row in rows]
+        if 'embeddings' in include:
+            fields['embeddings'] = np.array(vectors[rows]) if len(rows) else np.zeros((0, vectors.shape[1]), dtype=np.float32)
+        return fields
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict] = None, limit: Optional[int] = None,
+            offset: Optional[int] = None, include=('metadatas', 'documents')) -> Dict:
+        all_ids, documents, metadatas, index, vectors = self._snapshot()
+        rows = self._rows(ids, where, metadatas, index)
+        rows = rows[offset or 0:]
+        if limit is not None:
+            rows = rows[:limit]
+
+        return {'ids': [all_ids[row] for row in rows], **self._fields(rows, include, documents, metadatas, vectors)}
+
+    def query(self, query_embeddings, n_results: int = 10, where: Optional[Dict] = None,
+              include=('metadatas', 'documents', 'distances')) -> Dict:
+        """Exact nearest neighbours by cosine distance, one result list per query embedding"""
+        all_ids, documents, metadatas, index, vectors = self._snapshot()
+        queries = _normalize(query_embeddings)
+        results = {'ids': []}
+        for key in include:
+            results[key] = []
+
+        candidates = None
+        if where:
+            candidates = np.array(self._rows(None, where, metadatas, index), dtype=np.int64)
+        matrix = vectors if candidates is None else vectors[candidates]
+        k = min(n_results, matrix.shape[0])
+
+        if k == 0:
+            for key in results:
+                results[key] = [[] for _ in queries]
+            return results
+
+        similarities = queries @ matrix.T
+        if k < matrix.shape[0]:
+            top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        else:
+            top = np.tile(np.arange(matrix.shape[0]), (len(queries), 1))
+        order = np.argsort(-np.take_along_axis(similarities, top, axis=1), axis=1, kind='stable')
+        top = np.take_along_axis(top, order, axis=1)
+
+        for query_row, query_top in enumerate(top):
+            rows = query_top if candidates is None else candidates[query_top]
+            results['ids'].append([all_ids[row] for row in rows])
+            if 'distances' in include:
+                results['distances'].append((1 - similarities[query_row, query_top]).tolist())
+            for key, values in self._fields(rows, include, documents, metadatas, vectors).items():
+                results[key].append(values)
+
+        return results
+
+
+class NumpyClient:
+    """Stand-in for chromadb.PersistentClient keeping each collection in its own directory"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._collections = {}
+        self._lock = threading.Lock()
+        self._deferred = False
+        os.makedirs(path, exist_ok=True)
+
+    def get_or_create_collection(self, name: str, metadata: Optional[Dict] = None) -> NumpyCollection:
+        space = (metadata or {}).get('hnsw:space', 'cosine')
+        if space != 'cosine':
+            raise ValueError(f"The numpy vector store only supports cosine distance, not {space}")
+
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = NumpyCollection(os.path.join(self.path, name), name)
+                self._collections[name].deferred = self._deferred
+            return self._collections[name]
+
+    def defer_writes(self, deferred: bool = True):
+        """Keep writes in memory until flush(), instead of rewriting the files on every write.
+
+        Turning deferral off flushes pending changes.
+        """
+        with self._lock:
+            self._deferred = deferred
+            collections = list(self._collections.values())
+        for collection in collections:
+            collection.deferred = deferred
+            if not deferred:
+                collection.flush()
+
+    def flush(self):
+        """Persist the pending changes of every collection"""
+        with self._lock:
+            collections = list(self._collections.values())
+        for collection in collections:
+            collection.flush()
+
+    def get_max_batch_size(self) -> int:
+        return MAX_BATCH_SIZE
+
+
+def migrate_from_chroma(source_directory: str, target_directory: str, collection_prefix: str) -> Dict[str, int]:
+    """Copy every Chroma collection whose name starts with collection_prefix into a numpy store.
+
+    Returns the number of records copied per collection.
+    """
+    import chromadb
+
+    source = chromadb.PersistentClient(path=source_directory)
+    target = NumpyClient(target_directory)
+    batch_size = source.get_max_batch_size()
+
+    copied = {}
+    for collection in source.list_collections():
+        # Older chromadb versions list names instead of collection objects
+        name = getattr(collection, 'name', collection)
+        if not name.startswith(collection_prefix):
+            continue
+
+        source_collection = source.get_collection(name)
+        records = {'ids': [], 'embeddings': [], 'documents': [], 'metadatas': []}
+        offset = 0
+        while True:
+            batch = source_collection.get(
+                include=['embeddings', 'documents', 'metadatas'], limit=batch_size, offset=offset
+            )
+            if not batch['ids']:
+                break
+            for key in records:
+                records[key].extend(batch[key])
+            offset += len(batch['ids'])
+
+        target_collection = target.get_or_create_collection(name)
+        if records['ids']:
+            # One write per collection instead of one per source page
+            target_collection.upsert(**records)
+        copied[name] = len(records['ids'])
+        logging.info(f"Migrated {copied[name]} records from {name}")
+
+    return copied
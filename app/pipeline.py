@@ -0,0 +1,304 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Callable, Iterable, List, Optional
+
+from app.summarizer import matching_summaries, read_progress
+
+_DONE = object()
+
+
+class _Stage:
+    """A pool of worker threads moving items from one bounded queue to the next.
+
+    `func` takes an item (or a list of items when batch_size is set) and
+    returns an iterable of outputs for the next stage. `size` gives the
+    number of articles an input item stands for, for throughput reporting.
+    """
+
+    def __init__(self, name: str, func: Callable, workers: int = 1, batch_size: Optional[int] = None,
+                 size: Optional[Callable] = None):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.batch_size = batch_size
+        self.size = size or (lambda item: 1)
+
+        self.items = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.finished_at = None
+        self._remaining = workers
+        self._lock = threading.Lock()
+
+    def start(self, in_queue: queue.Queue, out_queue: Optional[queue.Queue]) -> List[threading.Thread]:
+        threads = [
+            threading.Thread(
+                target=self._work,
+                args=(in_queue, out_queue),
+                name=f"ingest-{self.name}-{k}",
+                daemon=True
+            )
+            for k in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def _work(self, in_queue: queue.Queue, out_queue: Optional[queue.Queue]):
+        pending = []
+        while True:
+            item = in_queue.get()
+            if item is _DONE:
+                # Leave the marker for sibling workers
+                in_queue.put(_DONE)
+                break
+
+            if self.batch_size:
+                pending.append(item)
+                if len(pending) >= self.batch_size:
+                    self._process(pending, out_queue)
+                    pending = []
+            else:
+                self._process(item, out_queue)
+
+        if pending:
+            self._process(pending, out_queue)
+
+        with self._lock:
+            self._remaining -= 1
+            last_worker = self._remaining == 0
+        if last_worker:
+            self.finished_at = time.perf_counter()
+            if out_queue is not None:
+                out_queue.put(_DONE)
+
+    def _process(self, item, out_queue: Optional[queue.Queue]):
+        count = len(item) if self.batch_size else self.size(item)
+        start = time.perf_counter()
+        try:
+            outputs = list(self.func(item))
+        except Exception as e:
+            logging.error(f"Error in ingest stage '{self.name}': {e}")
+            outputs = None
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.items += count
+            self.busy_seconds += elapsed
+            if outputs is None:
+                self.errors += 1
+                outputs = []
+
+        if out_queue is not None:
+            for output in outputs:
+                out_queue.put(output)
+
+
+class IngestPipeline:
+    """Streaming scrape -> parse -> image download -> embed -> index pipeline.
+
+    Stages run concurrently on their own threads and are connected by
+    bounded queues, so memory stays flat and network-bound stages overlap
+    with the CPU-bound embedding stage. Articles are indexed as soon as
+    their batch is embedded and streamed to articles_path, and saved
+    summaries of unchanged article content are attached to their records.
+    """
+
+    def __init__(self, config, scraper, db, image_dir: str = "data/images",
+                 articles_path: str = "data/processed/articles.json"):
+        self.config = config
+        self.scraper = scraper
+        self.db = db
+        self.image_dir = image_dir
+        self.articles_path = articles_path
+
+        pipeline_config = config.get('pipeline', {})
+        self.queue_size = pipeline_config.get('queue_size', 32)
+        self.parse_workers = pipeline_config.get('parse_workers', 2)
+        self.image_batch_size = pipeline_config.get('image_batch_size', 8)
+        self.embed_batch_size = config.get('embedding', {}).get('text_batch_size', 32)
+        # Index files and the image manifest are saved every flush_every batches and at the end
+        self.flush_every = pipeline_config.get('flush_every', 20)
+        self.summaries_path = config.get('summarization', {}).get('progress_path', './data/processed/summaries.json')
+
+        self._articles_file = None
+        self._articles_written = 0
+        self._seen_text_ids = set()
+        self._seen_image_ids = set()
+        # Articles that could not be fetched or parsed
+        self._dropped = 0
+        self._deleted = 0
+        self._stats_lock = threading.Lock()
+        self._summaries = None
+        self._summaries_attached = 0
+        self._image_batches = 0
+        self._write_batches = 0
+        self._image_stats = {'image_references': 0, 'image_encodes_avoided': 0, 'boilerplate_suppressed': 0}
+
+    def run(self, article_links: Optional[List[str]] = None, incremental: bool = False, prune: Optional[bool] = None):
+        """Run the pipeline and return per-stage statistics.
+        
+        With prune (the default when the links are taken from the site
+        listing) articles and images that are no longer in the corpus are
+        deleted, but only after a run in which every article was indexed.
+        """
+        if prune is None:
+            prune = article_links is None
+        if article_links is None:
+            article_links = self.scraper.get_all_pages_links(self.config['scraping']['base_url'])
+        article_links = article_links[:self.config['scraping']['max_articles']]
+        logging.info(f"Ingesting {len(article_links)} articles")
+
+        existing = self.db.load_existing_hashes() if incremental else None
+
+        stages = [
+            _Stage('fetch', self._fetch, workers=self.scraper.max_workers),
+            _Stage('parse', self._parse, workers=self.parse_workers),
+            _Stage('images', self._download_images, batch_size=self.image_batch_size),
+            _Stage('embed', lambda articles: [(articles, self.db.embed_articles(articles, existing=existing))],
+                   batch_size=self.embed_batch_size),
+            _Stage('write', self._write, size=lambda item: len(item[0]))
+        ]
+
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in stages]
+
+        os.makedirs(os.path.dirname(self.articles_path) or '.', exist_ok=True)
+        self._articles_file = open(self.articles_path, 'w')
+        self._articles_file.write('[')
+
+        start = time.perf_counter()
+        threads = []
+        self.db.defer_writes(True)
+        try:
+            for k, stage in enumerate(stages):
+                out_queue = queues[k + 1] if k + 1 < len(stages) else None
+                threads.extend(stage.start(queues[k], out_queue))
+
+            for link in article_links:
+                queues[0].put(link)
+            queues[0].put(_DONE)
+
+            for thread in threads:
+                thread.join()
+            
+            failures = self._dropped + sum(stage.errors for stage in stages)
+            if prune and failures:
+                logging.warning(f"Not pruning stale records, {failures} articles or batches failed")
+            elif prune:
+                self._deleted = self.db.prune(self._seen_text_ids, self._seen_image_ids)
+        finally:
+            self._articles_file.write('\n]\n')
+            self._articles_file.close()
+            self.scraper.save_manifest(self.image_dir)
+            self.db.defer_writes(False)
+
+        elapsed = time.perf_counter() - start
+        return self._report(stages, start, elapsed)
+
+    def _fetch(self, url: str) -> Iterable:
+        html = self.scraper.fetch_article(url)
+        if html is None:
+            self._count_dropped()
+            return []
+        return [(url, html)]
+
+    def _parse(self, item) -> Iterable:
+        url, html = item
+        article = self.scraper.parse_article(html, url)
+        if not article:
+            self._count_dropped()
+            return []
+        return [article]
+    
+    def _count_dropped(self):
+        with self._stats_lock:
+            self._dropped += 1
+
+    def _download_images(self, articles) -> Iterable:
+        self._image_batches += 1
+        self.scraper.download_images(
+            articles, self.image_dir, save_manifest=self._image_batches % self.flush_every == 0
+        )
+        return articles
+
+    def _write(self, item) -> Iterable:
+        articles, batch = item
+        self.db.write_batch(batch)
+        self._write_batches += 1
+        if self._write_batches % self.flush_every == 0:
+            self.db.flush()
+        self._seen_text_ids.update(batch['seen_text_ids'])
+        self._seen_image_ids.update(batch['seen_image_ids'])
+        self._attach_summaries(articles, batch)
+        for key in self._image_stats:
+            self._image_stats[key] += batch['stats'][key]
+
+        # Stream articles to disk in the same format `scrape` writes
+        for article in articles:
+            separator = ',' if self._articles_written else ''
+            self._articles_file.write(separator + '\n' + json.dumps({
+                'title': article.title,
+                'content': article.content,
+                'url': article.url,
+                'images': article.images,
+                'metadata': article.metadata
+            }))
+            self._articles_written += 1
+        return []
+
+    def _attach_summaries(self, articles, batch):
+        """Store saved summaries on the records rewritten by a batch, which lost theirs"""
+        if not batch['text']:
+            return
+        if self._summaries is None:
+            self._summaries = read_progress(self.summaries_path)
+        if not self._summaries:
+            return
+        rewritten = set(batch['text']['ids'])
+        inputs = []
+        for article in articles:
+            article_id = self.db.article_id(article.url or article.title)
+            if article_id in rewritten:
+                inputs.append({'id': article_id, 'content': article.content})
+        summaries = matching_summaries(self._summaries, inputs)
+        if summaries:
+            self._summaries_attached += self.db.set_summaries(summaries)
+
+    def _report(self, stages: List[_Stage], start: float, elapsed: float):
+        report = {
+            'total_seconds': elapsed,
+            'articles_indexed': len(self._seen_text_ids),
+            'articles_dropped': self._dropped,
+            'summaries_attached': self._summaries_attached,
+            'deleted': self._deleted,
+            'stages': {}
+        }
+        report.update(self._image_stats)
+
+        logging.info(f"Ingested {report['articles_indexed']} articles in {elapsed:.1f}s")
+        logging.info(
+            f"  {report['articles_dropped']} articles not fetched or parsed, "
+            f"{report['summaries_attached']} summaries attached, {report['deleted']} stale records deleted"
+        )
+        logging.info(
+            f"  {report['image_references']} image references, {report['image_encodes_avoided']} "
+            f"encodes avoided by deduplication, {report['boilerplate_suppressed']} boilerplate image references suppressed"
+        )
+        for stage in stages:
+            wall = (stage.finished_at or start) - start
+            rate = stage.items / wall if wall > 0 else 0.0
+            report['stages'][stage.name] = {
+                'items': stage.items,
+                'busy_seconds': stage.busy_seconds,
+                'wall_seconds': wall,
+                'items_per_second': rate
+            }
+            logging.info(
+                f"  {stage.name:<7} {stage.items:>6} items  {rate:8.1f} items/sec  "
+                f"busy {stage.busy_seconds:.1f}s over {wall:.1f}s"
+            )
+        return report
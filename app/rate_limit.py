@@ -0,0 +1,96 @@
+import threading
+import time
+from collections import defaultdict
+from typing import Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError
+from urllib3.util.retry import Retry
+
+
+class TokenBucket:
+    """Thread-safe token bucket limiting how many requests start per second.
+
+    Up to `capacity` requests may start back to back; after that they are
+    spaced out to `rate` per second on average.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available and take it"""
+        if self.rate <= 0:
+            return
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                wait = (1 - self._tokens) / self.rate
+
+            time.sleep(wait)
+
+
+class ThrottledAdapter(HTTPAdapter):
+    """requests transport adapter that applies a shared TokenBucket and a
+    per-host concurrency cap to every request that goes over the network.
+
+    Retries are done here rather than inside urllib3, so every attempt
+    takes a token and the host slot is released while backing off.
+    """
+
+    def __init__(self, rate_limiter: TokenBucket, max_per_host: int, retry: Optional[Retry] = None, **kwargs):
+        self.rate_limiter = rate_limiter
+        self.max_per_host = max_per_host
+        self.retry = retry if retry is not None else Retry(0, read=False)
+        self._host_slots = defaultdict(lambda: threading.BoundedSemaphore(self.max_per_host))
+        self._host_slots_lock = threading.Lock()
+        super().__init__(max_retries=0, **kwargs)
+
+    def send(self, request, **kwargs):
+        host = urlparse(request.url).netloc
+        with self._host_slots_lock:
+            host_slot = self._host_slots[host]
+
+        retry = self.retry
+        while True:
+            response, error = None, None
+            with host_slot:
+                self.rate_limiter.acquire()
+                try:
+                    response = super().send(request, **kwargs)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    error = e
+
+            if response is not None and not retry.is_retry(
+                request.method, response.status_code, 'Retry-After' in response.headers
+            ):
+                return response
+
+            try:
+                retry = retry.increment(
+                    method=request.method, url=request.url,
+                    response=response.raw if response is not None else None, error=error
+                )
+            except MaxRetryError:
+                if error is not None:
+                    raise error
+                return response
+
+            # Back off (or honour Retry-After) without holding the host slot
+            if response is not None:
+                response.close()
+            retry.sleep(response.raw if response is not None else None)
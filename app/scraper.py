@@ -1,8 +1,12 @@
 import requests
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
+import hashlib
 import json
 import os
 import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urljoin, urlparse
 from PIL import Image
 import io
@@ -11,11 +15,10 @@ from typing import List, Optional, Dict
 import logging
 import re
 
-from selenium import webdriver
-from selenium.webdriver.firefox.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.firefox.options import Options
-from webdriver_manager.firefox import GeckoDriverManager
+from app.http_cache import CachingAdapter, ResponseCache
+from app.metrics import metrics
+from app.rate_limit import ThrottledAdapter, TokenBucket
+from app.thumbnails import ThumbnailCache
 
 
 @dataclass
@@ -29,44 +32,106 @@ class Article:
 class BatchScraper:
     def __init__(self, config):
         self.config = config
+        metrics.configure(config.get('metrics'))
+        self.thumbnails = ThumbnailCache(config)
+        # Image manifests by directory, kept between download_images calls
+        self._manifests = {}
+        scraping_config = config['scraping']
+        self.max_workers = scraping_config.get('max_workers', 1)
+        self.timeout = scraping_config.get('timeout_seconds', 15)
+        
         self.session = requests.Session()
         self.session.headers.update({
-            'User-Agent': config['scraping']['user_agent']
+            'User-Agent': scraping_config['user_agent']
         })
         
-    def scrape_articles(self) -> List[Article]:
+        # Pooled connections shared by all workers; the adapter retries with backoff,
+        # taking a rate-limit token for every attempt
+        retry = Retry(
+            total=scraping_config.get('max_retries', 3),
+            backoff_factor=scraping_config.get('backoff_factor', 0.5),
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=['GET', 'HEAD'],
+            respect_retry_after_header=True
+        )
+        
+        # Politeness: a shared requests/sec budget plus a per-host concurrency cap
+        requests_per_second = scraping_config.get('requests_per_second')
+        if requests_per_second is None:
+            delay = scraping_config.get('delay_seconds', 0)
+            requests_per_second = 1 / delay if delay > 0 else 0
+        self.rate_limiter = TokenBucket(
+            rate=requests_per_second,
+            capacity=scraping_config.get('burst', 1)
+        )
+        adapter_kwargs = {
+            'rate_limiter': self.rate_limiter,
+            'max_per_host': scraping_config.get('max_per_host', self.max_workers),
+            'pool_connections': self.max_workers,
+            'pool_maxsize': self.max_workers,
+            'retry': retry
+        }
+        
+        # Optional on-disk response cache; cache hits skip the rate limiter
+        cache_config = scraping_config.get('http_cache', {})
+        self.http_cache = None
+        if cache_config.get('enabled', False):
+            self.http_cache = ResponseCache(
+                directory=cache_config.get('directory', './data/http_cache'),
+                rules=cache_config.get('rules'),
+                default_policy=cache_config.get('default_policy', 'revalidate'),
+                offline=cache_config.get('offline', False)
+            )
+            adapter = CachingAdapter(self.http_cache, **adapter_kwargs)
+        else:
+            adapter = ThrottledAdapter(**adapter_kwargs)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+    
+    def _get(self, url: str, **kwargs) -> requests.Response:
+        """GET through the shared, throttled session"""
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.get(url, **kwargs)
+        
+    def scrape_articles(self, article_links: Optional[List[str]] = None) -> List[Article]:
+        """Scrape articles, collecting links from the listing pages unless given"""
         articles = []
         base_url = self.config['scraping']['base_url']
         
         try:
-            response = self.session.get(base_url)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            article_links = self._get_all_pages_links(base_url)
+            if article_links is None:
+                response = self._get(base_url)
+                response.raise_for_status()
+                
+                article_links = self.get_all_pages_links(base_url)
 
             logging.info(f"Found {len(article_links)} articles to scrape.")
             
-            for i, link in enumerate(article_links[:self.config['scraping']['max_articles']]):
-                try:
-                    article = self._scrape_single_article(link)
+            article_links = article_links[:self.config['scraping']['max_articles']]
+            
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                # map keeps the listing order regardless of completion order
+                for i, (link, article) in enumerate(zip(article_links, pool.map(self._scrape_single_article, article_links))):
                     if article:
                         articles.append(article)
                         logging.info(f"Scraped article {i+1}: {article.title}")
                     
-                    time.sleep(self.config['scraping']['delay_seconds'])
-                    
-                except Exception as e:
-                    logging.error(f"Error scraping article {link}: {e}")
-                    continue
-                    
         except Exception as e:
             logging.error(f"Error scraping main page: {e}")
+        
+        if self.http_cache is not None:
+            cache_stats = self.http_cache.stats()
+            logging.info(
+                f"HTTP cache: {cache_stats['hits']} hits, {cache_stats['revalidated']} revalidated, "
+                f"{cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%} served from cache)"
+            )
             
         return articles
     
 
     def _find_load_more_by_text(self, driver):
+        from selenium.webdriver.common.by import By
+        
         load_more_pattern = 'Load More'
         xpath = f"//div[contains(text(), '{load_more_pattern}')]"
             
@@ -78,9 +143,8 @@ class BatchScraper:
         except:
             logging.error("Error finding Load More button by text.")
 
-    def _get_all_pages_links(self, base_url: str) -> List[str]:
+    def get_all_pages_links(self, base_url: str) -> List[str]:
         """Navigate through all pages and collect article links"""
-
         categories_pages = [
             "",
             "/tag/letters/"
@@ -101,7 +165,7 @@ class BatchScraper:
         for category in categories_pages:
             try:
                 # Find out how many pages total
-                response = self.session.get(f"{base_url}{category}")
+                response = self._get(f"{base_url}{category}")
                 response.raise_for_status()
                 soup = BeautifulSoup(response.content, 'html.parser')
                 match = re.search(r'Page\s+\d+\s+of\s+(\d+)', soup.get_text())
@@ -115,7 +179,7 @@ class BatchScraper:
                     page_url = f"{base_url}{category}/page/{page}/"
                     
                     logging.info(f"Scraping page {page}: {page_url}")
-                    response = self.session.get(page_url)
+                    response = self._get(page_url)
                     response.raise_for_status()
                     soup = BeautifulSoup(response.content, 'html.parser')
                     
@@ -143,13 +207,54 @@ class BatchScraper:
                 logging.error(f"Error scraping pages: {e}")
         
 
-        # Trying to scrape pages with "Load More"
+        # "Load More" categories need a browser, their links are saved with the
+        # HTTP cache so that an offline run can replay them
+        for link in self._load_more_links(base_url, categories_load_more):
+            if link not in all_links:
+                all_links.append(link)
+
+        return all_links
+    
+
+    def _load_more_links(self, base_url: str, categories: List[str]) -> List[str]:
+        """Article links of the "Load More" categories.
+        
+        Collected with Selenium and saved next to the HTTP cache; in offline
+        mode the saved links are used instead.
+        """
+        saved_path = os.path.join(self.http_cache.directory, 'load_more_links.json') if self.http_cache else None
+        if self.http_cache is not None and self.http_cache.offline:
+            if not os.path.exists(saved_path):
+                raise RuntimeError(
+                    f"Offline mode: {saved_path} not found, run an online scrape with the HTTP cache first"
+                )
+            with open(saved_path, 'r') as f:
+                return json.load(f)
+        
+        links = self._collect_load_more_links(base_url, categories)
+        if saved_path:
+            tmp_path = f"{saved_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(links, f)
+            os.replace(tmp_path, saved_path)
+        return links
+    
+    def _collect_load_more_links(self, base_url: str, categories: List[str]) -> List[str]:
+        """Click through the "Load More" categories in headless Firefox"""
+        # Selenium is only needed here, keep it out of module import time
+        from selenium import webdriver
+        from selenium.webdriver.firefox.service import Service
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.firefox.options import Options
+        from webdriver_manager.firefox import GeckoDriverManager
+        
+        all_links = []
         options = Options()
         options.add_argument('--headless')
         driver = webdriver.Firefox(service=Service(GeckoDriverManager().install()), options=options)
 
         
-        for category in categories_load_more:
+        for category in categories:
             try:
                 driver.get(f"{base_url}{category}")
                 time.sleep(2)
@@ -196,10 +301,30 @@ class BatchScraper:
     
 
     def _scrape_single_article(self, url: str) -> Optional[Article]:
+        html = self.fetch_article(url)
+        if html is None:
+            return None
+        return self.parse_article(html, url)
+    
+    def fetch_article(self, url: str) -> Optional[bytes]:
+        """Download an article page, returning its raw HTML"""
         try:
-            response = self.session.get(url)
+            with metrics.span('scrape.fetch'):
+                response = self._get(url)
             response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
+            return response.content
+        except Exception as e:
+            logging.error(f"Error scraping article {url}: {e}")
+            return None
+    
+    def parse_article(self, html: bytes, url: str) -> Optional[Article]:
+        """Parse an article page into an Article"""
+        with metrics.span('scrape.parse'):
+            return self._parse_article_html(html, url)
+    
+    def _parse_article_html(self, html: bytes, url: str) -> Optional[Article]:
+        try:
+            soup = BeautifulSoup(html, 'html.parser')
 
             # Scraping title
             try: 
@@ -280,25 +405,153 @@ class BatchScraper:
         except:
             return False
     
-    def download_images(self, articles: List[Article], image_dir: str):
-        """Download images for articles"""
+    def download_images(self, articles: List[Article], image_dir: str, save_manifest: bool = True) -> Dict:
+        """Download images for articles.
+        
+        Each distinct URL is fetched once, concurrently, and stored under the
+        SHA-256 of its content, so identical images share one file. A manifest
+        in image_dir maps URLs to files, letting later runs skip URLs that
+        are already on disk. Article image URLs are replaced with local paths
+        and per-image format and size are recorded in article.metadata.
+        Thumbnails for display are created for images that lack one.
+        
+        With save_manifest=False the manifest is only updated in memory;
+        call save_manifest() to write it, e.g. once per several batches.
+        """
         os.makedirs(image_dir, exist_ok=True)
+        manifest = self._manifest(image_dir)
+        
+        stats = {
+            'files_downloaded': 0,
+            'bytes_downloaded': 0,
+            'files_reused': 0,        # URL already on disk from an earlier run
+            'duplicate_references': 0,  # URL shared by several articles or repeated in one
+            'duplicate_files': 0,     # different URL, identical content
+            'bytes_saved': 0,
+            'thumbnails_created': 0
+        }
+        
+        references = defaultdict(int)
+        for article in articles:
+            for image_url in article.images:
+                references[image_url] += 1
+        
+        to_download = []
+        for image_url, count in references.items():
+            stats['duplicate_references'] += count - 1
+            entry = manifest.get(image_url)
+            if entry and os.path.exists(entry['path']):
+                stats['files_reused'] += 1
+                stats['bytes_saved'] += entry['bytes'] * count
+            else:
+                to_download.append(image_url)
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            downloads = pool.map(self._download_image, to_download)
+            for image_url, content in zip(to_download, downloads):
+                if content is None:
+                    continue
+                
+                stats['files_downloaded'] += 1
+                stats['bytes_downloaded'] += len(content)
+                stats['bytes_saved'] += len(content) * (references[image_url] - 1)
+                
+                entry, is_new_file = self._store_image(image_url, content, image_dir)
+                if not is_new_file:
+                    stats['duplicate_files'] += 1
+                    stats['bytes_saved'] += len(content)
+                manifest[image_url] = entry
+        
+        thumbnail_stats = self.thumbnails.ensure(
+            [manifest[image_url]['path'] for image_url in references if image_url in manifest]
+        )
+        stats['thumbnails_created'] = thumbnail_stats['created']
         
+        # Update articles with local paths
         for article in articles:
+            image_info = []
             for i, image_url in enumerate(article.images):
-                try:
-                    response = self.session.get(image_url, timeout=10)
-                    response.raise_for_status()
-                    
-                    # Save image
-                    image_name = f"{hash(article.url)}_{i}.jpg"
-                    image_path = os.path.join(image_dir, image_name)
-                    
-                    with open(image_path, 'wb') as f:
-                        f.write(response.content)
-                    
-                    # Update article with local path
-                    article.images[i] = image_path
-                    
-                except Exception as e:
-                    logging.error(f"Error downloading image {image_url}: {e}")
\ No newline at end of file
+                entry = manifest.get(image_url)
+                if entry:
+                    article.images[i] = entry['path']
+                    image_info.append(dict(entry, url=image_url))
+            article.metadata['image_info'] = image_info
+        
+        if save_manifest:
+            self.save_manifest(image_dir)
+        
+        logging.info(
+            f"Downloaded {stats['files_downloaded']} images ({stats['bytes_downloaded']} bytes), "
+            f"reused {stats['files_reused']} from disk; deduplication saved "
+            f"{stats['duplicate_references'] + stats['files_reused'] + stats['duplicate_files']} files "
+            f"and {stats['bytes_saved']} bytes"
+        )
+        return stats
+    
+    def _manifest(self, image_dir: str) -> Dict:
+        """URL -> file manifest of an image directory, read from disk on first use"""
+        if image_dir not in self._manifests:
+            manifest_path = os.path.join(image_dir, 'manifest.json')
+            manifest = {}
+            if os.path.exists(manifest_path):
+                with open(manifest_path, 'r') as f:
+                    manifest = json.load(f)
+            self._manifests[image_dir] = manifest
+        return self._manifests[image_dir]
+    
+    def save_manifest(self, image_dir: str):
+        """Write the image manifest of image_dir to disk"""
+        manifest_path = os.path.join(image_dir, 'manifest.json')
+        tmp_path = f"{manifest_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self._manifest(image_dir), f, indent=2)
+        os.replace(tmp_path, manifest_path)
+    
+    def _download_image(self, image_url: str) -> Optional[bytes]:
+        """Fetch an image, returning its bytes or None on failure"""
+        try:
+            with metrics.span('scrape.image_download'):
+                response = self._get(image_url, timeout=10)
+            response.raise_for_status()
+            return response.content
+        except Exception as e:
+            logging.error(f"Error downloading image {image_url}: {e}")
+            return None
+    
+    def _store_image(self, image_url: str, content: bytes, image_dir: str):
+        """Write image bytes under their content hash.
+        
+        Returns the manifest entry and whether a new file was written.
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        
+        # Record the real format and size rather than trusting the URL
+        image_format, width, height = None, None, None
+        try:
+            with Image.open(io.BytesIO(content)) as image:
+                image_format, (width, height) = image.format, image.size
+        except Exception:
+            logging.warning(f"Could not identify image format of {image_url}")
+        
+        if image_format:
+            extension = 'jpg' if image_format == 'JPEG' else image_format.lower()
+        else:
+            extension = os.path.splitext(urlparse(image_url).path)[1].lstrip('.').lower() or 'bin'
+        
+        image_path = os.path.join(image_dir, f"{digest[:32]}.{extension}")
+        is_new_file = not os.path.exists(image_path)
+        if is_new_file:
+            tmp_path = f"{image_path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, image_path)
+        
+        entry = {
+            'path': image_path,
+            'sha256': digest,
+            'format': image_format,
+            'width': width,
+            'height': height,
+            'bytes': len(content)
+        }
+        return entry, is_new_file
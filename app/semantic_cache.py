@@ -0,0 +1,172 @@
+import json
+import logging
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+
+class SemanticCache:
+    """Cache of search results and answers matched by query similarity.
+
+    Queries are embedded with the database's text model and looked up in a
+    small dedicated collection, so rephrasings of an earlier question
+    ("what is RLHF" / "explain RLHF") reuse its results and answer. Entries
+    expire after ttl_seconds, the least recently used are evicted beyond
+    max_entries, and everything cached against an older corpus version is
+    dropped once the database changes.
+    """
+
+    def __init__(self, db, config):
+        self.db = db
+        cache_config = config.get('semantic_cache', {})
+        self.threshold = cache_config.get('similarity_threshold', 0.92)
+        self.max_entries = cache_config.get('max_entries', 1000)
+        self.ttl_seconds = cache_config.get('ttl_seconds')
+
+        self.collection = db.client.get_or_create_collection(
+            name=f"{config['database']['collection_name']}_semantic_cache",
+            metadata={"hnsw:space": "cosine"}
+        )
+        self._corpus_version = None
+        self._last_sweep = time.time()
+        # Shared by all Streamlit sessions through cache_resource
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _current_version(self) -> str:
+        """Current corpus version, dropping entries cached against older ones"""
+        version = self.db.corpus_version()
+        if version != self._corpus_version:
+            stale = self.collection.get(where={'corpus_version': {'$ne': version}}, include=[])['ids']
+            if stale:
+                self.collection.delete(ids=stale)
+                logging.info(f"Semantic cache: dropped {len(stale)} entries after the corpus changed")
+            self._corpus_version = version
+        return version
+
+    def _where(self, version: str, n_results: int, include_images: bool, mode: str):
+        return {'$and': [
+            {'corpus_version': version},
+            {'model': self.db.model_keys()['text']},
+            {'n_results': n_results},
+            {'include_images': include_images},
+            {'mode': mode}
+        ]}
+
+    def lookup(self, query: str, n_results: int, include_images: bool, mode: str = 'vector') -> Optional[Dict]:
+        """Return {'id', 'query', 'similarity', 'results', 'answer'} for a similar cached query, or None"""
+        version = self._current_version()
+        if self.collection.count() == 0:
+            self._count(hit=False)
+            return None
+
+        embedding = self.db.embed_queries([query])[0]
+        matches = self.collection.query(
+            query_embeddings=[embedding],
+            n_results=1,
+            where=self._where(version, n_results, include_images, mode),
+            include=['documents', 'metadatas', 'distances']
+        )
+
+        if not matches['ids'][0]:
+            self._count(hit=False)
+            return None
+
+        entry_id = matches['ids'][0][0]
+        metadata = matches['metadatas'][0][0]
+        similarity = 1 - matches['distances'][0][0]
+        now = time.time()
+        expired = self.ttl_seconds is not None and now - metadata['created_at'] > self.ttl_seconds
+
+        if similarity < self.threshold or expired:
+            if expired:
+                self.collection.delete(ids=[entry_id])
+            self._count(hit=False)
+            return None
+
+        self.collection.update(ids=[entry_id], metadatas=[{'last_used_at': now}])
+        self._count(hit=True)
+        logging.info(f"Semantic cache hit ({similarity:.3f}): '{query}' matched '{metadata['query']}'")
+
+        return {
+            'id': entry_id,
+            'query': metadata['query'],
+            'similarity': similarity,
+            'results': json.loads(matches['documents'][0][0]),
+            'answer': metadata.get('answer') or None
+        }
+
+    def store(self, query: str, n_results: int, include_images: bool, results: List[Dict],
+              answer: Optional[str] = None, mode: str = 'vector') -> str:
+        """Cache search results (and optionally an answer) for a query; returns the entry ID"""
+        version = self._current_version()
+        embedding = self.db.embed_queries([query])[0]
+        entry_id = uuid.uuid4().hex
+        now = time.time()
+
+        self.collection.add(
+            ids=[entry_id],
+            embeddings=[embedding],
+            documents=[json.dumps(results)],
+            metadatas=[{
+                'query': query,
+                'answer': answer or '',
+                'corpus_version': version,
+                'model': self.db.model_keys()['text'],
+                'n_results': n_results,
+                'include_images': include_images,
+                'mode': mode,
+                'created_at': now,
+                'last_used_at': now
+            }]
+        )
+        # Evicting reads every entry, so only do it when the cache is full or
+        # once per TTL period for expired entries (lookups drop those they hit)
+        if self.collection.count() > self.max_entries or (
+            self.ttl_seconds is not None and now - self._last_sweep > self.ttl_seconds
+        ):
+            self._evict()
+        return entry_id
+
+    def set_answer(self, entry_id: str, answer: str):
+        """Attach a generated answer to a cached entry"""
+        self.collection.update(ids=[entry_id], metadatas=[{'answer': answer}])
+
+    def _evict(self):
+        """Remove expired entries and the least recently used ones beyond max_entries"""
+        entries = self.collection.get(include=['metadatas'])
+        now = time.time()
+        self._last_sweep = now
+
+        expired = []
+        live = []
+        for entry_id, metadata in zip(entries['ids'], entries['metadatas']):
+            if self.ttl_seconds is not None and now - metadata['created_at'] > self.ttl_seconds:
+                expired.append(entry_id)
+            else:
+                live.append((metadata['last_used_at'], entry_id))
+
+        live.sort(reverse=True)
+        evicted = expired + [entry_id for _, entry_id in live[self.max_entries:]]
+        if evicted:
+            self.collection.delete(ids=evicted)
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            'size': self.collection.count(),
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / total if total else 0.0
+        }
@@ -0,0 +1,244 @@
+import json
+import logging
+import os
+import struct
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.numpy_store import _normalize
+
+# File layout: a fixed header, 64-byte aligned sections (vectors, int8 scales,
+# JSON records per collection) and a JSON manifest describing them at the end.
+MAGIC = b'BRAGSNAP'
+FORMAT_VERSION = 1
+_HEADER = struct.Struct('<8sIIQQ')  # magic, version, reserved, manifest offset, manifest length
+_ALIGNMENT = 64
+
+DTYPES = ('float16', 'int8')
+
+
+def quantize(embeddings, dtype: str):
+    """Normalize embeddings and convert them to dtype; returns (vectors, per-row scales or None)"""
+    normalized = _normalize(embeddings)
+    if dtype == 'float16':
+        return normalized.astype(np.float16), None
+    if dtype == 'int8':
+        # Symmetric per-row scale, so every row uses the full int8 range
+        scales = np.abs(normalized).max(axis=1) / 127
+        scales[scales == 0] = 1.0
+        vectors = np.round(normalized / scales[:, None]).astype(np.int8)
+        return vectors, scales.astype(np.float32)
+    raise ValueError(f"Unknown snapshot dtype: {dtype}")
+
+
+def dequantize(vectors, scales=None) -> np.ndarray:
+    """float32 embeddings from quantized vectors"""
+    embeddings = np.asarray(vectors, dtype=np.float32)
+    if scales is not None:
+        embeddings = embeddings * np.asarray(scales, dtype=np.float32)[:, None]
+    return embeddings
+
+
+def recall_at_k(reference, approximate, queries, k: int = 10) -> float:
+    """Mean overlap of exact top-k cosine neighbours under reference and approximate embeddings"""
+    k = min(k, len(reference))
+    if k == 0 or len(queries) == 0:
+        return 1.0
+    queries = _normalize(queries)
+    exact = np.argpartition(-(queries @ _normalize(reference).T), k - 1, axis=1)[:, :k]
+    approx = np.argpartition(-(queries @ _normalize(approximate).T), k - 1, axis=1)[:, :k]
+    return float(np.mean([len(set(a) & set(b)) / k for a, b in zip(exact, approx)]))
+
+
+def _read_collection(db, collection) -> Dict:
+    """All ids, embeddings, documents and metadata of a collection"""
+    batch_size = db.client.get_max_batch_size()
+    records = {'ids': [], 'embeddings': [], 'documents': [], 'metadatas': []}
+    offset = 0
+    while True:
+        batch = collection.get(include=['embeddings', 'documents', 'metadatas'], limit=batch_size, offset=offset)
+        if not batch['ids']:
+            break
+        records['ids'].extend(batch['ids'])
+        records['embeddings'].append(np.asarray(batch['embeddings'], dtype=np.float32))
+        records['documents'].extend(batch['documents'])
+        records['metadatas'].extend(batch['metadatas'])
+        offset += len(batch['ids'])
+    records['embeddings'] = np.concatenate(records['embeddings']) if records['embeddings'] else None
+    return records
+
+
+def _collections(db) -> Dict:
+    collections = {'text': db.text_collection, 'images': db.image_collection}
+    if db.chunk_collection is not None:
+        collections['chunks'] = db.chunk_collection
+    return collections
+
+
+def _write_section(f, data: bytes) -> Dict:
+    padding = -f.tell() % _ALIGNMENT
+    f.write(b'\0' * padding)
+    section = {'offset': f.tell(), 'nbytes': len(data)}
+    f.write(data)
+    return section
+
+
+def export_snapshot(db, path: str, dtype: str = 'float16', recall_queries: Optional[List[str]] = None,
+                    k: int = 10) -> Dict:
+    """Write the database's collections to a single snapshot file; returns its manifest.
+
+    With recall_queries, recall@k of search over the quantized vectors
+    against the full-precision ones is measured per collection and
+    recorded in the manifest.
+    """
+    if dtype not in DTYPES:
+        raise ValueError(f"Unknown snapshot dtype: {dtype}")
+
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'dtype': dtype,
+        'corpus_version': db.corpus_version(),
+        'text_model': db.model_keys()['text'],
+        'image_model': db.model_keys()['image'],
+        'collections': {},
+        'recall': {}
+    }
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(b'\0' * _HEADER.size)
+
+        for role, collection in _collections(db).items():
+            records = _read_collection(db, collection)
+            if role == 'text':
+                # Article bodies and image lists are kept in the document store
+                bodies = db.documents.get(records['ids'])
+                images = db.documents.get_images(records['ids'])
+                records['documents'] = [bodies.get(record_id) for record_id in records['ids']]
+                records['images'] = [images.get(record_id, []) for record_id in records['ids']]
+            entry = {'count': len(records['ids']), 'dim': 0}
+            if records['ids']:
+                vectors, scales = quantize(records['embeddings'], dtype)
+                entry['dim'] = int(vectors.shape[1])
+                entry['vectors'] = _write_section(f, vectors.tobytes())
+                if scales is not None:
+                    entry['scales'] = _write_section(f, scales.tobytes())
+
+                if recall_queries:
+                    encode = db.embed_clip_queries if role == 'images' else db.embed_queries
+                    if role != 'images' or db.clip_encoder is not None:
+                        manifest['recall'][role] = recall_at_k(
+                            records['embeddings'], dequantize(vectors, scales), encode(recall_queries), k
+                        )
+
+            entry['records'] = _write_section(f, json.dumps({
+                'ids': records['ids'],
+                'documents': records['documents'],
+                'metadatas': records['metadatas'],
+                **({'images': records['images']} if 'images' in records else {})
+            }).encode('utf-8'))
+            manifest['collections'][role] = entry
+
+        manifest_data = json.dumps(manifest).encode('utf-8')
+        manifest_section = _write_section(f, manifest_data)
+        f.seek(0)
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, 0, manifest_section['offset'], manifest_section['nbytes']))
+    os.replace(tmp_path, path)
+
+    logging.info(f"Wrote {dtype} snapshot {path} ({os.path.getsize(path) / (1024 * 1024):.1f} MB)")
+    return manifest
+
+
+class Snapshot:
+    """Read access to a snapshot file; vector sections are memory-mapped, not loaded"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                raise ValueError(f"{path} is not a snapshot file")
+            magic, version, _, manifest_offset, manifest_length = _HEADER.unpack(header)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a snapshot file")
+            if version > FORMAT_VERSION:
+                raise ValueError(f"{path} has snapshot format {version}, this version reads up to {FORMAT_VERSION}")
+            f.seek(manifest_offset)
+            self.manifest = json.loads(f.read(manifest_length))
+
+    @property
+    def roles(self) -> List[str]:
+        return list(self.manifest['collections'])
+
+    def vectors(self, role: str):
+        """Quantized vectors of a collection as a read-only memory map"""
+        entry = self.manifest['collections'][role]
+        if not entry['count']:
+            return np.zeros((0, 0), dtype=self.manifest['dtype'])
+        return np.memmap(self.path, dtype=self.manifest['dtype'], mode='r',
+                         offset=entry['vectors']['offset'], shape=(entry['count'], entry['dim']))
+
+    def scales(self, role: str):
+        entry = self.manifest['collections'][role]
+        if 'scales' not in entry:
+            return None
+        return np.memmap(self.path, dtype=np.float32, mode='r', offset=entry['scales']['offset'], shape=(entry['count'],))
+
+    def embeddings(self, role: str) -> np.ndarray:
+        """Dequantized float32 embeddings of a collection"""
+        return dequantize(self.vectors(role), self.scales(role))
+
+    def records(self, role: str) -> Dict:
+        """{'ids', 'documents', 'metadatas'} of a collection"""
+        section = self.manifest['collections'][role]['records']
+        with open(self.path, 'rb') as f:
+            f.seek(section['offset'])
+            return json.loads(f.read(section['nbytes']))
+
+
+def import_snapshot(db, path: str) -> Dict[str, int]:
+    """Replace the database's collections with the contents of a snapshot.
+
+    Returns the number of records imported per collection.
+    """
+    snapshot = Snapshot(path)
+    model = snapshot.manifest['text_model'].split(':')[0]
+    text_key = db.model_keys()['text']
+    if model != text_key.split(':')[0]:
+        raise ValueError(f"Snapshot was built with {model}, the database uses {text_key}")
+
+    collections = _collections(db)
+    imported = {}
+    for role in snapshot.roles:
+        if role not in collections:
+            logging.warning(f"Skipping {role} in the snapshot, the collection is not enabled")
+            continue
+        collection = collections[role]
+        records = snapshot.records(role)
+        rows = {'ids': records['ids'], 'embeddings': snapshot.embeddings(role), 'metadatas': records['metadatas']}
+        if role == 'text':
+            # Article bodies and image lists go to the document store; snapshots
+            # of earlier versions carry the image lists in the metadata
+            images = records.get('images') or [json.loads(metadata.get('images', '[]')) for metadata in records['metadatas']]
+            rows['metadatas'] = [
+                {key: value for key, value in metadata.items() if key not in ('images', 'metadata')}
+                for metadata in records['metadatas']
+            ]
+            stored = [k for k, doc in enumerate(records['documents']) if doc is not None]
+            db.documents.put(
+                [records['ids'][k] for k in stored], [records['documents'][k] for k in stored], [images[k] for k in stored]
+            )
+            db.documents.delete(db.documents.ids() - set(records['ids']))
+        elif any(doc is not None for doc in records['documents']):
+            rows['documents'] = records['documents']
+        db.replace_collection(collection, **rows)
+        imported[role] = len(records['ids'])
+
+    if db.lexical_index is not None:
+        db.rebuild_lexical_index()
+    db.bump_corpus_version()
+    return imported
@@ -7,10 +7,12 @@ os.environ['STREAMLIT_SERVER_FILE_WATCHER_TYPE'] = 'none'
 
 from app.multimodal_db import MultimodalDatabase
 from app.llm_interface import LLMInterface
-from app.scraper import BatchScraper
+from app.semantic_cache import SemanticCache
+from app.context_packer import ContextPacker
+from app.metrics import metrics
+from app.thumbnails import ThumbnailCache
 import yaml
 import json
-from PIL import Image
 import logging
 
 # Configure logging
@@ -28,13 +30,52 @@ def initialize_database():
     config = load_config()
     return MultimodalDatabase(config)
 
+@st.cache_resource
+def initialize_semantic_cache():
+    """Initialize the semantic query cache, or None when it is disabled"""
+    config = load_config()
+    if not config.get('semantic_cache', {}).get('enabled', False):
+        return None
+    return SemanticCache(initialize_database(), config)
+
+@st.cache_resource
+def initialize_context_packer():
+    """Initialize the LLM context packer"""
+    return ContextPacker(load_config())
+
+@st.cache_resource
+def initialize_thumbnails():
+    """Initialize the image thumbnail cache"""
+    return ThumbnailCache(load_config())
+
+@st.cache_data(max_entries=2000, show_spinner=False)
+def load_thumbnail(image_path: str):
+    """Thumbnail bytes of an image, or None if no thumbnail can be made"""
+    thumbnail_path = initialize_thumbnails().create(image_path)
+    if thumbnail_path is None:
+        return None
+    with open(thumbnail_path, 'rb') as f:
+        return f.read()
+
+def display_image(image_path: str, caption: str, key: str):
+    """Show an image's thumbnail, with a button to load the original"""
+    if not os.path.exists(image_path):
+        st.write("Image file not found")
+        return
+    
+    thumbnail = load_thumbnail(image_path)
+    if thumbnail is None or st.button("Full size", key=key):
+        st.image(image_path, caption=caption, use_column_width=True)
+    else:
+        st.image(thumbnail, caption=caption)
+
 @st.cache_resource
 def initialize_llm():
     """Initialize LLM interface"""
     config = load_config()
     return LLMInterface(config)
 
-def display_search_result(result):
+def display_search_result(result, key: str):
     """Display a single search result"""
     with st.container():
         st.write(f"**Similarity Score:** {result['similarity']:.3f}")
@@ -44,6 +85,8 @@ def display_search_result(result):
             metadata = result['metadata']
             st.write(f"**Title:** {metadata['title']}")
             st.write(f"**URL:** {metadata['url']}")
+            if metadata.get('summary'):
+                st.write(f"**Summary:** {metadata['summary']}")
             
             # Display content preview
             content = result['content']
@@ -59,8 +102,7 @@ def display_search_result(result):
                     try:
                         if os.path.exists(img_path):
                             with cols[i]:
-                                image = Image.open(img_path)
-                                st.image(image, caption=f"Image {i+1}", use_column_width=True)
+                                display_image(img_path, f"Image {i+1}", key=f"{key}_image_{i}")
                     except Exception as e:
                         st.write(f"Error loading image: {e}")
                         
@@ -68,16 +110,30 @@ def display_search_result(result):
             # Display image result
             st.write("**Image Match**")
             try:
-                if os.path.exists(result['image_path']):
-                    image = Image.open(result['image_path'])
-                    st.image(image, caption="Matched Image", use_column_width=True)
-                else:
-                    st.write("Image file not found")
+                display_image(result['image_path'], "Matched Image", key=f"{key}_image")
             except Exception as e:
                 st.write(f"Error loading image: {e}")
         
         st.divider()
 
+def display_timings(container):
+    """Show the stage timings of this session's last search and LLM answer"""
+    with container:
+        st.subheader("Timing Breakdown")
+        # Kept per session: the database, LLM interface and metrics registry are shared
+        trace = st.session_state.get('search_trace')
+        if trace is not None:
+            st.text(f"{'search (total)':<26}{trace['total_seconds'] * 1000:8.1f} ms")
+            for span in trace['spans']:
+                st.text(f"  {span['name']:<24}{span['seconds'] * 1000:8.1f} ms")
+        else:
+            st.caption("Search served from cache")
+        
+        timings = st.session_state.get('llm_timings', {})
+        if timings.get('total_time') is not None and not timings.get('cached'):
+            st.text(f"{'llm first token':<26}{(timings['time_to_first_token'] or 0) * 1000:8.1f} ms")
+            st.text(f"{'llm answer':<26}{timings['total_time'] * 1000:8.1f} ms")
+
 def main():
     st.set_page_config(
         page_title="The Batch Multimodal RAG",
@@ -91,6 +147,8 @@ def main():
     try:
         db = initialize_database()
         llm = initialize_llm()
+        semantic_cache = initialize_semantic_cache()
+        context_packer = initialize_context_packer()
     except Exception as e:
         st.error(f"Error initializing system: {e}")
         st.stop()
@@ -102,7 +160,14 @@ def main():
         st.subheader("Search Settings")
         max_results = st.slider("Max Results", 1, 10, 5)
         include_images = st.checkbox("Include Image Results", True)
+        search_mode = st.radio(
+            "Search Mode",
+            ["vector", "hybrid", "lexical"],
+            horizontal=True,
+            help="lexical: keyword (BM25) search without embedding models; hybrid: keyword and vector rankings fused"
+        )
         use_llm_generation = st.checkbox("Use LLM for Answer Generation", True)
+        use_answer_cache = st.checkbox("Reuse Cached Answers", True)
         
         st.subheader("Database Stats")
         try:
@@ -111,8 +176,36 @@ def main():
             
             for doc_type, count in stats['type_breakdown'].items():
                 st.metric(f"{doc_type.title()} Documents", count)
+            if 'passages' in stats:
+                st.metric("Indexed Passages", stats['passages'])
+            if 'query_cache' in stats:
+                cache_stats = stats['query_cache']
+                st.metric(
+                    "Query Cache Hit Rate",
+                    f"{cache_stats['hit_rate']:.0%}",
+                    help=f"{cache_stats['hits']} hits, {cache_stats['misses']} misses, {cache_stats['size']} entries"
+                )
+            answer_cache_stats = llm.cache_stats()
+            if answer_cache_stats is not None:
+                st.metric(
+                    "Answer Cache Hit Rate",
+                    f"{answer_cache_stats['hit_rate']:.0%}",
+                    help=f"{answer_cache_stats['hits']} hits, {answer_cache_stats['misses']} misses, {answer_cache_stats['size']} entries"
+                )
+            if semantic_cache is not None:
+                semantic_stats = semantic_cache.stats()
+                st.metric(
+                    "Semantic Cache Hit Rate",
+                    f"{semantic_stats['hit_rate']:.0%}",
+                    help=f"{semantic_stats['hits']} hits, {semantic_stats['misses']} misses, {semantic_stats['size']} entries"
+                )
         except Exception as e:
             st.error(f"Error loading stats: {e}")
+        
+        # Filled in once the query has run
+        timing_container = None
+        if metrics.enabled and st.checkbox("Show Timing Breakdown", False):
+            timing_container = st.container()
 
     
     # Main search interface
@@ -124,30 +217,68 @@ def main():
     )
     
     if query:
+        st.session_state['search_trace'] = None
+        st.session_state['llm_timings'] = {}
         with st.spinner("Searching..."):
             try:
-                # Perform search
-                results = db.search(
-                    query=query,
-                    n_results=max_results,
-                    include_images=include_images
-                )
+                # Reuse results and answer of a similar earlier query if there is one
+                cached = None
+                # Lexical search is already model-free, so it skips the semantic cache;
+                # with "Reuse Cached Answers" off it is neither read nor written
+                use_semantic_cache = semantic_cache is not None and search_mode != 'lexical' and use_answer_cache
+                if use_semantic_cache:
+                    cached = semantic_cache.lookup(query, max_results, include_images, mode=search_mode)
+                
+                if cached is not None:
+                    results = cached['results']
+                    cache_entry = cached['id']
+                    st.caption(f"Reusing results for similar query \"{cached['query']}\" (similarity {cached['similarity']:.3f})")
+                else:
+                    # Perform search
+                    results = db.search(
+                        query=query,
+                        n_results=max_results,
+                        include_images=include_images,
+                        mode=search_mode
+                    )
+                    st.session_state['search_trace'] = metrics.last_trace('search')
+                    cache_entry = None
+                    if use_semantic_cache and results:
+                        cache_entry = semantic_cache.store(query, max_results, include_images, results, mode=search_mode)
                 
                 if results:
+                    # Fetch article texts for the results shown and packed into the context
+                    db.hydrate(results)
+                    
                     # Generate LLM response if enabled
-                    if use_llm_generation:
+                    if use_llm_generation and cached is not None and cached['answer']:
+                        st.subheader("AI-Generated Answer")
+                        st.write(cached['answer'])
+                        st.caption("Cached answer")
+                    elif use_llm_generation:
                         st.subheader("AI-Generated Answer")
                         try:
-                            # Prepare context from search results
-                            context = []
-                            for result in results[:3]:  # Use top 3 results
-                                if result['type'] == 'text':
-                                    context.append(f"Title: {result['metadata']['title']}")
-                                    context.append(f"Content: {result['content'][:1000]}")
+                            # Pack the most relevant passages into the context token budget
+                            context = context_packer.pack(results, mode=search_mode)
+                            if not context['text']:
+                                st.info("No results are similar enough to the query to answer from.")
+                            else:
+                                timings = st.session_state['llm_timings']
+                                answer = st.write_stream(llm.generate_answer_stream(
+                                    query, context['text'], use_cache=use_answer_cache, timings=timings
+                                ))
                             
-                            context_text = "\n\n".join(context)
-                            answer = llm.generate_answer(query, context_text)
-                            st.write(answer)
+                                if cache_entry is not None and timings.get('completed'):
+                                    semantic_cache.set_answer(cache_entry, answer)
+                                if timings.get('cached'):
+                                    st.caption("Cached answer")
+                                elif timings.get('time_to_first_token') is not None:
+                                    st.caption(
+                                        f"First token after {timings['time_to_first_token']:.2f}s, "
+                                        f"generated in {timings['total_time']:.2f}s"
+                                    )
+                                
+                                st.caption(f"Context: {context['tokens']} tokens from {len(context['sources'])} articles")
                             
                         except Exception as e:
                             st.error(f"Error generating answer: {e}")
@@ -157,13 +288,16 @@ def main():
                     
                     for i, result in enumerate(results):
                         with st.expander(f"Result {i+1} - Similarity: {result['similarity']:.3f}"):
-                            display_search_result(result)
+                            display_search_result(result, key=f"result_{i}")
                             
                 else:
                     st.warning("No results found for your query.")
                     
             except Exception as e:
                 st.error(f"Error during search: {e}")
+        
+        if timing_container is not None:
+            display_timings(timing_container)
     
 
 if __name__ == "__main__":
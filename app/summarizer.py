@@ -0,0 +1,138 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import time
+from typing import Dict, List
+
+import openai
+
+# Transient API errors worth retrying with backoff
+_RETRYABLE = (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError)
+
+
+def _hash_content(content: str) -> str:
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+def read_progress(path: str) -> Dict:
+    """Contents of a progress file: {article_id: {'content_hash', 'summary'}}"""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def load_summaries(path: str, articles: List[Dict]) -> Dict[str, str]:
+    """Saved summaries by article ID, for articles whose content is unchanged"""
+    return matching_summaries(read_progress(path), articles)
+
+
+def matching_summaries(progress: Dict, articles: List[Dict]) -> Dict[str, str]:
+    """Summaries in progress (see read_progress) of articles whose content is unchanged"""
+    return {
+        article['id']: progress[article['id']]['summary']
+        for article in articles
+        if progress.get(article['id'], {}).get('content_hash') == _hash_content(article['content'])
+    }
+
+
+class BatchSummarizer:
+    """Summarizes a corpus with bounded concurrency through the async LLM client.
+
+    Finished summaries are written to progress_path as they complete,
+    keyed by article ID together with a hash of the summarized content, so
+    an interrupted run resumes where it stopped and edited articles are
+    summarized again.
+    """
+
+    def __init__(self, config, llm):
+        self.llm = llm
+        summary_config = config.get('summarization', {})
+        self.max_concurrency = summary_config.get('max_concurrency', 8)
+        self.max_retries = summary_config.get('max_retries', 5)
+        self.backoff_seconds = summary_config.get('backoff_seconds', 1.0)
+        self.save_every = summary_config.get('save_every', 20)
+        self.progress_path = summary_config.get('progress_path', './data/processed/summaries.json')
+
+        self.progress = read_progress(self.progress_path)
+        self._unsaved = 0
+
+    def save_progress(self):
+        os.makedirs(os.path.dirname(self.progress_path) or '.', exist_ok=True)
+        tmp_path = f"{self.progress_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.progress, f, indent=2)
+        os.replace(tmp_path, self.progress_path)
+        self._unsaved = 0
+
+    def run(self, articles: List[Dict]) -> Dict:
+        """Summarize articles ({'id', 'content'} dicts) that have no current summary.
+
+        Returns counts of summarized, resumed and failed articles.
+        """
+        pending = [
+            article for article in articles
+            if self.progress.get(article['id'], {}).get('content_hash') != _hash_content(article['content'])
+        ]
+        stats = {'summarized': 0, 'resumed': len(articles) - len(pending), 'failed': 0, 'seconds': 0.0}
+        logging.info(f"Summarizing {len(pending)} articles ({stats['resumed']} already done)")
+
+        start = time.perf_counter()
+        try:
+            asyncio.run(self._summarize_all(pending, stats))
+        finally:
+            self.save_progress()
+        stats['seconds'] = time.perf_counter() - start
+        return stats
+
+    async def _summarize_all(self, articles: List[Dict], stats: Dict):
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def summarize(article):
+            async with semaphore:
+                summary = await self._summarize_with_retries(article)
+
+            # Progress is only touched from the event loop thread
+            if summary is None:
+                stats['failed'] += 1
+                return
+            self.progress[article['id']] = {
+                'content_hash': _hash_content(article['content']),
+                'summary': summary
+            }
+            stats['summarized'] += 1
+            self._unsaved += 1
+            if self._unsaved >= self.save_every:
+                self.save_progress()
+                logging.info(f"Summarized {stats['summarized']}/{len(articles)} articles")
+
+        await asyncio.gather(*(summarize(article) for article in articles))
+
+    async def _summarize_with_retries(self, article: Dict):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await self.llm.summarize_article_async(article['content'])
+            except _RETRYABLE as e:
+                if attempt == self.max_retries:
+                    logging.error(f"Giving up on summary for {article['id']}: {e}")
+                    return None
+                delay = self._retry_delay(e, attempt)
+                logging.warning(f"Retrying summary for {article['id']} in {delay:.1f}s: {e}")
+                await asyncio.sleep(delay)
+            except Exception as e:
+                logging.error(f"Error generating summary for {article['id']}: {e}")
+                return None
+
+    def _retry_delay(self, error, attempt: int) -> float:
+        """Honor the server's Retry-After header, else exponential backoff with jitter"""
+        response = getattr(error, 'response', None)
+        if response is not None:
+            try:
+                return float(response.headers.get('retry-after'))
+            except (TypeError, ValueError):
+                pass
+        return self.backoff_seconds * (2 ** attempt) * (0.5 + random.random())
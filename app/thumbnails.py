@@ -0,0 +1,87 @@
+import hashlib
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from PIL import Image
+
+
+class ThumbnailCache:
+    """Small JPEG (or WebP) copies of article images for display.
+
+    Thumbnails are written to a directory next to data/images when images
+    are downloaded or indexed, and created on first use otherwise. A
+    thumbnail is regenerated when its source file is newer.
+    """
+
+    def __init__(self, config):
+        thumbnail_config = config.get('thumbnails', {})
+        self.enabled = thumbnail_config.get('enabled', True)
+        self.directory = thumbnail_config.get('directory', './data/thumbnails')
+        self.max_size = thumbnail_config.get('max_size', 256)
+        self.format = thumbnail_config.get('format', 'JPEG').upper()
+        self.quality = thumbnail_config.get('quality', 80)
+
+    def path_for(self, image_path: str) -> str:
+        """Thumbnail location for an image path"""
+        digest = hashlib.sha1(os.path.abspath(image_path).encode('utf-8')).hexdigest()[:32]
+        extension = 'jpg' if self.format == 'JPEG' else self.format.lower()
+        return os.path.join(self.directory, f"{digest}.{extension}")
+
+    def _is_current(self, image_path: str, thumbnail_path: str) -> bool:
+        try:
+            return os.path.getmtime(thumbnail_path) >= os.path.getmtime(image_path)
+        except OSError:
+            return False
+
+    def create(self, image_path: str) -> Optional[str]:
+        """Write the thumbnail of an image unless an up-to-date one exists; returns its path"""
+        if not self.enabled:
+            return None
+        thumbnail_path = self.path_for(image_path)
+        if self._is_current(image_path, thumbnail_path):
+            return thumbnail_path
+
+        try:
+            with Image.open(image_path) as image:
+                # Let the JPEG decoder downscale while decoding
+                image.draft('RGB', (self.max_size * 2, self.max_size * 2))
+                if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+                    # Flatten transparent logos onto white rather than black
+                    rgba = image.convert('RGBA')
+                    thumbnail = Image.new('RGB', rgba.size, (255, 255, 255))
+                    thumbnail.paste(rgba, mask=rgba.getchannel('A'))
+                else:
+                    thumbnail = image.convert('RGB')
+            thumbnail.thumbnail((self.max_size, self.max_size))
+
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f"{thumbnail_path}.tmp"
+            thumbnail.save(tmp_path, format=self.format, quality=self.quality)
+            os.replace(tmp_path, thumbnail_path)
+            return thumbnail_path
+        except Exception as e:
+            logging.error(f"Error creating thumbnail for {image_path}: {e}")
+            return None
+
+    def ensure(self, image_paths: List[str], max_workers: int = 4) -> Dict:
+        """Create missing or outdated thumbnails for a set of images"""
+        stats = {'created': 0, 'existing': 0, 'failed': 0}
+        if not self.enabled:
+            return stats
+
+        missing = []
+        for image_path in dict.fromkeys(image_paths):
+            if self._is_current(image_path, self.path_for(image_path)):
+                stats['existing'] += 1
+            else:
+                missing.append(image_path)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for thumbnail_path in pool.map(self.create, missing):
+                stats['created' if thumbnail_path else 'failed'] += 1
+
+        if missing:
+            logging.info(f"Thumbnails: created {stats['created']}, {stats['existing']} up to date, {stats['failed']} failed")
+        return stats
@@ -1,12 +1,11 @@
 import sys
 import argparse
+import importlib
+import time
 import yaml
 import logging
 from pathlib import Path
 
-from app.scraper import BatchScraper
-from app.multimodal_db import MultimodalDatabase
-
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -28,6 +27,8 @@ def load_config():
 
 def scrape_articles(config):
     """Scrape articles from The Batch"""
+    from app.scraper import BatchScraper
+    
     logger.info("Starting article scraping...")
     
     scraper = BatchScraper(config)
@@ -62,46 +63,411 @@ def scrape_articles(config):
     logger.info("Articles saved to data/processed/articles.json")
     return articles
 
-def build_database(config, articles=None):
+def load_articles():
+    """Load scraped articles from data/processed/articles.json"""
+    import json
+    articles_file = Path("data/processed/articles.json")
+    if not articles_file.exists():
+        logger.error("No articles found. Please run scraping first.")
+        return None
+    
+    with open(articles_file, 'r') as f:
+        articles_data = json.load(f)
+    
+    # Convert back to Article objects
+    from app.scraper import Article
+    articles = []
+    for data in articles_data:
+        article = Article(
+            title=data['title'],
+            content=data['content'],
+            url=data['url'],
+            images=data['images'],
+            metadata=data['metadata']
+        )
+        articles.append(article)
+    return articles
+
+def build_database(config, articles=None, incremental=False):
     """Build the multimodal database"""
+    from app.multimodal_db import MultimodalDatabase
+    
     logger.info("Building multimodal database...")
     
     db = MultimodalDatabase(config)
     
     if articles is None:
         # Load articles from file if not provided
-        import json
-        articles_file = Path("data/processed/articles.json")
-        if not articles_file.exists():
-            logger.error("No articles found. Please run scraping first.")
+        articles = load_articles()
+        if articles is None:
             return
-        
-        with open(articles_file, 'r') as f:
-            articles_data = json.load(f)
-        
-        # Convert back to Article objects
-        from app.scraper import Article
-        articles = []
-        for data in articles_data:
-            article = Article(
-                title=data['title'],
-                content=data['content'],
-                url=data['url'],
-                images=data['images'],
-                metadata=data['metadata']
-            )
-            articles.append(article)
     
     # Add articles to database
-    db.add_articles(articles)
+    # The article list is the full corpus, so records that have gone are pruned
+    ingest_stats = db.add_articles(articles, incremental=incremental, prune=True)
+    
+    # Display thumbnails for images downloaded before thumbnails were generated
+    from app.thumbnails import ThumbnailCache
+    ThumbnailCache(config).ensure([image_path for article in articles for image_path in article.images])
+    
+    # Re-attach summaries from earlier `summarize` runs to rewritten records
+    _attach_summaries(config, db, articles)
     
     # Print database stats
     stats = db.get_stats()
     logger.info(f"Database built successfully:")
+    logger.info(f"  Text throughput: {ingest_stats['docs_per_second']:.1f} docs/sec")
+    logger.info(f"  Image throughput: {ingest_stats['images_per_second']:.1f} images/sec")
+    if incremental:
+        logger.info(f"  Unchanged articles skipped: {ingest_stats['text_skipped']}")
+        logger.info(f"  Unchanged images skipped: {ingest_stats['image_skipped']}")
+    logger.info(f"  Image encodes avoided by deduplication: {ingest_stats['image_encodes_avoided']}")
+    if ingest_stats['boilerplate_suppressed']:
+        logger.info(f"  Boilerplate image references suppressed: {ingest_stats['boilerplate_suppressed']}")
+    logger.info(f"  Stale records deleted: {ingest_stats['deleted']}")
+    logger.info(f"  Total documents: {stats['total_documents']}")
+    for doc_type, count in stats['type_breakdown'].items():
+        logger.info(f"  {doc_type.title()} documents: {count}")
+
+def _attach_summaries(config, db, articles):
+    """Store saved summaries of unchanged articles on their (possibly rewritten) records"""
+    from app.summarizer import load_summaries
+    summaries_path = config.get('summarization', {}).get('progress_path', './data/processed/summaries.json')
+    summaries = load_summaries(summaries_path, _summary_inputs(db, articles))
+    if summaries:
+        logger.info(f"  Summaries attached: {db.set_summaries(summaries)}")
+
+def _summary_inputs(db, articles):
+    """Article IDs and content to summarize"""
+    return [
+        {'id': db.article_id(article.url or article.title), 'content': article.content}
+        for article in articles
+    ]
+
+def summarize_articles(config):
+    """Precompute article summaries and store them as article metadata"""
+    from app.llm_interface import LLMInterface
+    from app.multimodal_db import MultimodalDatabase
+    from app.summarizer import BatchSummarizer, load_summaries
+    
+    articles = load_articles()
+    if articles is None:
+        return
+    
+    db = MultimodalDatabase(config)
+    summarizer = BatchSummarizer(config, LLMInterface(config))
+    inputs = _summary_inputs(db, articles)
+    stats = summarizer.run(inputs)
+    
+    updated = db.set_summaries(load_summaries(summarizer.progress_path, inputs))
+    rate = stats['summarized'] / stats['seconds'] if stats['seconds'] > 0 else 0.0
+    logger.info(f"Summarized {stats['summarized']} articles in {stats['seconds']:.1f}s ({rate:.1f} articles/sec)")
+    logger.info(f"  Resumed from earlier runs: {stats['resumed']}")
+    logger.info(f"  Failed (retry by running again): {stats['failed']}")
+    logger.info(f"  Articles updated in the database: {updated}")
+
+def ingest_articles(config, incremental=False):
+    """Scrape, download, embed and index articles as a streaming pipeline"""
+    from app.multimodal_db import MultimodalDatabase
+    from app.pipeline import IngestPipeline
+    from app.scraper import BatchScraper
+    
+    logger.info("Starting streaming ingest...")
+    
+    scraper = BatchScraper(config)
+    db = MultimodalDatabase(config)
+    pipeline = IngestPipeline(config, scraper, db)
+    # Summaries are attached and stale records pruned by the pipeline, batch by batch
+    pipeline.run(incremental=incremental)
+    
+    stats = db.get_stats()
     logger.info(f"  Total documents: {stats['total_documents']}")
     for doc_type, count in stats['type_breakdown'].items():
         logger.info(f"  {doc_type.title()} documents: {count}")
 
+def measure_startup(config, eager=False):
+    """Time cold-start steps of the UI/CLI path.
+    
+    Run once with and once without --eager to compare lazy model loading
+    against loading every model at construction time.
+    """
+    config['models']['lazy_loading'] = not eager
+    timings = []
+    
+    def timed(label, func):
+        start = time.perf_counter()
+        result = func()
+        timings.append((label, time.perf_counter() - start))
+        return result
+    
+    db_module = timed("import app.multimodal_db", lambda: importlib.import_module('app.multimodal_db'))
+    timed("import app.llm_interface", lambda: importlib.import_module('app.llm_interface'))
+    timed("import app.scraper", lambda: importlib.import_module('app.scraper'))
+    db = timed("MultimodalDatabase()", lambda: db_module.MultimodalDatabase(config))
+    timed("get_stats()", db.get_stats)
+    timed("first text-only search", lambda: db.search("startup time probe", include_images=False))
+    timed("first search with images", lambda: db.search("startup time probe images", include_images=True))
+    
+    logger.info(f"Startup timings ({'eager' if eager else 'lazy'} model loading):")
+    for label, seconds in timings:
+        logger.info(f"  {label:<28} {seconds * 1000:9.1f} ms")
+    logger.info(f"  {'total':<28} {sum(seconds for _, seconds in timings) * 1000:9.1f} ms")
+
+def compare_embedding_backends(config):
+    """Check parity and speed of each embedding backend against PyTorch"""
+    import json
+    from PIL import Image
+    from app.encoders import BACKENDS, compare_backends
+    
+    texts = [
+        "machine learning in healthcare",
+        "large language models for code generation",
+        "computer vision applications in agriculture",
+        "reinforcement learning from human feedback"
+    ]
+    articles_file = Path("data/processed/articles.json")
+    if articles_file.exists():
+        with open(articles_file, 'r') as f:
+            texts += [f"{data['title']}\n\n{data['content'][:1000]}" for data in json.load(f)[:28]]
+    
+    images = []
+    image_dir = Path("data/images")
+    if image_dir.exists():
+        for image_path in sorted(image_dir.iterdir())[:64]:
+            try:
+                images.append(Image.open(image_path).convert('RGB'))
+            except Exception:
+                continue
+            if len(images) == 16:
+                break
+    
+    report = compare_backends(config, texts, images, list(BACKENDS))
+    
+    logger.info(f"Embedding backends vs torch ({len(texts)} texts, {len(images)} images):")
+    for backend, results in report.items():
+        for encoder, metrics in results.items():
+            speed = []
+            if 'query_ms' in metrics:
+                speed.append(f"query {metrics['query_ms']:7.1f} ms")
+            if 'items_per_second' in metrics:
+                speed.append(f"{metrics['items_per_second']:8.1f} items/sec")
+            logger.info(
+                f"  {backend:<10} {encoder:<11} cosine mean {metrics['mean_cosine']:.4f} "
+                f"min {metrics['min_cosine']:.4f}  {'  '.join(speed)}"
+            )
+
+def compare_search_modes(config, n_queries=100, n_results=5):
+    """Compare latency and recall of lexical, vector and hybrid search.
+    
+    Article titles serve as known-item queries: a hit is the article the
+    title belongs to.
+    """
+    import numpy as np
+    from app.multimodal_db import MultimodalDatabase
+    
+    db = MultimodalDatabase(config)
+    samples = [
+        (metadata['title'], article_id)
+        for article_id, metadata in db.iter_metadatas(db.text_collection)
+        if metadata.get('title')
+    ][:n_queries]
+    if not samples:
+        logger.error("The database is empty. Please run build-db first.")
+        return
+    
+    logger.info(f"Search modes over {len(samples)} title queries (top {n_results}):")
+    # Lexical runs first, so its first query shows the cost without any model loaded
+    for mode in ('lexical', 'vector', 'hybrid'):
+        latencies = []
+        hits = 0
+        reciprocal_ranks = 0.0
+        for query, article_id in samples:
+            start = time.perf_counter()
+            results = db.search(query, n_results=n_results, include_images=False, mode=mode)
+            latencies.append((time.perf_counter() - start) * 1000)
+            
+            result_ids = [result.get('id') for result in results]
+            if article_id in result_ids:
+                hits += 1
+                reciprocal_ranks += 1 / (result_ids.index(article_id) + 1)
+        
+        steady = np.array(latencies[1:] or latencies)
+        logger.info(
+            f"  {mode:<8} recall@{n_results} {hits / len(samples):.3f}  MRR {reciprocal_ranks / len(samples):.3f}  "
+            f"first {latencies[0]:8.2f} ms  p50 {np.percentile(steady, 50):7.2f} ms  "
+            f"p95 {np.percentile(steady, 95):7.2f} ms  text model loaded: {db.text_model_loaded}"
+        )
+
+def run_benchmark(config, n_articles=500, n_queries=200, images_per_article=2, stub_models=True, output=None):
+    """Benchmark ingest and search on a synthetic corpus and save the results as JSON"""
+    import json
+    from app.benchmark import run_benchmark as benchmark
+    
+    work_dir = Path("data/bench")
+    report = benchmark(
+        config, str(work_dir / "work"),
+        n_articles=n_articles,
+        images_per_article=images_per_article,
+        n_queries=n_queries,
+        stub_models=stub_models
+    )
+    
+    ingest = report['ingest']
+    logger.info(f"Benchmark ({n_articles} articles, {n_articles * images_per_article} images, {n_queries} queries):")
+    logger.info(f"  Ingest: {ingest['articles_per_second']:.1f} articles/sec "
+                f"(text {ingest['docs_per_second']:.1f} docs/sec, images {ingest['images_per_second']:.1f} images/sec)")
+    for mode, latency in report['search'].items():
+        logger.info(
+            f"  Search {mode:<8} p50 {latency['p50_ms']:7.2f} ms  p95 {latency['p95_ms']:7.2f} ms  "
+            f"p99 {latency['p99_ms']:7.2f} ms  (first {latency['first_query_ms']:.1f} ms)"
+        )
+    if report['peak_rss_mb'] is not None:
+        logger.info(f"  Peak RSS: {report['peak_rss_mb']:.1f} MB")
+    logger.info(f"  Index size: {report['index_size_mb']:.1f} MB")
+    
+    output = Path(output or work_dir / f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Results saved to {output}")
+
+def evaluate_retrieval(config, eval_set=None, output=None):
+    """Sweep search settings over a labeled query set and report recall, MRR and latency"""
+    import copy
+    import json
+    from app.evaluation import load_eval_set, sweep, cheapest_configuration
+    from app.multimodal_db import MultimodalDatabase
+    
+    eval_config = config.get('evaluation', {})
+    eval_path = Path(eval_set or eval_config.get('queries_path', 'data/eval/queries.jsonl'))
+    if not eval_path.exists():
+        logger.error(f"Evaluation set {eval_path} not found. See README for the JSONL format.")
+        return
+    queries = load_eval_set(str(eval_path))
+    if not queries:
+        logger.error(f"Evaluation set {eval_path} is empty.")
+        return
+    
+    # Time uncached searches
+    config = copy.deepcopy(config)
+    config.setdefault('query_cache', {})['enabled'] = False
+    db = MultimodalDatabase(config)
+    if db.text_collection.count() == 0:
+        logger.error("The database is empty. Please run build-db first.")
+        return
+    
+    rows = sweep(
+        db, queries,
+        n_results_values=eval_config.get('n_results', [3, 5, 10]),
+        include_images_values=eval_config.get('include_images', [False, True]),
+        ef_search_values=eval_config.get('ef_search') or [None],
+        modes=eval_config.get('modes', ['vector'])
+    )
+    min_recall = eval_config.get('min_recall', 0.8)
+    best = cheapest_configuration(rows, min_recall)
+    
+    logger.info(f"Retrieval evaluation over {len(queries)} queries from {eval_path}:")
+    logger.info(f"  {'mode':<8} {'k':>3} {'images':>6} {'ef':>5} {'recall':>7} {'MRR':>6} "
+                f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for row in rows:
+        marker = '  <- cheapest' if row is best else ''
+        logger.info(
+            f"  {row['mode']:<8} {row['n_results']:>3} {str(row['include_images']):>6} {str(row['ef_search']):>5} "
+            f"{row['recall']:7.3f} {row['mrr']:6.3f} {row['p50_ms']:8.2f} {row['p95_ms']:8.2f} {row['p99_ms']:8.2f}{marker}"
+        )
+    if best is None:
+        logger.info(f"  No configuration reaches recall {min_recall}")
+    
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'eval_set': str(eval_path),
+        'queries': len(queries),
+        'min_recall': min_recall,
+        'results': rows,
+        'cheapest': best
+    }
+    output = Path(output or Path("data/eval") / f"eval-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Results saved to {output}")
+
+def migrate_vector_store(config, output=None):
+    """Copy the Chroma index into a numpy vector store"""
+    import shutil
+    from app.numpy_store import migrate_from_chroma
+    
+    source = Path(config['database']['persist_directory'])
+    target = Path(output or "data/numpy_store")
+    if config['database'].get('vector_store', 'chroma') != 'chroma':
+        logger.error("database.vector_store must be 'chroma' to migrate from database.persist_directory")
+        return
+    if not source.exists():
+        logger.error(f"No Chroma index found at {source}. Please run build-db first.")
+        return
+    if target.resolve() == source.resolve():
+        logger.error("The numpy store needs a directory of its own, choose one with --output")
+        return
+    
+    copied = migrate_from_chroma(str(source), str(target), config['database']['collection_name'])
+    # The BM25 index and corpus version describe the same content
+    for name in ('documents.sqlite', 'lexical_index.pkl', 'corpus_version', 'suppressed_images.json'):
+        if (source / name).exists():
+            shutil.copy2(source / name, target / name)
+    
+    logger.info(f"Migrated {sum(copied.values())} records into {target}. To use it, set in config/config.yaml:")
+    logger.info("  database.vector_store: \"numpy\"")
+    # Relative paths are spelled like the other config paths, absolute ones as given
+    persist_directory = target.as_posix()
+    if not target.is_absolute() and not persist_directory.startswith('.'):
+        persist_directory = f"./{persist_directory}"
+    logger.info(f"  database.persist_directory: \"{persist_directory}\"")
+
+def export_snapshot(config, path=None, dtype=None):
+    """Write the collections to a portable snapshot file and report the recall loss of quantization"""
+    from app.multimodal_db import MultimodalDatabase
+    from app.snapshot import export_snapshot as export
+    
+    snapshot_config = config.get('snapshot', {})
+    path = path or snapshot_config.get('path', './data/snapshot.brag')
+    dtype = dtype or snapshot_config.get('dtype', 'float16')
+    
+    db = MultimodalDatabase(config)
+    if db.text_collection.count() == 0:
+        logger.error("The database is empty. Please run build-db first.")
+        return
+    
+    # Article titles serve as queries for the recall measurement
+    recall_queries = [
+        metadata['title'] for _, metadata in db.iter_metadatas(db.text_collection) if metadata.get('title')
+    ][:snapshot_config.get('recall_queries', 200)]
+    
+    start = time.perf_counter()
+    manifest = export(db, path, dtype=dtype, recall_queries=recall_queries)
+    logger.info(f"Exported {dtype} snapshot to {path} in {time.perf_counter() - start:.1f}s")
+    for role, entry in manifest['collections'].items():
+        recall = manifest['recall'].get(role)
+        recall_text = f", recall@10 vs float32 {recall:.4f}" if recall is not None else ""
+        logger.info(f"  {role:<7} {entry['count']:>7} records{recall_text}")
+
+def import_snapshot(config, path=None):
+    """Load a snapshot file into the configured vector store"""
+    from app.multimodal_db import MultimodalDatabase
+    from app.snapshot import import_snapshot as load
+    
+    path = path or config.get('snapshot', {}).get('path', './data/snapshot.brag')
+    if not Path(path).exists():
+        logger.error(f"Snapshot {path} not found")
+        return
+    
+    start = time.perf_counter()
+    db = MultimodalDatabase(config)
+    imported = load(db, path)
+    logger.info(
+        f"Imported {sum(imported.values())} records from {path} into "
+        f"{config['database']['persist_directory']} in {time.perf_counter() - start:.1f}s"
+    )
+
 def launch_ui():
     """Launch the Streamlit UI"""
     import subprocess
@@ -123,7 +489,7 @@ def main():
     parser = argparse.ArgumentParser(description="Multimodal RAG System for The Batch")
     parser.add_argument(
         'command',
-        choices=['scrape', 'build-db', 'ui', 'evaluate'],
+        choices=['scrape', 'build-db', 'ingest', 'ui', 'evaluate', 'startup-time', 'compare-backends', 'summarize', 'compare-search', 'bench', 'migrate-store', 'export-snapshot', 'import-snapshot'],
         help='Command to execute'
     )
     parser.add_argument(
@@ -131,6 +497,62 @@ def main():
         default='config/config.yaml',
         help='Path to configuration file'
     )
+    parser.add_argument(
+        '--offline',
+        action='store_true',
+        help='scrape/ingest: replay responses from the HTTP cache without network access'
+    )
+    parser.add_argument(
+        '--eager',
+        action='store_true',
+        help='startup-time: load all models at construction, as before lazy loading'
+    )
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='build-db/ingest: only embed new or changed articles and images'
+    )
+    parser.add_argument(
+        '--articles',
+        type=int,
+        default=500,
+        help='bench: number of synthetic articles'
+    )
+    parser.add_argument(
+        '--images-per-article',
+        type=int,
+        default=2,
+        help='bench: synthetic images per article'
+    )
+    parser.add_argument(
+        '--queries',
+        type=int,
+        default=200,
+        help='bench: number of timed search queries per mode'
+    )
+    parser.add_argument(
+        '--real-models',
+        action='store_true',
+        help='bench: use the configured embedding models instead of the offline stub embedder'
+    )
+    parser.add_argument(
+        '--eval-set',
+        help='evaluate: JSONL query set (default evaluation.queries_path)'
+    )
+    parser.add_argument(
+        '--snapshot',
+        help='export-snapshot/import-snapshot: snapshot file (default snapshot.path)'
+    )
+    parser.add_argument(
+        '--quantization',
+        choices=['float16', 'int8'],
+        help='export-snapshot: vector precision (default snapshot.dtype)'
+    )
+    parser.add_argument(
+        '--output',
+        help='bench/evaluate: path of the JSON results file (default data/bench/ or data/eval/<command>-<timestamp>.json); '
+             'migrate-store: target directory (default data/numpy_store)'
+    )
     
     args = parser.parse_args()
     
@@ -142,15 +564,55 @@ def main():
         logger.info("Run 'python run.py setup' to create initial configuration")
         sys.exit(1)
     
+    if args.offline:
+        config['scraping'].setdefault('http_cache', {}).update({'enabled': True, 'offline': True})
+    
     if args.command == 'scrape':
         scrape_articles(config)
         
     elif args.command == 'build-db':
-        build_database(config)
+        build_database(config, incremental=args.incremental)
+        
+    elif args.command == 'ingest':
+        ingest_articles(config, incremental=args.incremental)
         
     elif args.command == 'ui':
         launch_ui()
         
+    elif args.command == 'evaluate':
+        evaluate_retrieval(config, eval_set=args.eval_set, output=args.output)
+        
+    elif args.command == 'startup-time':
+        measure_startup(config, eager=args.eager)
+        
+    elif args.command == 'compare-backends':
+        compare_embedding_backends(config)
+        
+    elif args.command == 'summarize':
+        summarize_articles(config)
+        
+    elif args.command == 'compare-search':
+        compare_search_modes(config)
+        
+    elif args.command == 'bench':
+        run_benchmark(
+            config,
+            n_articles=args.articles,
+            n_queries=args.queries,
+            images_per_article=args.images_per_article,
+            stub_models=not args.real_models,
+            output=args.output
+        )
+        
+    elif args.command == 'migrate-store':
+        migrate_vector_store(config, output=args.output)
+        
+    elif args.command == 'export-snapshot':
+        export_snapshot(config, path=args.snapshot, dtype=args.quantization)
+        
+    elif args.command == 'import-snapshot':
+        import_snapshot(config, path=args.snapshot)
+        
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
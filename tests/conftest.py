@@ -0,0 +1,91 @@
+import copy
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Tests drop connections on purpose (interrupted streams, closed generators)
+        pass
+
+
+@pytest.fixture
+def http_server():
+    """Start local HTTP servers for a test; returns a function taking a responder.
+
+    The responder gets the request handler and returns (status, headers,
+    body), or None if it wrote the response itself. The base URL of the
+    server is returned.
+    """
+    servers = []
+
+    def start(respond):
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _respond(self):
+                result = respond(self)
+                if result is None:
+                    return
+                status, headers, body = result
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = _respond
+            do_POST = _respond
+
+            def log_message(self, *args):
+                pass
+
+        server = _QuietServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}"
+
+    yield start
+
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def _merge(config, overrides):
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(config.get(key), dict):
+            _merge(config[key], value)
+        else:
+            config[key] = value
+    return config
+
+
+@pytest.fixture
+def db_config(tmp_path):
+    """Database configs for a test; returns a function taking the vector store and overrides.
+
+    The config uses the stub encoders and a persist directory under
+    tmp_path. Overrides are merged into it section by section, e.g.
+    db_config('chroma', database={'chunking': {'enabled': True}}).
+    """
+    defaults = {
+        'database': {'persist_directory': str(tmp_path / 'db'), 'collection_name': 'test'},
+        'models': {'text_embedding': 'stub', 'text_backend': 'stub', 'image_backend': 'stub'},
+        'query_cache': {'enabled': False}
+    }
+
+    def make(vector_store='numpy', **overrides):
+        config = _merge(copy.deepcopy(defaults), {'database': {'vector_store': vector_store}})
+        return _merge(config, overrides)
+
+    return make
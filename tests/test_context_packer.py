@@ -0,0 +1,28 @@
+from app.context_packer import ContextPacker
+
+
+def text_hit(title, similarity):
+    return {
+        'type': 'text',
+        'id': title,
+        'similarity': similarity,
+        'metadata': {'title': title, 'url': f"https://example.com/{title}"},
+        'content': f"{title}\n\nAbout {title}, in its own words."
+    }
+
+
+def test_threshold_applies_to_cosine_similarity():
+    packer = ContextPacker({'ui': {'similarity_threshold': 0.3}})
+    context = packer.pack([text_hit('close', 0.6), text_hit('far', 0.1)])
+
+    assert context['sources'] == ['https://example.com/close']
+    assert context['dropped_results'] == 1
+
+
+def test_threshold_is_not_applied_to_lexical_scores():
+    packer = ContextPacker({'ui': {'similarity_threshold': 0.3}})
+    # BM25 relative to the best hit: a weaker but relevant keyword match
+    context = packer.pack([text_hit('best', 1.0), text_hit('weaker', 0.2)], mode='lexical')
+
+    assert context['sources'] == ['https://example.com/best', 'https://example.com/weaker']
+    assert context['dropped_results'] == 0
@@ -0,0 +1,129 @@
+import time
+
+import pytest
+import requests
+
+from app.scraper import BatchScraper
+
+
+def make_scraper(base_url, cache_dir, offline=False, rules=None):
+    return BatchScraper({
+        'scraping': {
+            'base_url': base_url,
+            'user_agent': 'test-agent',
+            'max_articles': 100,
+            'max_workers': 2,
+            'requests_per_second': 0,
+            'max_retries': 0,
+            'timeout_seconds': 5,
+            'http_cache': {
+                'enabled': True,
+                'directory': str(cache_dir),
+                'offline': offline,
+                'default_policy': 'revalidate',
+                'rules': (rules or []) + [{'pattern': r'\.png$', 'policy': 'bypass'}]
+            }
+        },
+        'thumbnails': {'enabled': False}
+    })
+
+
+def test_offline_replays_cached_pages(http_server, tmp_path):
+    requested = []
+
+    def respond(handler):
+        requested.append(handler.path)
+        return 200, {'Content-Type': 'text/html', 'ETag': '"v1"'}, b'<html>page</html>'
+
+    base_url = http_server(respond)
+    make_scraper(base_url, tmp_path)._get(f"{base_url}/page").raise_for_status()
+
+    offline = make_scraper(base_url, tmp_path, offline=True)
+    response = offline._get(f"{base_url}/page")
+
+    assert response.content == b'<html>page</html>'
+    assert requested == ['/page']
+    with pytest.raises(requests.ConnectionError):
+        offline._get(f"{base_url}/other")
+
+
+def test_offline_does_not_fetch_bypassed_urls(http_server, tmp_path):
+    requested = []
+
+    def respond(handler):
+        requested.append(handler.path)
+        return 200, {'Content-Type': 'image/png'}, b'png'
+
+    base_url = http_server(respond)
+    offline = make_scraper(base_url, tmp_path, offline=True)
+
+    with pytest.raises(requests.ConnectionError):
+        offline._get(f"{base_url}/image.png")
+    assert requested == []
+
+
+def test_offline_load_more_links(tmp_path):
+    offline = make_scraper('http://127.0.0.1:9', tmp_path, offline=True)
+    with pytest.raises(RuntimeError, match='Offline mode'):
+        offline._load_more_links('http://127.0.0.1:9', ['/tag/science/'])
+
+    (tmp_path / 'load_more_links.json').write_text('["https://example.com/a", "https://example.com/b"]')
+    assert offline._load_more_links('http://127.0.0.1:9', ['/tag/science/']) == [
+        'https://example.com/a', 'https://example.com/b'
+    ]
+
+
+def validating_responder(requested, body=b'<html>page</html>'):
+    """Serves a page with validators, answering matching conditional requests with 304"""
+    etag, last_modified = '"v1"', 'Wed, 01 Jan 2025 00:00:00 GMT'
+
+    def respond(handler):
+        requested.append((handler.path, handler.headers.get('If-None-Match'), handler.headers.get('If-Modified-Since')))
+        if handler.headers.get('If-None-Match') == etag:
+            return 304, {'ETag': etag}, b''
+        return 200, {'Content-Type': 'text/html', 'ETag': etag, 'Last-Modified': last_modified}, body
+
+    return respond
+
+
+def test_revalidates_with_conditional_request(http_server, tmp_path):
+    requested = []
+    base_url = http_server(validating_responder(requested))
+    scraper = make_scraper(base_url, tmp_path)
+
+    first = scraper._get(f"{base_url}/page")
+    second = scraper._get(f"{base_url}/page")
+
+    assert first.content == second.content == b'<html>page</html>'
+    assert second.status_code == 200 and second.from_cache
+    assert requested == [
+        ('/page', None, None),
+        ('/page', '"v1"', 'Wed, 01 Jan 2025 00:00:00 GMT')
+    ]
+    assert scraper.http_cache.counts['revalidated'] == 1
+
+
+def test_ttl_serves_fresh_copies_then_revalidates(http_server, tmp_path):
+    requested = []
+    base_url = http_server(validating_responder(requested))
+    scraper = make_scraper(base_url, tmp_path, rules=[{'pattern': '/listing', 'policy': 'ttl', 'ttl_seconds': 0.3}])
+
+    scraper._get(f"{base_url}/listing")
+    assert scraper._get(f"{base_url}/listing").content == b'<html>page</html>'
+    assert len(requested) == 1
+
+    time.sleep(0.4)
+    assert scraper._get(f"{base_url}/listing").content == b'<html>page</html>'
+    assert [if_none_match for _, if_none_match, _ in requested] == [None, '"v1"']
+
+
+def test_bypass_is_never_cached(http_server, tmp_path):
+    requested = []
+    base_url = http_server(validating_responder(requested, body=b'png'))
+    scraper = make_scraper(base_url, tmp_path)
+
+    for _ in range(2):
+        assert scraper._get(f"{base_url}/image.png").content == b'png'
+
+    assert requested == [('/image.png', None, None)] * 2
+    assert scraper.http_cache.counts['stored'] == 0
@@ -0,0 +1,78 @@
+import json
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.multimodal_db import MultimodalDatabase, _hash_file
+
+
+def make_image(path, seed):
+    pixels = np.random.default_rng(seed).integers(0, 256, (64, 64), dtype=np.uint8)
+    Image.fromarray(pixels).save(path)
+    return str(path)
+
+
+def article(name, images):
+    return SimpleNamespace(title=name, content=f"Text of {name}.", url=f"https://example.com/{name}", images=images)
+
+
+def parents(db):
+    records = db.image_collection.get(include=['metadatas'])
+    return {
+        metadata['image_path']: sorted(json.loads(metadata['parent_articles']))
+        for metadata in records['metadatas']
+    }
+
+
+@pytest.mark.parametrize('vector_store', ['numpy', 'chroma'])
+def test_reingested_article_is_relinked(tmp_path, db_config, vector_store):
+    config = db_config(vector_store)
+    images = [make_image(tmp_path / f"{k}.png", seed=k) for k in range(3)]
+    a, b = MultimodalDatabase.article_id('https://example.com/a'), MultimodalDatabase.article_id('https://example.com/b')
+
+    MultimodalDatabase(config).add_articles([article('a', images[:2]), article('b', images[1:2])])
+
+    # The edited article dropped two images and gained a new one
+    db = MultimodalDatabase(config)
+    db.add_articles([article('a', images[2:]), article('b', images[1:2])], incremental=True)
+
+    assert parents(db) == {images[1]: [b], images[2]: [a]}
+    # Parent links survive a reload of the image index
+    db = MultimodalDatabase(config)
+    db.add_articles([article('a', images[:1]), article('b', images[1:2])], incremental=True)
+    assert parents(db) == {images[0]: [a], images[1]: [b]}
+
+
+def test_image_below_boilerplate_threshold_is_restored(tmp_path, db_config):
+    config = db_config(embedding={'image_dedup': {'boilerplate_min_articles': 2}})
+    logo, photo = make_image(tmp_path / 'logo.png', seed=0), make_image(tmp_path / 'photo.png', seed=1)
+    db = MultimodalDatabase(config)
+
+    db.add_articles([article('a', [logo, photo]), article('b', [logo])])
+    assert list(parents(db)) == [photo]
+
+    db.add_articles([article('a', [logo, photo]), article('b', [])], incremental=True)
+    assert parents(db) == {logo: [MultimodalDatabase.article_id('https://example.com/a')],
+                           photo: [MultimodalDatabase.article_id('https://example.com/a')]}
+
+
+def test_suppressed_boilerplate_survives_a_new_process(tmp_path, db_config):
+    config = db_config(embedding={'image_dedup': {'boilerplate_min_articles': 2}})
+    logo, photo = make_image(tmp_path / 'logo.png', seed=0), make_image(tmp_path / 'photo.png', seed=1)
+    articles = [article('a', [logo, photo]), article('b', [logo])]
+
+    stats = MultimodalDatabase(config).add_articles(articles)
+    assert stats['boilerplate_suppressed'] == 2
+    assert stats['image_encodes_avoided'] == 0
+
+    # A new article using the logo must not bring it back, even though it is its only reference in the run
+    db = MultimodalDatabase(config)
+    stats = db.add_articles([article('c', [logo])], incremental=True)
+
+    assert list(parents(db)) == [photo]
+    assert stats['image_documents'] == 0
+    assert stats['boilerplate_suppressed'] == 1
+    suppressed = db.image_index.clusters[db.image_index.assign(logo, _hash_file(logo))[0]]
+    assert suppressed['suppressed'] and len(suppressed['parents']) == 3
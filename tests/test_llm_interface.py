@@ -0,0 +1,125 @@
+import json
+import time
+
+import pytest
+
+from app.llm_interface import LLMInterface
+
+
+def sse_responder(tokens, delay=0.05, interrupt_after=None):
+    """Chat completions endpoint streaming tokens as server-sent events.
+
+    With interrupt_after, the connection is dropped after that many tokens.
+    """
+    requests = []
+
+    def respond(handler):
+        body = handler.rfile.read(int(handler.headers['Content-Length']))
+        requests.append(json.loads(body))
+
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'text/event-stream')
+        handler.send_header('Transfer-Encoding', 'chunked')
+        handler.end_headers()
+
+        def send(data: str):
+            event = f"data: {data}\n\n".encode('utf-8')
+            handler.wfile.write(f"{len(event):x}\r\n".encode('ascii') + event + b"\r\n")
+            handler.wfile.flush()
+
+        for k, token in enumerate(tokens):
+            if interrupt_after is not None and k == interrupt_after:
+                handler.close_connection = True
+                handler.connection.close()
+                return None
+            time.sleep(delay)
+            send(json.dumps({
+                'id': 'chatcmpl-test',
+                'object': 'chat.completion.chunk',
+                'created': 0,
+                'model': 'test-model',
+                'choices': [{'index': 0, 'delta': {'content': token}, 'finish_reason': None}]
+            }))
+        send('[DONE]')
+        handler.wfile.write(b"0\r\n\r\n")
+        return None
+
+    respond.requests = requests
+    return respond
+
+
+@pytest.fixture
+def make_llm(monkeypatch):
+    monkeypatch.setenv('API_KEY', 'test-key')
+
+    def make(base_url):
+        return LLMInterface({'models': {'llm_model': 'test-model', 'llm_base_url': f"{base_url}/v1"}})
+
+    return make
+
+
+def test_streams_tokens_in_order(http_server, make_llm):
+    tokens = ['The', ' Batch', ' covers', ' AI', ' news', '.']
+    responder = sse_responder(tokens)
+    llm = make_llm(http_server(responder))
+
+    received = list(llm.generate_answer_stream('What is The Batch?', 'context'))
+
+    assert received == tokens
+    assert responder.requests[0]['stream'] is True
+    assert responder.requests[0]['model'] == 'test-model'
+
+
+def test_stream_timings(http_server, make_llm):
+    tokens = ['a', 'b', 'c', 'd']
+    llm = make_llm(http_server(sse_responder(tokens, delay=0.05)))
+
+    timings = {}
+    list(llm.generate_answer_stream('query', 'context', timings=timings))
+
+    assert timings['completed'] is True
+    assert timings['cached'] is False
+    assert 0 < timings['time_to_first_token'] < timings['total_time']
+    # Every token is delayed by 50 ms
+    assert timings['time_to_first_token'] >= 0.04
+    assert timings['total_time'] >= 0.04 * len(tokens)
+
+
+def test_interrupted_stream_is_not_completed(http_server, make_llm):
+    tokens = ['one', ' two', ' three', ' four']
+    llm = make_llm(http_server(sse_responder(tokens, delay=0.01, interrupt_after=2)))
+
+    timings = {}
+    received = list(llm.generate_answer_stream('query', 'context', timings=timings))
+
+    assert received[:2] == ['one', ' two']
+    assert received[2].startswith('Error generating response')
+    assert timings['completed'] is False
+    assert timings['time_to_first_token'] is not None
+    assert timings['total_time'] is not None
+
+
+def test_abandoned_stream_is_not_completed(http_server, make_llm):
+    llm = make_llm(http_server(sse_responder(['one', ' two', ' three'], delay=0.01)))
+
+    timings = {}
+    stream = llm.generate_answer_stream('query', 'context', timings=timings)
+    assert next(stream) == 'one'
+    stream.close()
+
+    assert timings['completed'] is False
+    assert timings['total_time'] is not None
+
+
+def test_concurrent_streams_keep_their_own_timings(http_server, make_llm):
+    llm = make_llm(http_server(sse_responder(['a', 'b'], delay=0.01)))
+
+    first, second = {}, {}
+    first_stream = llm.generate_answer_stream('first', 'context', timings=first)
+    second_stream = llm.generate_answer_stream('second', 'context', timings=second)
+    assert next(first_stream) == 'a'
+    list(second_stream)
+    first_stream.close()
+
+    assert second['completed'] is True
+    assert first['completed'] is False
@@ -0,0 +1,46 @@
+import json
+import threading
+
+from app.metrics import MetricsRegistry
+
+
+def test_last_trace_is_per_thread():
+    registry = MetricsRegistry()
+    registry.configure({'enabled': True})
+
+    with registry.trace('search'):
+        with registry.span('search.text_query'):
+            pass
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(registry.last_trace('search')))
+    thread.start()
+    thread.join()
+
+    assert other == [None]
+    trace = registry.last_trace('search')
+    assert [span['name'] for span in trace['spans']] == ['search.text_query']
+
+
+def test_traces_are_written_on_flush(tmp_path):
+    registry = MetricsRegistry()
+    log_path, prometheus_path = tmp_path / 'traces.jsonl', tmp_path / 'batchrag.prom'
+    registry.configure({
+        'enabled': True, 'log_path': str(log_path), 'prometheus_path': str(prometheus_path), 'flush_interval': 3600
+    })
+
+    for _ in range(3):
+        with registry.trace('search'):
+            with registry.span('search.text_query'):
+                pass
+
+    # Nothing is written on the request path
+    assert not log_path.exists() and not prometheus_path.exists()
+
+    registry.flush()
+
+    records = [json.loads(line) for line in log_path.read_text().splitlines()]
+    assert [record['trace'] for record in records] == ['search'] * 3
+    assert 'batchrag_stage_seconds_count{stage="search.text_query"} 3' in prometheus_path.read_text()
+    registry.flush()
+    assert len(log_path.read_text().splitlines()) == 3
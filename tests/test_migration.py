@@ -0,0 +1,56 @@
+import json
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+from app.multimodal_db import MultimodalDatabase
+
+
+def write_legacy_records(db, articles):
+    """Rewrite the text records the way earlier versions stored them"""
+    ids = [db.article_id(article.url) for article in articles]
+    records = db.text_collection.get(ids=ids, include=['embeddings', 'metadatas'])
+    db.text_collection.upsert(
+        ids=records['ids'],
+        embeddings=records['embeddings'],
+        documents=[f"{article.title}\n\n{article.content}" for article in articles],
+        metadatas=[
+            {**metadata, 'images': json.dumps(article.images), 'metadata': json.dumps({'image_info': []})}
+            for metadata, article in zip(records['metadatas'], articles)
+        ]
+    )
+    return ids
+
+
+@pytest.mark.parametrize('vector_store', ['numpy', 'chroma'])
+def test_legacy_records_are_slimmed(tmp_path, db_config, vector_store):
+    config = db_config(vector_store)
+    articles = [
+        SimpleNamespace(title=f"Article {k}", content=f"Text of article {k}.", url=f"https://example.com/{k}",
+                        images=[f"data/images/{k}.png"])
+        for k in range(3)
+    ]
+    db = MultimodalDatabase(config)
+    db.add_articles(articles)
+    ids = write_legacy_records(db, articles)
+    # Document store written before it held image lists
+    with sqlite3.connect(tmp_path / 'db' / 'documents.sqlite') as conn:
+        conn.execute("DROP TABLE documents")
+        conn.execute("CREATE TABLE documents (id TEXT PRIMARY KEY, body TEXT NOT NULL)")
+    del db
+
+    db = MultimodalDatabase(config)
+
+    records = db.text_collection.get(ids=ids, include=['documents', 'metadatas'])
+    assert not any(records['documents'])
+    for metadata in records['metadatas']:
+        assert 'images' not in metadata and 'metadata' not in metadata
+        assert metadata['title'].startswith('Article')
+    assert db.documents.get(ids)[ids[0]] == 'Article 0\n\nText of article 0.'
+    assert db.documents.get_images(ids) == {ids[k]: [f"data/images/{k}.png"] for k in range(3)}
+
+    results = db.hydrate(db.search('article', n_results=3, include_images=False, mode='lexical'))
+    assert all(result['images'] == [] for result in results)
+    results = db.hydrate(db.search('article', n_results=3, mode='lexical'))
+    assert {result['id']: result['images'] for result in results} == db.documents.get_images(ids)
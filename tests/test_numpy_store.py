@@ -0,0 +1,106 @@
+import os
+
+import numpy as np
+import pytest
+
+from app.numpy_store import NumpyClient, NumpyCollection, _normalize
+
+
+def vectors_files(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith('.npy'))
+
+
+@pytest.fixture
+def collection(tmp_path):
+    collection = NumpyCollection(str(tmp_path / 'store'), 'test')
+    embeddings = np.random.default_rng(0).normal(size=(6, 8))
+    collection.add(
+        ids=[f"r{k}" for k in range(6)],
+        embeddings=embeddings,
+        documents=[f"doc {k}" for k in range(6)],
+        metadatas=[{'kind': 'text' if k % 2 else 'image', 'year': 2020 + k} for k in range(6)]
+    )
+    return collection
+
+
+def test_where_filters(collection):
+    assert collection.get(where={'kind': 'image'})['ids'] == ['r0', 'r2', 'r4']
+    assert collection.get(where={'year': {'$gte': 2024}})['ids'] == ['r4', 'r5']
+    assert collection.get(where={'$and': [{'kind': 'text'}, {'year': {'$lt': 2023}}]})['ids'] == ['r1']
+    assert collection.get(where={'$or': [{'year': 2020}, {'year': {'$in': [2025]}}]})['ids'] == ['r0', 'r5']
+    assert collection.get(ids=['r1', 'r2', 'missing'], where={'kind': {'$ne': 'text'}})['ids'] == ['r2']
+
+    results = collection.query(np.ones((1, 8)), n_results=10, where={'kind': 'text'})
+    assert sorted(results['ids'][0]) == ['r1', 'r3', 'r5']
+    with pytest.raises(ValueError, match='Unsupported filter operator'):
+        collection.get(where={'year': {'$like': 2020}})
+
+
+def test_update_merges_metadata(collection, tmp_path):
+    collection.update(ids=['r0', 'missing'], metadatas=[{'summary': 'short', 'year': None}, {'summary': 'x'}])
+
+    assert collection.get(ids=['r0'])['metadatas'] == [{'kind': 'image', 'summary': 'short'}]
+    assert collection.get(ids=['r0'])['documents'] == ['doc 0']
+    # Updates never insert
+    assert collection.count() == 6
+    # Upsert replaces the metadata instead
+    collection.upsert(ids=['r0'], metadatas=[{'kind': 'text'}])
+    assert collection.get(ids=['r0'])['metadatas'] == [{'kind': 'text'}]
+    assert NumpyCollection(str(tmp_path / 'store'), 'test').get(ids=['r0'])['metadatas'] == [{'kind': 'text'}]
+
+
+def test_deferred_writes_are_persisted_by_flush(tmp_path):
+    directory = str(tmp_path / 'store')
+    client = NumpyClient(directory)
+    client.defer_writes(True)
+    collection = client.get_or_create_collection('test')
+    collection.add(ids=['a', 'b'], embeddings=np.eye(2), metadatas=[{'n': 1}, {'n': 2}])
+
+    assert collection.get(ids=['b'])['metadatas'] == [{'n': 2}]
+    assert NumpyCollection(os.path.join(directory, 'test'), 'test').count() == 0
+
+    client.flush()
+    assert NumpyCollection(os.path.join(directory, 'test'), 'test').get()['ids'] == ['a', 'b']
+
+    collection.delete(ids=['a'])
+    client.defer_writes(False)
+    reloaded = NumpyCollection(os.path.join(directory, 'test'), 'test')
+    assert reloaded.get(include=['embeddings'])['ids'] == ['b']
+    np.testing.assert_allclose(reloaded.get(include=['embeddings'])['embeddings'], [[0, 1]])
+
+
+def test_write_replaces_embeddings_file(collection, tmp_path):
+    directory = str(tmp_path / 'store')
+    [before] = vectors_files(directory)
+
+    collection.upsert(ids=['r6'], embeddings=np.ones((1, 8)), metadatas=[{'kind': 'text'}])
+
+    [after] = vectors_files(directory)
+    assert after != before
+    assert not os.path.exists(os.path.join(directory, 'records.pkl.tmp'))
+    assert np.load(os.path.join(directory, after)).shape == (7, 8)
+    assert NumpyCollection(directory, 'test').count() == 7
+
+    collection.delete(ids=[f"r{k}" for k in range(7)])
+    assert vectors_files(directory) == []
+    assert NumpyCollection(directory, 'test').count() == 0
+
+
+def test_query_matches_brute_force(tmp_path):
+    rng = np.random.default_rng(1)
+    embeddings = rng.normal(size=(200, 16))
+    queries = rng.normal(size=(5, 16))
+    collection = NumpyCollection(str(tmp_path / 'store'), 'test')
+    collection.add(ids=[f"r{k}" for k in range(200)], embeddings=embeddings, metadatas=[{} for _ in range(200)])
+
+    results = collection.query(queries, n_results=10, include=['distances'])
+
+    similarities = _normalize(queries) @ _normalize(embeddings).T
+    for query_row in range(len(queries)):
+        expected = np.argsort(-similarities[query_row])[:10]
+        assert results['ids'][query_row] == [f"r{row}" for row in expected]
+        np.testing.assert_allclose(results['distances'][query_row], 1 - similarities[query_row, expected], atol=1e-5)
+
+    everything = collection.query(queries[:1], n_results=500, include=['distances'])
+    assert len(everything['ids'][0]) == 200
+    assert everything['distances'][0] == sorted(everything['distances'][0])
@@ -0,0 +1,79 @@
+import hashlib
+import json
+from types import SimpleNamespace
+
+from app.multimodal_db import MultimodalDatabase
+from app.pipeline import IngestPipeline
+
+
+class FakeScraper:
+    """Serves articles from a dict; URLs mapped to None fail to fetch"""
+
+    max_workers = 2
+
+    def __init__(self, pages):
+        self.pages = pages
+
+    def get_all_pages_links(self, base_url):
+        return list(self.pages)
+
+    def fetch_article(self, url):
+        return self.pages[url]
+
+    def parse_article(self, html, url):
+        return SimpleNamespace(title=url.rsplit('/', 1)[-1], content=html, url=url, images=[], metadata={})
+
+    def download_images(self, articles, image_dir, save_manifest=True):
+        return articles
+
+    def save_manifest(self, image_dir):
+        pass
+
+
+def make_pipeline(tmp_path, db_config, pages):
+    config = db_config(
+        scraping={'base_url': 'https://example.com', 'max_articles': 100},
+        summarization={'progress_path': str(tmp_path / 'summaries.json')}
+    )
+    db = MultimodalDatabase(config)
+    pipeline = IngestPipeline(config, FakeScraper(pages), db, image_dir=str(tmp_path / 'images'),
+                              articles_path=str(tmp_path / 'articles.json'))
+    return pipeline, db
+
+
+def text_ids(db):
+    return set(db.text_collection.get(include=[])['ids'])
+
+
+def test_ingest_attaches_summaries_and_prunes(tmp_path, db_config):
+    pages = {f"https://example.com/{name}": f"Text of {name}." for name in ('a', 'b', 'c')}
+    b = MultimodalDatabase.article_id('https://example.com/b')
+    (tmp_path / 'summaries.json').write_text(json.dumps({
+        b: {'content_hash': hashlib.sha1(b'Text of b.').hexdigest(), 'summary': 'Summary of b'}
+    }))
+
+    pipeline, db = make_pipeline(tmp_path, db_config, pages)
+    report = pipeline.run()
+
+    assert report['summaries_attached'] == 1
+    assert db.text_collection.get(ids=[b], include=['metadatas'])['metadatas'][0]['summary'] == 'Summary of b'
+
+    del pages['https://example.com/c']
+    pipeline, db = make_pipeline(tmp_path, db_config, pages)
+    report = pipeline.run(incremental=True)
+
+    assert report['deleted'] == 1
+    assert text_ids(db) == {MultimodalDatabase.article_id(url) for url in pages}
+
+
+def test_ingest_with_failures_does_not_prune(tmp_path, db_config):
+    pages = {f"https://example.com/{name}": f"Text of {name}." for name in ('a', 'b')}
+    make_pipeline(tmp_path, db_config, pages)[0].run()
+
+    pages['https://example.com/b'] = None
+    pipeline, db = make_pipeline(tmp_path, db_config, pages)
+    report = pipeline.run(incremental=True)
+
+    assert report['articles_dropped'] == 1
+    assert report['deleted'] == 0
+    assert len(text_ids(db)) == 2
@@ -0,0 +1,157 @@
+import threading
+import time
+
+import pytest
+
+from app.rate_limit import TokenBucket
+from app.scraper import BatchScraper
+
+ARTICLE_HTML = """<html><body><main><div><article>
+<header><div><div><div><div><h1>{title}</h1></div></div></div></div></header>
+<div><div><p>Body of {title}</p></div></div>
+</article></div></main></body></html>"""
+
+
+class FixtureSite:
+    """Serves /article/<k> fixture pages and records when requests arrive"""
+
+    def __init__(self, delays=None, failures=None, retry_after=None):
+        self.delays = delays or {}
+        self.failures = dict(failures or {})
+        self.retry_after = retry_after
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.log = []  # (path, start time, status)
+
+    def __call__(self, handler):
+        path = handler.path
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            failing = self.failures.get(path, 0) > 0
+            if failing:
+                self.failures[path] -= 1
+            self.log.append((path, time.monotonic(), 503 if failing else 200))
+        try:
+            time.sleep(self.delays.get(path, 0))
+            if failing:
+                headers = {'Retry-After': str(self.retry_after)} if self.retry_after else {}
+                return 503, headers, b'unavailable'
+            title = f"Article {path.rsplit('/', 1)[-1]}"
+            return 200, {'Content-Type': 'text/html'}, ARTICLE_HTML.format(title=title).encode('utf-8')
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def make_scraper(base_url, **scraping):
+    config = {
+        'scraping': {
+            'base_url': base_url,
+            'user_agent': 'test-agent',
+            'max_articles': 100,
+            'max_workers': 8,
+            'max_per_host': 8,
+            'requests_per_second': 0,
+            'max_retries': 0,
+            'backoff_factor': 0,
+            'timeout_seconds': 5,
+            **scraping
+        },
+        'thumbnails': {'enabled': False}
+    }
+    return BatchScraper(config)
+
+
+def article_links(base_url, count):
+    return [f"{base_url}/article/{k}" for k in range(count)]
+
+
+def test_per_host_concurrency_cap(http_server):
+    site = FixtureSite(delays={f"/article/{k}": 0.1 for k in range(8)})
+    base_url = http_server(site)
+    scraper = make_scraper(base_url, max_workers=8, max_per_host=2)
+
+    articles = scraper.scrape_articles(article_links(base_url, 8))
+
+    assert len(articles) == 8
+    assert site.max_in_flight == 2
+
+
+def test_token_bucket_paces_requests(http_server):
+    site = FixtureSite()
+    base_url = http_server(site)
+    scraper = make_scraper(base_url, requests_per_second=20, burst=1)
+
+    articles = scraper.scrape_articles(article_links(base_url, 6))
+
+    assert len(articles) == 6
+    starts = sorted(start for _, start, _ in site.log)
+    # 20 requests/sec with no burst: one request every 50 ms (arrival times jitter a little)
+    assert starts[-1] - starts[0] > 0.2
+    for k, start in enumerate(starts):
+        assert start - starts[0] > 0.05 * k - 0.03
+
+
+def test_article_order_is_preserved(http_server):
+    # Later articles answer first
+    site = FixtureSite(delays={f"/article/{k}": 0.05 * (6 - k) for k in range(6)})
+    base_url = http_server(site)
+    scraper = make_scraper(base_url)
+
+    articles = scraper.scrape_articles(article_links(base_url, 6))
+
+    assert [article.title for article in articles] == [f"Article {k}" for k in range(6)]
+    assert [article.url for article in articles] == article_links(base_url, 6)
+
+
+def test_each_retry_takes_a_token(http_server):
+    site = FixtureSite(failures={'/article/0': 2})
+    base_url = http_server(site)
+    scraper = make_scraper(base_url, max_retries=3)
+
+    acquired = []
+    acquire = scraper.rate_limiter.acquire
+    scraper.rate_limiter.acquire = lambda: (acquired.append(1), acquire())
+
+    articles = scraper.scrape_articles(article_links(base_url, 1))
+
+    assert [article.title for article in articles] == ['Article 0']
+    assert [status for _, _, status in site.log] == [503, 503, 200]
+    assert len(acquired) == 3
+
+
+def test_backoff_releases_host_slot(http_server):
+    site = FixtureSite(failures={'/article/0': 1}, retry_after=1)
+    base_url = http_server(site)
+    scraper = make_scraper(base_url, max_workers=2, max_per_host=1, max_retries=2)
+
+    articles = scraper.scrape_articles(article_links(base_url, 2))
+
+    assert [article.title for article in articles] == ['Article 0', 'Article 1']
+    # Article 1 is fetched while article 0 waits out Retry-After
+    paths = [path for path, _, _ in sorted(site.log, key=lambda entry: entry[1])]
+    assert paths == ['/article/0', '/article/1', '/article/0']
+
+
+def test_retries_exhausted_returns_last_response(http_server):
+    site = FixtureSite(failures={'/article/0': 5})
+    base_url = http_server(site)
+    scraper = make_scraper(base_url, max_retries=1)
+
+    assert scraper.scrape_articles(article_links(base_url, 1)) == []
+    assert len(site.log) == 2
+
+
+def test_token_bucket_burst_then_rate():
+    bucket = TokenBucket(rate=20, capacity=3)
+    start = time.monotonic()
+    times = []
+    for _ in range(5):
+        bucket.acquire()
+        times.append(time.monotonic() - start)
+
+    assert times[2] < 0.02
+    assert times[3] == pytest.approx(0.05, abs=0.02)
+    assert times[4] == pytest.approx(0.10, abs=0.03)
@@ -0,0 +1,31 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.multimodal_db import MultimodalDatabase
+
+
+@pytest.mark.parametrize('vector_store', ['numpy', 'chroma'])
+def test_lexical_only_hits_are_scored_against_passages(db_config, vector_store):
+    db = MultimodalDatabase(db_config(vector_store, database={
+        'chunking': {'enabled': True, 'chunk_size': 8, 'chunk_overlap': 0, 'max_passages_per_result': 2}
+    }))
+    content = ' '.join(f"word{k}" for k in range(24)) + ' transformers'
+    db.add_articles([SimpleNamespace(title='Attention', content=content, url='https://example.com/a', images=[])])
+    article_id = db.article_id('https://example.com/a')
+
+    query_embedding = db.embed_queries(['transformers'])[0]
+    # No vector results, so the BM25 hit is lexical-only
+    [results] = db._fuse_lexical(['transformers'], [query_embedding], [[]], 5, include_images=False)
+
+    assert [result['id'] for result in results] == [article_id]
+    chunks = db.chunk_collection.get(where={'parent_article': article_id}, include=['documents', 'embeddings'])
+    similarities = [
+        float(np.dot(query_embedding, embedding) / (np.linalg.norm(query_embedding) * np.linalg.norm(embedding)))
+        for embedding in chunks['embeddings']
+    ]
+    best = int(np.argmax(similarities))
+    assert results[0]['similarity'] == pytest.approx(similarities[best], abs=1e-5)
+    assert results[0]['passages'][0] == chunks['documents'][best]
+    assert len(results[0]['passages']) == 2
@@ -0,0 +1,22 @@
+from app.multimodal_db import MultimodalDatabase
+from app.semantic_cache import SemanticCache
+
+
+def make_cache(db_config, **semantic_cache):
+    config = db_config(semantic_cache=semantic_cache)
+    return SemanticCache(MultimodalDatabase(config), config)
+
+
+def test_store_only_evicts_when_full(db_config, monkeypatch):
+    cache = make_cache(db_config, max_entries=3)
+    sweeps = []
+    evict = cache._evict
+    monkeypatch.setattr(cache, '_evict', lambda: (sweeps.append(1), evict()))
+
+    for k in range(3):
+        cache.store(f"query {k}", 5, False, [])
+    assert sweeps == []
+
+    cache.store('query 3', 5, False, [])
+    assert len(sweeps) == 1
+    assert cache.collection.count() == 3
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from app.benchmark import make_synthetic_corpus
+from app.multimodal_db import MultimodalDatabase
+from app.numpy_store import _normalize
+from app.snapshot import _ALIGNMENT, _HEADER, FORMAT_VERSION, MAGIC, Snapshot, dequantize, export_snapshot, \
+    import_snapshot, quantize
+
+# Minimum recall@10 against float32 on the benchmark corpus, as documented in the README
+DOCUMENTED_RECALL = {'float16': 0.99, 'int8': 0.94}
+
+
+def build_db(tmp_path, config, articles=100):
+    db = MultimodalDatabase(config)
+    corpus = make_synthetic_corpus(str(tmp_path / 'corpus'), articles, images_per_article=1)
+    db.add_articles(corpus)
+    return db, [article.title for article in corpus]
+
+
+def contents(db):
+    """Records of the text and image collections, keyed by ID"""
+    text = db.text_collection.get(include=['metadatas'])
+    images = db.image_collection.get(include=['metadatas'])
+    return {
+        'text': dict(zip(text['ids'], text['metadatas'])),
+        'documents': db.documents.get(text['ids']),
+        'article_images': db.documents.get_images(text['ids']),
+        'images': dict(zip(images['ids'], images['metadatas']))
+    }
+
+
+@pytest.mark.parametrize('dtype', ['float16', 'int8'])
+def test_quantize_round_trip(dtype):
+    embeddings = np.random.default_rng(0).normal(size=(50, 32)).astype(np.float32)
+    vectors, scales = quantize(embeddings, dtype)
+
+    assert vectors.dtype == np.dtype(dtype)
+    assert (scales is None) == (dtype == 'float16')
+    tolerance = 1e-3 if dtype == 'float16' else scales.max() / 2 + 1e-6
+    np.testing.assert_allclose(dequantize(vectors, scales), _normalize(embeddings), atol=tolerance)
+
+
+def test_header_and_alignment(tmp_path, db_config):
+    db, _ = build_db(tmp_path, db_config(), articles=5)
+    path = str(tmp_path / 'snapshot.brag')
+    manifest = export_snapshot(db, path, dtype='int8')
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, version, _, manifest_offset, _ = _HEADER.unpack(data[:_HEADER.size])
+    assert (magic, version) == (MAGIC, FORMAT_VERSION)
+    assert manifest_offset % _ALIGNMENT == 0
+    sections = [
+        entry[name] for entry in manifest['collections'].values()
+        for name in ('vectors', 'scales', 'records') if name in entry
+    ]
+    assert sections and all(section['offset'] % _ALIGNMENT == 0 for section in sections)
+
+    bad_magic = tmp_path / 'bad_magic.brag'
+    bad_magic.write_bytes(b'NOTASNAP' + data[8:])
+    with pytest.raises(ValueError, match='not a snapshot'):
+        Snapshot(str(bad_magic))
+    newer = tmp_path / 'newer.brag'
+    newer.write_bytes(_HEADER.pack(MAGIC, FORMAT_VERSION + 1, 0, manifest_offset, 0) + data[_HEADER.size:])
+    with pytest.raises(ValueError, match='snapshot format'):
+        Snapshot(str(newer))
+    (tmp_path / 'short.brag').write_bytes(data[:10])
+    with pytest.raises(ValueError, match='not a snapshot'):
+        Snapshot(str(tmp_path / 'short.brag'))
+
+
+@pytest.mark.parametrize('dtype', ['float16', 'int8'])
+@pytest.mark.parametrize('vector_store', ['numpy', 'chroma'])
+def test_export_import_round_trip(tmp_path, db_config, vector_store, dtype):
+    source, titles = build_db(tmp_path, db_config())
+    path = str(tmp_path / 'snapshot.brag')
+    manifest = export_snapshot(source, path, dtype=dtype, recall_queries=titles)
+
+    assert set(manifest['recall']) == {'text', 'images'}
+    for recall in manifest['recall'].values():
+        assert recall >= DOCUMENTED_RECALL[dtype]
+
+    target = MultimodalDatabase(db_config(vector_store, database={'persist_directory': str(tmp_path / 'target')}))
+    imported = import_snapshot(target, path)
+
+    expected = contents(source)
+    assert imported == {'text': 100, 'images': 100}
+    assert contents(target) == expected
+
+    snapshot = Snapshot(path)
+    for role, collection in (('text', target.text_collection), ('images', target.image_collection)):
+        stored = collection.get(ids=snapshot.records(role)['ids'], include=['embeddings'])
+        np.testing.assert_allclose(
+            _normalize(np.asarray(stored['embeddings'])), _normalize(snapshot.embeddings(role)), atol=1e-5
+        )
@@ -0,0 +1,166 @@
+import json
+import re
+import threading
+import time
+
+import pytest
+
+from app.llm_interface import LLMInterface
+from app.summarizer import BatchSummarizer, load_summaries
+
+
+class MockCompletions:
+    """Chat completions endpoint summarizing 'article-<k>' contents.
+
+    failures maps an article name to a list of HTTP statuses returned
+    before it succeeds; a status repeated past the list keeps failing when
+    always_fail is set.
+    """
+
+    def __init__(self, delay=0.0, failures=None, always_fail=None):
+        self.delay = delay
+        self.failures = {name: list(statuses) for name, statuses in (failures or {}).items()}
+        self.always_fail = always_fail or {}
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests = []
+
+    def __call__(self, handler):
+        body = json.loads(handler.rfile.read(int(handler.headers['Content-Length'])))
+        name = re.search(r'article-\d+', body['messages'][-1]['content']).group(0)
+        with self.lock:
+            self.requests.append(name)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            pending = self.failures.get(name)
+            status = pending.pop(0) if pending else self.always_fail.get(name, 200)
+        try:
+            time.sleep(self.delay)
+            if status != 200:
+                error = {'error': {'message': f"status {status}", 'type': 'test', 'code': None}}
+                return status, {'Content-Type': 'application/json', 'Retry-After': '0'}, json.dumps(error).encode()
+            return 200, {'Content-Type': 'application/json'}, json.dumps({
+                'id': 'chatcmpl-test',
+                'object': 'chat.completion',
+                'created': 0,
+                'model': 'test-model',
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': f"Summary of {name}"},
+                    'finish_reason': 'stop'
+                }]
+            }).encode()
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+@pytest.fixture
+def make_summarizer(monkeypatch, tmp_path):
+    monkeypatch.setenv('API_KEY', 'test-key')
+
+    def make(base_url, **summarization):
+        config = {
+            'models': {'llm_model': 'test-model', 'llm_base_url': f"{base_url}/v1"},
+            'summarization': {
+                'max_concurrency': 4,
+                'max_retries': 3,
+                'backoff_seconds': 0,
+                'save_every': 2,
+                'progress_path': str(tmp_path / 'summaries.json'),
+                **summarization
+            }
+        }
+        return BatchSummarizer(config, LLMInterface(config))
+
+    return make
+
+
+def make_articles(count, start=0):
+    return [{'id': f"id-{k}", 'content': f"Text of article-{k}."} for k in range(start, start + count)]
+
+
+def test_bounded_concurrency(http_server, make_summarizer):
+    server = MockCompletions(delay=0.1)
+    summarizer = make_summarizer(http_server(server), max_concurrency=3)
+
+    stats = summarizer.run(make_articles(12))
+
+    assert stats['summarized'] == 12
+    assert stats['failed'] == 0
+    assert server.max_in_flight == 3
+    summaries = load_summaries(summarizer.progress_path, make_articles(12))
+    assert summaries == {f"id-{k}": f"Summary of article-{k}" for k in range(12)}
+
+
+def test_resume_from_progress_file(http_server, make_summarizer):
+    server = MockCompletions()
+    base_url = http_server(server)
+    make_summarizer(base_url).run(make_articles(3))
+    server.requests.clear()
+
+    articles = make_articles(5)
+    # An edited article is summarized again
+    articles[1]['content'] = 'Edited text of article-1.'
+    stats = make_summarizer(base_url).run(articles)
+
+    assert stats['resumed'] == 2
+    assert stats['summarized'] == 3
+    assert sorted(server.requests) == ['article-1', 'article-3', 'article-4']
+    assert set(load_summaries(make_summarizer(base_url).progress_path, articles)) == {f"id-{k}" for k in range(5)}
+
+
+def test_retries_transient_errors(http_server, make_summarizer):
+    server = MockCompletions(failures={'article-0': [429, 503]})
+    summarizer = make_summarizer(http_server(server))
+
+    stats = summarizer.run(make_articles(2))
+
+    assert stats == {**stats, 'summarized': 2, 'failed': 0}
+    assert server.requests.count('article-0') == 3
+    assert summarizer.progress['id-0']['summary'] == 'Summary of article-0'
+
+
+def test_failures_are_retried_on_the_next_run(http_server, make_summarizer):
+    server = MockCompletions(always_fail={'article-1': 500, 'article-2': 400})
+    base_url = http_server(server)
+
+    stats = make_summarizer(base_url, max_retries=2).run(make_articles(3))
+
+    assert stats['summarized'] == 1
+    assert stats['failed'] == 2
+    # Server errors are retried, client errors are not
+    assert server.requests.count('article-1') == 3
+    assert server.requests.count('article-2') == 1
+    assert set(load_summaries(make_summarizer(base_url).progress_path, make_articles(3))) == {'id-0'}
+
+    server.always_fail.clear()
+    server.requests.clear()
+    stats = make_summarizer(base_url).run(make_articles(3))
+
+    assert stats['resumed'] == 1
+    assert stats['summarized'] == 2
+    assert sorted(server.requests) == ['article-1', 'article-2']
+
+
+@pytest.mark.parametrize('vector_store', ['numpy', 'chroma'])
+def test_edited_article_drops_its_summary(db_config, vector_store):
+    from types import SimpleNamespace
+    from app.multimodal_db import MultimodalDatabase
+
+    db = MultimodalDatabase(db_config(vector_store))
+    articles = [
+        SimpleNamespace(title=f"Article {k}", content=f"Text of article-{k}.", url=f"https://example.com/{k}", images=[])
+        for k in range(2)
+    ]
+    db.add_articles(articles)
+    ids = [db.article_id(article.url) for article in articles]
+    assert db.set_summaries({article_id: f"Summary {k}" for k, article_id in enumerate(ids)}) == 2
+
+    articles[1].content = 'Edited text of article-1.'
+    db.add_articles(articles, incremental=True)
+
+    metadatas = db.text_collection.get(ids=ids, include=['metadatas'])
+    summaries = dict(zip(metadatas['ids'], (metadata['summary'] for metadata in metadatas['metadatas'])))
+    assert summaries == {ids[0]: 'Summary 0', ids[1]: ''}